@@ -5,6 +5,13 @@ from flask import Flask, jsonify, send_from_directory
 from .config import Config
 from .models import db
 from .services.cache import init_cache
+from .services.events import init_events
+from .services.health_history import init_history
+from .services.oui import init_oui
+from .services.probes import init_probes
+from .services.ratelimit import init_ratelimit
+from .services.resolver import init_resolver
+from .services.signatures import init_signatures
 
 
 def create_app(config_class=Config):
@@ -15,6 +22,13 @@ def create_app(config_class=Config):
 
     db.init_app(app)
     init_cache(app)
+    init_resolver(app)
+    init_probes(app)
+    init_signatures(app)
+    init_ratelimit(app)
+    init_oui(app)
+    init_history(app)
+    init_events(app)
 
     # Enable CORS for development
     try:
@@ -31,6 +45,10 @@ def create_app(config_class=Config):
     from .routes import register_blueprints
     register_blueprints(app)
 
+    # CLI commands (flask --app app discovery ...)
+    from .cli import register_cli
+    register_cli(app)
+
     # Health check
     @app.route("/api/health")
     def health():
@@ -0,0 +1,153 @@
+"""
+Flask CLI commands.
+
+    flask --app app discovery scan 10.0.0.0/16 -o hosts.ndjson
+    flask --app app discovery scan 10.0.10.0/24 10.0.20.0/24 --exclude 10.0.20.1 --import
+
+``--app app`` (the factory) rather than the default wsgi.py, which would
+also start the web process's background workers.
+"""
+from __future__ import annotations
+
+import ipaddress
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import click
+from flask.cli import AppGroup
+
+from .services.discovery import DEFAULT_CONCURRENCY, ScanTargets, scan_ips
+from .services.discovery_cache import HostCache
+from .services.probes import PROFILES
+
+discovery_cli = AppGroup("discovery", help="Subnet auto-discovery.")
+
+# Hosts imported per import_hosts() call (one transaction each)
+_IMPORT_BATCH = 500
+
+# State inherited by forked scan workers
+_worker_app = None
+_worker_opts: dict = {}
+
+
+def _chunks(targets: ScanTargets, size: int) -> list[tuple[int, int]]:
+    """Split targets into spans of at most *size* addresses, interleaved across subnets."""
+    per_subnet = [
+        [(lo, min(lo + size, r.stop)) for r in ranges for lo in range(r.start, r.stop, size)]
+        for _, ranges in targets.subnets
+    ]
+    return [span for group in itertools.zip_longest(*per_subnet) for span in group if span]
+
+
+def _init_worker(share: float) -> None:
+    from .services.ratelimit import init_ratelimit
+    from .services.resolver import init_resolver
+
+    # Fresh resolver threads (threads don't survive fork), and this
+    # worker's slice of the rate budget
+    init_resolver(_worker_app)
+    init_ratelimit(_worker_app, share)
+    _worker_opts["cache"] = HostCache.from_app(_worker_app)
+
+
+def _scan_span(span: tuple[int, int]) -> list[dict]:
+    ips = (str(ipaddress.ip_address(ip)) for ip in range(*span))
+    return scan_ips(ips, **_worker_opts)
+
+
+@discovery_cli.command("scan")
+@click.argument("cidrs", nargs=-1, required=True)
+@click.option("--exclude", "-x", multiple=True, help="CIDR or IP to skip (repeatable).")
+@click.option("--processes", "-p", type=int, default=0, help="Scan processes (default: one per core).")
+@click.option("--concurrency", "-c", type=int, default=DEFAULT_CONCURRENCY, show_default=True,
+              help="Open sockets per process.")
+@click.option("--timeout", "-t", type=float, default=1.0, show_default=True, help="Per-probe timeout (s).")
+@click.option("--profile", type=click.Choice(list(PROFILES)), default=None, help="Port profile.")
+@click.option("--chunk", type=int, default=1024, show_default=True, help="Addresses per work unit.")
+@click.option("--include-dead", is_flag=True, help="Also write hosts that didn't answer.")
+@click.option("--output", "-o", type=click.File("w"), default="-", help="NDJSON output file (default: stdout).")
+@click.option("--import", "import_", is_flag=True, help="Import live hosts into inventory as they're found.")
+def scan(cidrs, exclude, processes, concurrency, timeout, profile, chunk, include_dead, output, import_):
+    """
+    Scan CIDRS outside the web workers, using a process pool.
+
+    The addresses (deduplicated, minus --exclude) are cut into --chunk
+    sized work units, interleaved across subnets, and each pool process
+    scans its units with its own event loop. Every result is written as one
+    NDJSON line as its unit completes; with --import, live hosts also go
+    through the same deduplicating import as POST /api/discovery/import.
+    DISCOVERY_RATE_* limits are split evenly between the processes.
+    """
+    from flask import current_app
+
+    from .services.discovery_import import import_hosts, import_row
+
+    global _worker_app
+    try:
+        targets = ScanTargets(cidrs, exclude)
+    except ValueError as exc:
+        raise click.BadParameter(str(exc)) from None
+
+    spans = _chunks(targets, max(1, chunk))
+    processes = max(1, min(processes or os.cpu_count() or 1, len(spans) or 1))
+    app = current_app._get_current_object()
+    _worker_app = app
+    _worker_opts.update(
+        concurrency=max(1, concurrency),
+        timeout=timeout,
+        include_dead=include_dead,
+        min_timeout=app.config.get("DISCOVERY_RTT_FLOOR", 0.05),
+        profile=profile or app.config.get("DISCOVERY_PROFILE", "standard"),
+    )
+    click.echo(
+        f"Scanning {targets.size()} addresses in {len(spans)} units on {processes} process(es)", err=True
+    )
+
+    t0 = time.monotonic()
+    done = alive = 0
+    pending: list[dict] = []
+    totals = {"imported": 0, "updated": 0, "unchanged": 0, "errors": 0}
+
+    def flush_import() -> None:
+        if not pending:
+            return
+        summary = import_hosts([import_row(h) for h in pending])
+        for key in ("imported", "updated", "unchanged"):
+            totals[key] += summary[key]
+        totals["errors"] += len(summary["errors"])
+        pending.clear()
+
+    # fork: workers inherit the configured app, port catalogue and signatures
+    ctx = multiprocessing.get_context("fork")
+    with ctx.Pool(processes, initializer=_init_worker, initargs=(1 / processes,)) as pool:
+        for hosts in pool.imap_unordered(_scan_span, spans):
+            for host in hosts:
+                output.write(json.dumps(host) + "\n")
+                if host.get("alive"):
+                    alive += 1
+                    if import_:
+                        pending.append(host)
+            output.flush()
+            done += 1
+            if len(pending) >= _IMPORT_BATCH:
+                flush_import()
+            click.echo(f"\r{done}/{len(spans)} units, {alive} alive", err=True, nl=False)
+    flush_import()
+
+    click.echo(f"\nDone in {time.monotonic() - t0:.1f}s: {alive} alive of {targets.size()}", err=True)
+    if import_:
+        click.echo(
+            f"Imported {totals['imported']}, updated {totals['updated']}, "
+            f"unchanged {totals['unchanged']}, errors {totals['errors']}",
+            err=True,
+        )
+    if totals["errors"]:
+        sys.exit(1)
+
+
+def register_cli(app) -> None:
+    app.cli.add_command(discovery_cli)
@@ -21,5 +21,108 @@ class Config:
     QDRANT_URL = os.environ.get("QDRANT_URL", "http://localhost:6333")
     QDRANT_COLLECTION = os.environ.get("QDRANT_COLLECTION", "homelab")
 
+    # Embeddings — "sentence-transformers" (PyTorch) or "onnx" (int8 ONNX,
+    # loaded from EMBEDDING_MODEL_DIR; build it with scripts/export_onnx_model.py)
+    EMBEDDING_BACKEND = os.environ.get("EMBEDDING_BACKEND", "sentence-transformers")
+    EMBEDDING_MODEL_DIR = os.environ.get("EMBEDDING_MODEL_DIR", "/app/models/all-MiniLM-L6-v2-onnx")
+    # Unix socket of the shared embedding worker; empty = load the model per process
+    EMBEDDING_SOCKET = os.environ.get("EMBEDDING_SOCKET", "")
+
+    # Metrics — emit a Server-Timing header with per-stage search latencies
+    SERVER_TIMING = os.environ.get("SERVER_TIMING", "").lower() in ("1", "true", "yes")
+
+    # Discovery jobs — hosts per committed chunk, idle poll interval, and how
+    # long a running job's heartbeat may lag before another worker resumes it
+    DISCOVERY_JOB_CHUNK = int(os.environ.get("DISCOVERY_JOB_CHUNK", 256))
+    DISCOVERY_JOB_POLL = float(os.environ.get("DISCOVERY_JOB_POLL", 2.0))
+    DISCOVERY_JOB_STALE = int(os.environ.get("DISCOVERY_JOB_STALE", 120))
+
+    # DNS — shared resolver used by discovery, health checks and import:
+    # worker threads, per-lookup deadline (s), positive/negative cache TTLs (s)
+    # and the cap on queued plus running lookups
+    DNS_THREADS = int(os.environ.get("DNS_THREADS", 32))
+    DNS_DEADLINE = float(os.environ.get("DNS_DEADLINE", 2.0))
+    DNS_POSITIVE_TTL = int(os.environ.get("DNS_POSITIVE_TTL", 3600))
+    DNS_NEGATIVE_TTL = int(os.environ.get("DNS_NEGATIVE_TTL", 300))
+    DNS_MAX_PENDING = int(os.environ.get("DNS_MAX_PENDING", 512))
+
+    # Discovery probes — floor (seconds) for adaptive per-host connect
+    # timeouts; the scan's own timeout is the ceiling
+    DISCOVERY_RTT_FLOOR = float(os.environ.get("DISCOVERY_RTT_FLOOR", 0.05))
+
+    # IPv6 discovery — most candidate addresses one scan probes; the rest
+    # are dropped and the response says so
+    DISCOVERY_V6_MAX_CANDIDATES = int(os.environ.get("DISCOVERY_V6_MAX_CANDIDATES", 4096))
+
+    # Discovery port catalogue — default profile (quick / standard / deep)
+    # and an optional JSON file extending the built-in ports and profiles
+    DISCOVERY_PROFILE = os.environ.get("DISCOVERY_PROFILE", "standard")
+    DISCOVERY_PORTS_FILE = os.environ.get("DISCOVERY_PORTS_FILE", "")
+
+    # Discovery fingerprinting — optional JSON file of extra host signatures,
+    # tried before the built-in ones
+    DISCOVERY_SIGNATURES_FILE = os.environ.get("DISCOVERY_SIGNATURES_FILE", "")
+
+    # Discovery result cache — seconds each field group stays fresh for
+    # mode=incremental rescans, and how long a host's last-known state is
+    # kept as the baseline for change reports
+    DISCOVERY_CACHE_TTL_ALIVE = int(os.environ.get("DISCOVERY_CACHE_TTL_ALIVE", 120))
+    DISCOVERY_CACHE_TTL_PORTS = int(os.environ.get("DISCOVERY_CACHE_TTL_PORTS", 1800))
+    DISCOVERY_CACHE_TTL_DNS = int(os.environ.get("DISCOVERY_CACHE_TTL_DNS", 86400))
+    DISCOVERY_CACHE_TTL_BANNERS = int(os.environ.get("DISCOVERY_CACHE_TTL_BANNERS", 86400))
+    DISCOVERY_CACHE_RETAIN = int(os.environ.get("DISCOVERY_CACHE_RETAIN", 7 * 86400))
+
+    # Discovery rate limits — probe packets/s and TCP connections/s across
+    # every scan (0 = unlimited), bucket size in seconds of traffic, and
+    # per-subnet limits as "cidr=pps/cps,..."; each of DISCOVERY_RATE_WORKERS
+    # processes (the gunicorn workers) enforces an equal share
+    DISCOVERY_RATE_PPS = float(os.environ.get("DISCOVERY_RATE_PPS", 0))
+    DISCOVERY_RATE_CPS = float(os.environ.get("DISCOVERY_RATE_CPS", 0))
+    DISCOVERY_RATE_BURST = float(os.environ.get("DISCOVERY_RATE_BURST", 0.25))
+    DISCOVERY_RATE_SUBNETS = os.environ.get("DISCOVERY_RATE_SUBNETS", "")
+    DISCOVERY_RATE_WORKERS = int(os.environ.get("DISCOVERY_RATE_WORKERS", os.environ.get("GUNICORN_WORKERS", 1)))
+
+    # MAC vendor database — compiled OUI file (scripts/build_oui_db.py);
+    # empty uses the bundled app/data/oui.bin
+    OUI_DB_PATH = os.environ.get("OUI_DB_PATH", "")
+
+    # Scheduled discovery — comma-separated CIDRs rescanned every INTERVAL
+    # seconds (empty disables the scheduler), the scan profile/concurrency/
+    # timeout, consecutive missed runs before a host is reported gone, and
+    # how many days of change events to keep
+    DISCOVERY_SCHEDULE_CIDRS = os.environ.get("DISCOVERY_SCHEDULE_CIDRS", "")
+    DISCOVERY_SCHEDULE_INTERVAL = int(os.environ.get("DISCOVERY_SCHEDULE_INTERVAL", 300))
+    DISCOVERY_SCHEDULE_PROFILE = os.environ.get("DISCOVERY_SCHEDULE_PROFILE", "standard")
+    DISCOVERY_SCHEDULE_CONCURRENCY = int(os.environ.get("DISCOVERY_SCHEDULE_CONCURRENCY", 256))
+    DISCOVERY_SCHEDULE_TIMEOUT = float(os.environ.get("DISCOVERY_SCHEDULE_TIMEOUT", 1.0))
+    DISCOVERY_SCHEDULE_MISSES = int(os.environ.get("DISCOVERY_SCHEDULE_MISSES", 2))
+    DISCOVERY_CHANGE_RETAIN_DAYS = int(os.environ.get("DISCOVERY_CHANGE_RETAIN_DAYS", 30))
+
+    # Health monitor — seconds between sweeps of every inventory IP and
+    # hostname (0 disables it), and how long a host's status stays in the
+    # cache before /api/health-check falls back to probing it live
+    HEALTH_MONITOR_INTERVAL = int(os.environ.get("HEALTH_MONITOR_INTERVAL", 30))
+    HEALTH_STATUS_TTL = int(os.environ.get("HEALTH_STATUS_TTL", 90))
+
+    # Health pings — per-probe timeout, time budget for a whole batch
+    # (DNS included), and concurrent probes per batch
+    HEALTH_PING_TIMEOUT = float(os.environ.get("HEALTH_PING_TIMEOUT", 1.0))
+    HEALTH_PING_BUDGET = float(os.environ.get("HEALTH_PING_BUDGET", 5.0))
+    HEALTH_PING_CONCURRENCY = int(os.environ.get("HEALTH_PING_CONCURRENCY", 256))
+
+    # Health history — directory of per-host ring buffer files (1m/1h/1d
+    # latency and up/down rollups, fixed size per host); empty disables it
+    HEALTH_HISTORY_DIR = os.environ.get("HEALTH_HISTORY_DIR", os.path.join(basedir, "..", "data", "health"))
+
+    # Live events — publish host up/down and inventory writes on Redis
+    # pub/sub for the /api/events SSE stream, and the streams each worker
+    # serves at once (each holds a gunicorn thread; by default half of
+    # GUNICORN_THREADS, leaving the rest for API requests)
+    EVENTS_ENABLED = os.environ.get("EVENTS_ENABLED", "true").lower() in ("1", "true", "yes")
+    EVENTS_MAX_CLIENTS = int(
+        os.environ.get("EVENTS_MAX_CLIENTS", max(1, int(os.environ.get("GUNICORN_THREADS", 8)) // 2))
+    )
+
     # Auth — Bearer token. Empty string means dev mode (no auth).
     API_TOKEN = os.environ.get("API_TOKEN", "")
+
@@ -8,6 +8,7 @@ from .share import Share
 from .network import Network, NetworkMember
 from .misc import Misc
 from .map_layout import MapLayout, MapEdge, Relationship
+from .discovery import DiscoveryChange, DiscoveredHost, DiscoveryJob, DiscoveryResult, DiscoverySubnet
 
 __all__ = [
     "db",
@@ -24,4 +25,9 @@ __all__ = [
     "MapLayout",
     "MapEdge",
     "Relationship",
+    "DiscoveryJob",
+    "DiscoveryResult",
+    "DiscoverySubnet",
+    "DiscoveredHost",
+    "DiscoveryChange",
 ]
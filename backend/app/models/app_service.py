@@ -22,4 +22,7 @@ class AppService(BaseMixin, db.Model):
             "NOT (hardware_id IS NOT NULL AND vm_id IS NOT NULL)",
             name="ck_apps_single_parent",
         ),
+        # Discovery import matches existing apps by IP and hostname
+        db.Index("ix_apps_ip_address", "ip_address"),
+        db.Index("ix_apps_hostname_lower", db.func.lower(hostname)),
     )
@@ -0,0 +1,149 @@
+import json
+from datetime import datetime, timezone
+
+from .base import db, BaseMixin
+
+
+def utcnow() -> datetime:
+    """Naive UTC timestamp, matching how DateTime columns round-trip."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class DiscoveryJob(BaseMixin, db.Model):
+    """A background subnet scan, processed in resumable chunks."""
+
+    __tablename__ = "discovery_jobs"
+
+    STATUSES = ("queued", "running", "done", "cancelled", "failed")
+    FINISHED = ("done", "cancelled", "failed")
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    cidr = db.Column(db.Text, nullable=False)
+    concurrency = db.Column(db.Integer, nullable=False)
+    timeout = db.Column(db.Float, nullable=False)
+    status = db.Column(db.Text, nullable=False, default="queued", index=True)
+    total_hosts = db.Column(db.Integer, nullable=False, default=0)
+    cursor = db.Column(db.Integer, nullable=False, default=0)  # hosts done, in network.hosts() order
+    alive_count = db.Column(db.Integer, nullable=False, default=0)
+    cancel_requested = db.Column(db.Boolean, nullable=False, default=False)
+    worker_id = db.Column(db.Text)
+    error = db.Column(db.Text)
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    results = db.relationship(
+        "DiscoveryResult", backref="job", lazy="dynamic", cascade="all, delete-orphan"
+    )
+
+    def eta_seconds(self):
+        if self.status != "running" or not self.started_at or not self.cursor:
+            return None
+        elapsed = ((self.heartbeat_at or utcnow()) - self.started_at).total_seconds()
+        return round(elapsed / self.cursor * (self.total_hosts - self.cursor), 1)
+
+    def to_dict(self) -> dict:
+        result = super().to_dict()
+        result["progress"] = round(self.cursor / self.total_hosts, 4) if self.total_hosts else 1.0
+        result["eta_seconds"] = self.eta_seconds()
+        return result
+
+
+class DiscoveryResult(db.Model):
+    """One probed host from a DiscoveryJob; data is the scan result dict as JSON."""
+
+    __tablename__ = "discovery_results"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    job_id = db.Column(
+        db.Integer, db.ForeignKey("discovery_jobs.id", ondelete="CASCADE"), nullable=False
+    )
+    ip = db.Column(db.Text, nullable=False)
+    alive = db.Column(db.Boolean, nullable=False, default=False)
+    data = db.Column(db.Text, nullable=False)  # JSON
+
+    __table_args__ = (
+        db.UniqueConstraint("job_id", "ip", name="uq_discovery_result_ip"),
+        db.Index("ix_discovery_results_job_alive", "job_id", "alive"),
+    )
+
+    def to_dict(self) -> dict:
+        return json.loads(self.data)
+
+
+class DiscoverySubnet(db.Model):
+    """Schedule state for one CIDR from DISCOVERY_SCHEDULE_CIDRS."""
+
+    __tablename__ = "discovery_subnets"
+
+    cidr = db.Column(db.Text, primary_key=True)
+    next_run_at = db.Column(db.DateTime, nullable=False)
+    last_started_at = db.Column(db.DateTime)
+    last_finished_at = db.Column(db.DateTime)
+    last_duration_ms = db.Column(db.Float)
+    last_alive = db.Column(db.Integer)
+    last_changes = db.Column(db.Integer)
+    last_error = db.Column(db.Text)
+    worker_id = db.Column(db.Text)  # set while a scheduler is scanning it
+    heartbeat_at = db.Column(db.DateTime)
+
+    def to_dict(self) -> dict:
+        result = {}
+        for col in self.__table__.columns:
+            val = getattr(self, col.name)
+            result[col.name] = val.isoformat() if isinstance(val, datetime) else val
+        return result
+
+
+class DiscoveredHost(db.Model):
+    """
+    Last known state of a host seen by scheduled discovery — the baseline
+    each run is diffed against. Rows are only written when something
+    changed (last_seen_at is bumped in bulk).
+    """
+
+    __tablename__ = "discovered_hosts"
+
+    ip = db.Column(db.Text, primary_key=True)
+    cidr = db.Column(db.Text, nullable=False, index=True)
+    alive = db.Column(db.Boolean, nullable=False, default=True)
+    misses = db.Column(db.Integer, nullable=False, default=0)  # consecutive runs not seen
+    mac_address = db.Column(db.Text)
+    hostname = db.Column(db.Text)
+    open_ports = db.Column(db.Text, nullable=False, default="[]")  # JSON list
+    fingerprint = db.Column(db.Text)
+    drift = db.Column(db.Text)  # last reported inventory drift, so it's reported once
+    first_seen_at = db.Column(db.DateTime, nullable=False, default=utcnow)
+    last_seen_at = db.Column(db.DateTime, nullable=False, default=utcnow)
+
+    def ports(self) -> list[int]:
+        return json.loads(self.open_ports or "[]")
+
+
+class DiscoveryChange(db.Model):
+    """One difference between consecutive scheduled scans of a subnet."""
+
+    __tablename__ = "discovery_changes"
+
+    KINDS = ("appeared", "disappeared", "ports_changed", "mac_changed", "ip_drift", "mac_drift")
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    cidr = db.Column(db.Text, nullable=False)
+    ip = db.Column(db.Text, nullable=False, index=True)
+    kind = db.Column(db.Text, nullable=False)
+    detail = db.Column(db.Text, nullable=False, default="{}")  # JSON
+    created_at = db.Column(db.DateTime, nullable=False, default=utcnow, index=True)
+
+    __table_args__ = (
+        db.Index("ix_discovery_changes_kind_id", "kind", "id"),
+    )
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "cidr": self.cidr,
+            "ip": self.ip,
+            "kind": self.kind,
+            "detail": json.loads(self.detail or "{}"),
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
@@ -13,3 +13,9 @@ class Misc(BaseMixin, db.Model):
     properties = db.Column(db.Text)  # JSON blob for arbitrary key-value pairs
     icon = db.Column(db.Text)
     notes = db.Column(db.Text)
+
+    # Discovery import matches existing hosts by IP and hostname
+    __table_args__ = (
+        db.Index("ix_misc_ip_address", "ip_address"),
+        db.Index("ix_misc_hostname_lower", db.func.lower(hostname)),
+    )
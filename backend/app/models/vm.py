@@ -1,3 +1,4 @@
+from ..services.oui import mac_vendor, normalize_mac
 from .base import db, BaseMixin
 
 
@@ -17,5 +18,23 @@ class VM(BaseMixin, db.Model):
     icon = db.Column(db.Text)
     notes = db.Column(db.Text)
 
+    # Discovery import matches existing hosts by IP, MAC and hostname
+    __table_args__ = (
+        db.Index("ix_vms_ip_address", "ip_address"),
+        db.Index("ix_vms_mac_address_lower", db.func.lower(mac_address)),
+        db.Index("ix_vms_hostname_lower", db.func.lower(hostname)),
+    )
+
     apps = db.relationship("AppService", backref="vm", lazy="select")
     storage_pools = db.relationship("Storage", backref="vm", lazy="select")
+
+    @db.validates("mac_address")
+    def _normalize_mac(self, key, value):
+        # Stored canonical (aa:bb:cc:dd:ee:ff) so lookups by MAC are exact; free text is kept as-is
+        return normalize_mac(value) or value
+
+    def to_dict(self) -> dict:
+        result = super().to_dict()
+        # Derived, not stored: the inventory import drops it again
+        result["mac_vendor"] = mac_vendor(self.mac_address)
+        return result
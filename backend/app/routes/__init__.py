@@ -15,6 +15,8 @@ def register_blueprints(app):
     from .search import bp as search_bp
     from .health_check import bp as health_check_bp
     from .discovery import bp as discovery_bp
+    from .metrics import bp as metrics_bp
+    from .events import bp as events_bp
 
     app.register_blueprint(documents_bp)
     app.register_blueprint(hardware_bp)
@@ -29,3 +31,5 @@ def register_blueprints(app):
     app.register_blueprint(search_bp)
     app.register_blueprint(health_check_bp)
     app.register_blueprint(discovery_bp)
+    app.register_blueprint(metrics_bp)
+    app.register_blueprint(events_bp)
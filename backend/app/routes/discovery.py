@@ -1,19 +1,33 @@
 """
 Discovery routes: subnet scan + bulk import.
 
-POST /api/discovery/scan   — scan a CIDR block
+POST /api/discovery/scan   — scan a CIDR block (optionally streamed as NDJSON/SSE)
+POST /api/discovery/jobs   — queue a background scan job
+GET  /api/discovery/jobs/<id>[/results] — job progress / persisted results
+POST /api/discovery/jobs/<id>/cancel    — stop a queued or running job
 POST /api/discovery/import — import selected hosts into inventory
+GET  /api/discovery/changes  — change feed from scheduled rescans
+GET  /api/discovery/schedule — scheduled subnets and their last run
+POST /api/discovery/schedule/run — rescan a scheduled subnet now
+GET  /api/discovery/ratelimit — probe rate limits and throttle counters
 """
 from __future__ import annotations
 
 import ipaddress
+import json
 import time
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, current_app, jsonify, request, stream_with_context
 
-from ..models import Hardware, AppService, Misc, db
-from ..services.discovery import scan_cidr
-from ..services.search import SearchService
+from ..models import DiscoveryChange, DiscoveryJob, DiscoveryResult, DiscoverySubnet, db
+from ..services.discovery import DEFAULT_CONCURRENCY, ScanTargets, iter_scan, scan_cidr
+from ..services.discovery_cache import HostCache
+from ..services.discovery_import import import_hosts as import_discovered
+from ..services.discovery_jobs import cancel_job, start_job_runner, submit_job
+from ..services.discovery_schedule import run_now, scheduled_cidrs
+from ..services.discovery_v6 import gather_candidates, inventory_addresses
+from ..services.ratelimit import get_limiter
+from ..services.probes import PROFILES
 
 try:
     from ..services.cache import cache as _cache
@@ -28,67 +42,328 @@ except Exception:
 
 bp = Blueprint("discovery", __name__, url_prefix="/api/discovery")
 
-# Map suggested_type → (model class, collection name)
-_TYPE_MAP = {
-    "hardware": (Hardware, "hardware"),
-    "apps": (AppService, "apps"),
-    "misc": (Misc, "misc"),
-}
+# Addresses one scan may cover, after dedup and exclusions (a /16's worth)
+MAX_SCAN_HOSTS = 65536
+
+
+def _str_list(value) -> list[str]:
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+        raise ValueError("expected a string or a list of strings")
+    return [v.strip() for v in value if v.strip()]
+
+
+def _parse_scan_request(data: dict):
+    """Validate a scan body → ((targets, concurrency, timeout), None) or (None, error response)."""
+    try:
+        cidrs = _str_list(data.get("cidr") or []) + _str_list(data.get("cidrs") or [])
+        exclude = _str_list(data.get("exclude") or [])
+    except ValueError as exc:
+        return None, (jsonify(error=f"'cidr', 'cidrs' and 'exclude': {exc}"), 400)
+
+    ipv6 = _flag(data.get("ipv6"))
+    if not cidrs and not ipv6:
+        return None, (jsonify(error="'cidr' is required"), 400)
+
+    # Validate CIDRs and exclusions
+    try:
+        targets = ScanTargets(cidrs, exclude)
+    except ValueError as exc:
+        return None, (jsonify(error=f"Invalid CIDR: {exc}"), 400)
+
+    if ipv6:
+        # cidrs only scope the candidate search (see _ipv6_targets), so any size is fine
+        if any(":" not in cidr for cidr in targets.cidrs):
+            return None, (jsonify(error="IPv6 discovery takes IPv6 prefixes only"), 400)
+    elif targets.size() > MAX_SCAN_HOSTS:
+        return None, (jsonify(error=f"Too many addresses: {targets.size()} (max {MAX_SCAN_HOSTS}, a /16)"), 400)
+
+    concurrency = max(1, min(int(data.get("concurrency", DEFAULT_CONCURRENCY)), 4096))
+    timeout = float(data.get("timeout", 1.0))
+    return (targets, concurrency, timeout), None
+
+
+def _flag(value) -> bool:
+    return value in (True, "true", 1, "1")
+
+
+def _ipv6_targets(data: dict, scope: list[str], timeout: float):
+    """
+    Candidate addresses for an IPv6 scan → (ScanTargets of /128s, seed
+    counts, candidates per scope prefix, warning or None).
+
+    Seeded from the neighbor cache, all-nodes multicast echo and inventory
+    (services/discovery_v6.py), limited to *scope* prefixes if any. Past
+    DISCOVERY_V6_MAX_CANDIDATES the addresses seen by the fewest sources
+    are dropped, and the warning says how many.
+    """
+    found = gather_candidates(
+        scope,
+        interfaces=_str_list(data.get("interfaces") or []) or None,
+        timeout=timeout,
+        inventory=inventory_addresses(),
+    )
+    seeds = {"candidates": len(found)}
+    for sources in found.values():
+        for source in sources:
+            seeds[source] = seeds.get(source, 0) + 1
+    limit = current_app.config.get("DISCOVERY_V6_MAX_CANDIDATES", 4096)
+    warning = None
+    keep = sorted(found, key=lambda ip: (-len(found[ip]), ipaddress.ip_address(ip)))
+    if len(keep) > limit:
+        warning = (
+            f"{len(keep)} IPv6 candidates, only {limit} probed; "
+            "narrow 'cidr' or 'interfaces' to scan the rest"
+        )
+        keep = keep[:limit]
+    # Sorted up front so ScanTargets claims each /128 at the end of its span list
+    keep.sort(key=ipaddress.ip_address)
+    targets = ScanTargets([f"{ip}/128" for ip in keep], _str_list(data.get("exclude") or []))
+
+    networks = [ipaddress.ip_network(p) for p in scope] or [ipaddress.ip_network("::/0")]
+    subnets = {str(n): 0 for n in networks}
+    for _, ranges in targets.subnets:
+        for r in ranges:
+            addr = ipaddress.ip_address(r.start)
+            home = next(n for n in networks if addr in n)
+            subnets[str(home)] += 1
+    return targets, seeds, subnets, warning
+
+
+def _stream_format(data: dict):
+    """Pick a streaming format from the body's `stream` flag or the Accept header."""
+    accept = request.headers.get("Accept", "")
+    if "text/event-stream" in accept or data.get("stream") == "sse":
+        return "sse"
+    if "application/x-ndjson" in accept or data.get("stream") in (True, "ndjson"):
+        return "ndjson"
+    return None
 
 
 @bp.route("/scan", methods=["POST"])
 def scan():
     """
-    Scan a CIDR block and return fingerprinted host list.
+    Scan one or more CIDR blocks and return fingerprinted host list.
 
     Request body:
-      { cidr: str, concurrency?: int, timeout?: float }
+      { cidr: str, cidrs?: [str], exclude?: [str], ipv6?: bool,
+        interfaces?: [str], concurrency?: int, timeout?: float, min_timeout?: float,
+        include_dead?: bool, mode?: "full" | "incremental",
+        profile?: "quick" | "standard" | "deep" | <custom>,
+        stream?: bool | "ndjson" | "sse" }
+
+    cidr and cidrs may be combined (either may be a string or a list).
+    Overlapping addresses are scanned once and exclude (CIDRs or IPs) is
+    skipped; the subnets are interleaved and share one concurrency budget.
+
+    ipv6=true probes only the IPv6 addresses known to be in use (neighbor
+    cache, all-nodes multicast echo on each interface or the given
+    interfaces, inventory) instead of walking the range; cidr/cidrs are
+    optional and only scope the result. The response adds
+    seeds = {candidates, neighbors, multicast, derived, inventory}.
+
+    timeout is the ceiling for every probe; port connects to a host whose
+    RTT is known use an adaptive timeout no lower than min_timeout.
+    profile picks the port set (default DISCOVERY_PROFILE); each host's
+    per-port plugin output is returned under host.probes.
 
     Response:
-      { hosts: [...], total: int, alive: int, duration_ms: float }
+      { hosts: [...], total: int, alive: int, duration_ms: float,
+        subnets: {cidr: addresses scanned} }
+
+    mode="incremental" reuses cached per-host fields that are still fresh,
+    re-probes the rest, and adds host.change = {status, ports_opened,
+    ports_closed} plus a top-level changes = {new, gone, changed} count.
+    Hosts that went away are reported even with include_dead=false.
+
+    Streaming (stream=true / Accept: application/x-ndjson, or
+    stream="sse" / Accept: text/event-stream) emits one record per host as
+    soon as its probe completes, bracketed by start and summary records:
+      {"type": "start", "cidr": str, "subnets": {...}, "total": int}
+      {"type": "host", "host": {...}}
+      {"type": "summary", "total": int, "alive": int, "duration_ms": float, changes?: {...}}
     """
     data = request.get_json(silent=True) or {}
-    cidr = data.get("cidr", "").strip()
-
-    if not cidr:
-        return jsonify(error="'cidr' is required"), 400
+    params, error = _parse_scan_request(data)
+    if error:
+        return error
+    targets, concurrency, timeout = params
+    # include_dead=false keeps /16 responses (and server memory) proportional to live hosts
+    include_dead = data.get("include_dead", True) not in (False, "false", 0, "0")
+    mode = data.get("mode", "full")
+    if mode not in ("full", "incremental"):
+        return jsonify(error="'mode' must be 'full' or 'incremental'"), 400
+    incremental = mode == "incremental"
+    profile = data.get("profile") or current_app.config.get("DISCOVERY_PROFILE", "standard")
+    if profile not in PROFILES:
+        return jsonify(error=f"'profile' must be one of {', '.join(PROFILES)}"), 400
+    min_timeout = float(data.get("min_timeout", current_app.config.get("DISCOVERY_RTT_FLOOR", 0.05)))
+    opts = dict(
+        concurrency=concurrency,
+        timeout=timeout,
+        include_dead=include_dead,
+        cache=HostCache.from_app(current_app),
+        incremental=incremental,
+        min_timeout=max(0.001, min(min_timeout, timeout)),
+        profile=profile,
+    )
 
-    # Validate CIDR
-    try:
-        network = ipaddress.ip_network(cidr, strict=False)
-    except ValueError as exc:
-        return jsonify(error=f"Invalid CIDR: {exc}"), 400
+    extra = {}
+    if _flag(data.get("ipv6")):
+        targets, extra["seeds"], subnets, warning = _ipv6_targets(data, targets.cidrs, timeout)
+        if warning:
+            extra["warning"] = warning
+    else:
+        subnets = targets.counts()
 
-    if network.prefixlen < 16:
-        return jsonify(error="Prefix length must be >= 16 (max 65535 hosts)"), 400
-
-    concurrency = int(data.get("concurrency", 50))
-    timeout = float(data.get("timeout", 1.0))
+    fmt = _stream_format(data)
+    if fmt:
+        return _stream_scan(targets, subnets, opts, fmt, extra)
 
     t0 = time.monotonic()
-    hosts = scan_cidr(cidr, concurrency=concurrency, timeout=timeout)
+    hosts = scan_cidr(targets, **opts)
     duration_ms = round((time.monotonic() - t0) * 1000, 1)
 
     alive_count = sum(1 for h in hosts if h.get("alive"))
+    if incremental:
+        extra["changes"] = _count_changes(hosts)
 
     return jsonify(
         hosts=hosts,
-        total=len(hosts),
+        total=targets.size(),
         alive=alive_count,
         duration_ms=duration_ms,
+        subnets=subnets,
+        **extra,
+    )
+
+
+def _count_changes(hosts) -> dict:
+    counts = {"new": 0, "gone": 0, "changed": 0}
+    for host in hosts:
+        status = host.get("change", {}).get("status")
+        if status in counts:
+            counts[status] += 1
+    return counts
+
+
+def _stream_scan(targets: ScanTargets, subnets: dict, opts: dict, fmt: str, extra: dict) -> Response:
+    def encode(record: dict) -> str:
+        if fmt == "sse":
+            return f"event: {record['type']}\ndata: {json.dumps(record)}\n\n"
+        return json.dumps(record) + "\n"
+
+    def generate():
+        t0 = time.monotonic()
+        total = targets.size()
+        yield encode({"type": "start", "cidr": ",".join(subnets), "subnets": subnets, "total": total, **extra})
+
+        alive = 0
+        changes = {"new": 0, "gone": 0, "changed": 0}
+        for host in iter_scan(targets, **opts):
+            alive += bool(host.get("alive"))
+            status = host.get("change", {}).get("status")
+            if status in changes:
+                changes[status] += 1
+            yield encode({"type": "host", "host": host})
+
+        summary = {
+            "type": "summary",
+            "total": total,
+            "alive": alive,
+            "duration_ms": round((time.monotonic() - t0) * 1000, 1),
+        }
+        if opts["incremental"]:
+            summary["changes"] = changes
+        yield encode(summary)
+
+    mimetype = "text/event-stream" if fmt == "sse" else "application/x-ndjson"
+    return Response(
+        stream_with_context(generate()),
+        mimetype=mimetype,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
+@bp.route("/jobs", methods=["POST"])
+def create_job():
+    """
+    Queue a background scan. Same body as /scan, but for a single cidr
+    without exclusions; returns 202 with the job.
+
+    Results are persisted chunk by chunk, so the scan survives browser
+    refreshes and worker restarts.
+    """
+    data = request.get_json(silent=True) or {}
+    params, error = _parse_scan_request(data)
+    if error:
+        return error
+    targets, concurrency, timeout = params
+    if len(targets.subnets) != 1 or data.get("exclude") or _flag(data.get("ipv6")):
+        return jsonify(error="Jobs scan a single 'cidr' without exclusions"), 400
+    cidr = targets.cidrs[0]
+
+    start_job_runner(current_app._get_current_object())
+    job = submit_job(cidr, concurrency=concurrency, timeout=timeout)
+    return jsonify(data=job.to_dict()), 202
+
+
+@bp.route("/jobs", methods=["GET"])
+def list_jobs():
+    limit = min(int(request.args.get("limit", 20)), 100)
+    jobs = DiscoveryJob.query.order_by(DiscoveryJob.id.desc()).limit(limit).all()
+    return jsonify(data=[j.to_dict() for j in jobs], count=len(jobs))
+
+
+@bp.route("/jobs/<int:job_id>", methods=["GET"])
+def get_job(job_id):
+    """Progress: status, cursor/total_hosts, progress, alive_count, eta_seconds."""
+    job = db.get_or_404(DiscoveryJob, job_id)
+    return jsonify(data=job.to_dict())
+
+
+@bp.route("/jobs/<int:job_id>/results", methods=["GET"])
+def get_job_results(job_id):
+    """Persisted host results; ?alive=1 for live hosts only, paged by offset/limit."""
+    db.get_or_404(DiscoveryJob, job_id)
+    offset = max(int(request.args.get("offset", 0)), 0)
+    limit = min(int(request.args.get("limit", 500)), 5000)
+
+    query = DiscoveryResult.query.filter_by(job_id=job_id)
+    if request.args.get("alive", "").lower() in ("1", "true", "yes"):
+        query = query.filter_by(alive=True)
+    total = query.count()
+    rows = query.order_by(DiscoveryResult.id).offset(offset).limit(limit).all()
+    return jsonify(hosts=[r.to_dict() for r in rows], total=total, offset=offset, count=len(rows))
+
+
+@bp.route("/jobs/<int:job_id>/cancel", methods=["POST"])
+def cancel(job_id):
+    job = db.get_or_404(DiscoveryJob, job_id)
+    if job.status in DiscoveryJob.FINISHED:
+        return jsonify(error=f"Job already {job.status}"), 409
+    cancel_job(job)
+    return jsonify(data=job.to_dict())
+
+
 @bp.route("/import", methods=["POST"])
 def import_hosts():
     """
     Import a list of discovered hosts into the appropriate inventory tables.
 
     Request body:
-      { hosts: [{ ip, type, name, hostname?, notes? }] }
+      { hosts: [{ ip, type, name, hostname?, mac_address?, notes? }] }
+
+    Hosts that already exist (same MAC, IP or hostname) are merged into
+    the existing entity instead of duplicated; see
+    services/discovery_import.py. Hosts without a hostname get their PTR
+    name from the shared resolver (usually a cache hit from the scan that
+    found them).
 
     Response:
-      { imported: int, by_type: {...}, errors: [...] }
+      { imported: int, updated: int, unchanged: int, by_type: {...},
+        hosts: [{ip, type, id, action}], errors: [...] }
     """
     data = request.get_json(silent=True) or {}
     hosts = data.get("hosts", [])
@@ -96,49 +371,92 @@ def import_hosts():
     if not hosts:
         return jsonify(error="'hosts' list is required"), 400
 
-    imported = 0
-    by_type: dict[str, int] = {}
-    errors: list[dict] = []
+    try:
+        summary = import_discovered(hosts)
+    except Exception as exc:
+        return jsonify(error=f"Commit failed: {exc}"), 500
 
-    for host in hosts:
-        ip = host.get("ip", "")
-        entity_type = host.get("type", "misc")
-        name = host.get("name") or ip
-        hostname = host.get("hostname") or host.get("ip", "")
-        notes = host.get("notes", "")
+    if summary["imported"] or summary["updated"]:
+        _invalidate_graph_cache()
 
-        model_class, collection = _TYPE_MAP.get(entity_type, (Misc, "misc"))
+    return jsonify(**summary)
 
-        try:
-            item = model_class()
-            item.update_from_dict(
-                {
-                    "name": name,
-                    "hostname": hostname,
-                    "ip_address": ip,
-                    "notes": notes,
-                }
-            )
-            db.session.add(item)
-            db.session.flush()  # get the ID before commit
-
-            SearchService.upsert(collection, item.id, item.to_dict())
-
-            imported += 1
-            by_type[entity_type] = by_type.get(entity_type, 0) + 1
-
-        except Exception as exc:
-            db.session.rollback()
-            errors.append({"ip": ip, "error": str(exc)})
-            continue
 
+@bp.route("/changes", methods=["GET"])
+def list_changes():
+    """
+    Differences recorded by scheduled discovery, newest first.
+
+    Query: kind, cidr, ip filters; limit (default 100, max 1000); and a
+    keyset cursor — before=<id> for older pages (pass back next_cursor),
+    or after=<id> for everything newer than an id you've seen, oldest
+    first (for polling).
+
+    Response: { data: [{id, cidr, ip, kind, detail, created_at}], count, next_cursor }
+    """
     try:
-        db.session.commit()
-    except Exception as exc:
-        db.session.rollback()
-        return jsonify(error=f"Commit failed: {exc}"), 500
+        limit = min(max(int(request.args.get("limit", 100)), 1), 1000)
+        after = request.args.get("after", type=int)
+        before = request.args.get("before", type=int)
+    except ValueError:
+        return jsonify(error="'limit' must be an integer"), 400
+
+    kind = request.args.get("kind")
+    if kind and kind not in DiscoveryChange.KINDS:
+        return jsonify(error=f"Unknown kind (expected one of: {', '.join(DiscoveryChange.KINDS)})"), 400
+
+    query = DiscoveryChange.query
+    if kind:
+        query = query.filter_by(kind=kind)
+    for arg in ("cidr", "ip"):
+        if request.args.get(arg):
+            query = query.filter_by(**{arg: request.args[arg]})
+
+    if after is not None:
+        query = query.filter(DiscoveryChange.id > after).order_by(DiscoveryChange.id)
+    else:
+        if before is not None:
+            query = query.filter(DiscoveryChange.id < before)
+        query = query.order_by(DiscoveryChange.id.desc())
+
+    rows = query.limit(limit + 1).all()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = rows[-1].id if more else None
+    return jsonify(data=[r.to_dict() for r in rows], count=len(rows), next_cursor=next_cursor)
+
+
+@bp.route("/schedule", methods=["GET"])
+def get_schedule():
+    """Configured subnets with their next run and last run's stats."""
+    cidrs = scheduled_cidrs(current_app)
+    subnets = {s.cidr: s for s in DiscoverySubnet.query.filter(DiscoverySubnet.cidr.in_(cidrs))} if cidrs else {}
+    data = [subnets[c].to_dict() if c in subnets else {"cidr": c, "next_run_at": None} for c in cidrs]
+    return jsonify(
+        data=data,
+        count=len(data),
+        interval=current_app.config.get("DISCOVERY_SCHEDULE_INTERVAL", 300),
+    )
 
-    if imported:
-        _invalidate_graph_cache()
 
-    return jsonify(imported=imported, by_type=by_type, errors=errors)
+@bp.route("/schedule/run", methods=["POST"])
+def run_schedule():
+    """Make a scheduled subnet due now. Body: { cidr }"""
+    cidr = (request.get_json(silent=True) or {}).get("cidr", "")
+    if cidr not in scheduled_cidrs(current_app):
+        return jsonify(error="'cidr' is not a scheduled subnet"), 400
+    subnet = run_now(cidr)
+    if subnet is None:
+        return jsonify(error="Subnet has not been scheduled yet"), 409
+    return jsonify(data=subnet.to_dict()), 202
+
+
+@bp.route("/ratelimit", methods=["GET"])
+def ratelimit_stats():
+    """
+    Configured probe rate limits and how often they throttled, globally and
+    per subnet: {rate, burst, granted, throttled, wait_total_s, wait_max_s}
+    for packets and connections (null where unlimited). Counters are per
+    process since it started.
+    """
+    return jsonify(data=get_limiter().stats())
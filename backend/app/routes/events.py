@@ -0,0 +1,35 @@
+"""
+Live event stream.
+
+GET /api/events — Server-Sent Events: host up/down transitions and
+inventory writes, from every worker (see services/events.py)
+
+The stream holds one gunicorn thread per open client, so each worker
+serves at most EVENTS_MAX_CLIENTS of them and answers 503 with
+Retry-After beyond that; size GUNICORN_THREADS for the dashboards
+expected.
+"""
+from flask import Blueprint, Response, current_app, jsonify
+
+from ..services.events import get_bus, sse_stream
+
+bp = Blueprint("events", __name__, url_prefix="/api/events")
+
+
+@bp.route("", methods=["GET"])
+def stream_events():
+    bus = get_bus()
+    if bus is None:
+        return jsonify(error="Live events are disabled (EVENTS_ENABLED)"), 404
+    q = bus.subscribe(limit=current_app.config.get("EVENTS_MAX_CLIENTS"))
+    if q is None:
+        return jsonify(error="Too many live event clients on this worker; retry later"), 503, {"Retry-After": "30"}
+    # No stream_with_context: the stream outlives the request and needs no app state
+    response = Response(
+        sse_stream(bus, q),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    # Also covers a client gone before the stream's first read (its finally never runs)
+    response.call_on_close(lambda: bus.unsubscribe(q))
+    return response
@@ -3,19 +3,23 @@ Host health/ping endpoints.
 
 GET  /api/health-check?hosts=192.168.1.1,192.168.1.2
 POST /api/health-check  { "hosts": ["192.168.1.1", "myhost.local"] }
+GET  /api/health-check/monitor
+GET  /api/health-check/history?host=192.168.1.10&range=24h
 
-Results are cached in Redis for 60 seconds.
+Inventory hosts are answered from the status cache the background
+monitor keeps (services/health_monitor.py); any other host is probed
+live and its result cached for HEALTH_STATUS_TTL seconds.
 """
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
 
-from ..services.cache import cache
-from ..services.health import ping_hosts
+from ..services.health_history import get_history, parse_range
+from ..services.health_monitor import StatusCache, check_hosts, ping_options
 
 bp = Blueprint("health_check", __name__, url_prefix="/api/health-check")
 
 
 def _do_ping(hosts: list[str]):
-    results = ping_hosts(hosts)
+    results = check_hosts(hosts, StatusCache.from_app(current_app), **ping_options(current_app))
     return jsonify(data=results, count=len(results))
 
 
@@ -35,3 +39,33 @@ def ping_post():
     if not hosts:
         return jsonify(error="hosts array required"), 400
     return _do_ping(hosts)
+
+
+@bp.route("/monitor", methods=["GET"])
+def monitor_status():
+    """Monitor settings and the most recent sweep (any worker's)."""
+    status = StatusCache.from_app(current_app)
+    return jsonify(data={
+        "interval": current_app.config.get("HEALTH_MONITOR_INTERVAL", 30),
+        "status_ttl": current_app.config.get("HEALTH_STATUS_TTL", 90),
+        "last_sweep": status.last_sweep() if status is not None else None,
+    })
+
+
+@bp.route("/history", methods=["GET"])
+def history():
+    """A host's latency and up/down series, at the finest resolution that covers the range."""
+    host = request.args.get("host", "").strip()
+    if not host:
+        return jsonify(error="host parameter required"), 400
+    try:
+        seconds = parse_range(request.args.get("range", "24h"))
+    except ValueError as exc:
+        return jsonify(error=str(exc)), 400
+    store = get_history()
+    if store is None:
+        return jsonify(error="Health history is disabled (HEALTH_HISTORY_DIR)"), 404
+    series = store.series(host, seconds)
+    if series is None:
+        return jsonify(error=f"No history for {host}"), 404
+    return jsonify(data=series, count=len(series["points"]))
@@ -85,6 +85,8 @@ def import_database():
             item_copy.pop('id', None)
             item_copy.pop('created_at', None)
             item_copy.pop('updated_at', None)
+            # Derived from mac_address on read
+            item_copy.pop('mac_vendor', None)
             # Remove nested relationships (they'll be imported separately)
             item_copy.pop('shares', None)
             return item_copy
@@ -0,0 +1,21 @@
+"""
+Metrics endpoint.
+
+GET /api/metrics                   — JSON snapshot of stage latency histograms
+GET /api/metrics?format=prometheus — same data in Prometheus text format
+
+Histograms are per-process: with several gunicorn workers each one
+reports only the requests it served.
+"""
+from flask import Blueprint, Response, jsonify, request
+
+from ..services import metrics
+
+bp = Blueprint("metrics", __name__, url_prefix="/api/metrics")
+
+
+@bp.route("", methods=["GET"])
+def get_metrics():
+    if request.args.get("format") == "prometheus":
+        return Response(metrics.render_prometheus(), mimetype="text/plain; version=0.0.4")
+    return jsonify(data=metrics.snapshot())
@@ -1,9 +1,14 @@
 """
 Semantic search endpoint backed by Qdrant.
 
-GET /api/search?q=<query>[&limit=20]
+GET /api/search?q=<query>[&limit=20][&types=hardware,vms][&expand=1]
 
 Returns ranked results with entity_type, entity_id, name, and score.
+`types` restricts hits to the given entity types (filtered inside Qdrant).
+`expand=1` attaches the full entity dict to each hit as `entity`, loaded
+with one query per entity type instead of one request per hit.
+When SERVER_TIMING is enabled the response carries a Server-Timing header
+with per-stage durations (encode, vector_search, hydrate, serialize).
 Falls back gracefully if Qdrant is unavailable.
 
 POST /api/search/index
@@ -11,12 +16,15 @@ POST /api/search/index
 One-time (idempotent) backfill of all existing entities into Qdrant.
 Returns { indexed, by_type, errors, status }.
 """
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
 
-from ..services.search import SearchService
+from ..services.metrics import server_timing_header, timed
+from ..services.search import ENTITY_MODELS, SearchService
 
 bp = Blueprint("search", __name__, url_prefix="/api/search")
 
+_TRUTHY = {"1", "true", "yes", "on"}
+
 
 @bp.route("", methods=["GET"])
 def semantic_search():
@@ -25,31 +33,31 @@ def semantic_search():
         return jsonify(data=[], count=0)
 
     limit = min(int(request.args.get("limit", 20)), 100)
-    results = SearchService.query(q, limit=limit)
-    return jsonify(data=results, count=len(results))
+
+    raw_types = request.args.get("types", "")
+    entity_types = [t.strip() for t in raw_types.split(",") if t.strip()]
+    unknown = [t for t in entity_types if t not in ENTITY_MODELS]
+    if unknown:
+        return jsonify(error=f"Unknown entity type(s): {', '.join(unknown)}"), 400
+
+    results = SearchService.query(q, limit=limit, entity_types=entity_types or None)
+    if request.args.get("expand", "").lower() in _TRUTHY:
+        results = SearchService.hydrate(results)
+    with timed("search.query.serialize"):
+        response = jsonify(data=results, count=len(results))
+    if current_app.config.get("SERVER_TIMING"):
+        response.headers["Server-Timing"] = server_timing_header()
+    return response
 
 
 @bp.route("/index", methods=["POST"])
 def index_all():
     """Backfill all existing entities into Qdrant (idempotent)."""
-    from ..models import Hardware, VM, AppService, Storage, Share, Network, Misc, Document
-
-    entity_map = {
-        "hardware": Hardware,
-        "vms": VM,
-        "apps": AppService,
-        "storage": Storage,
-        "networks": Network,
-        "misc": Misc,
-        "shares": Share,
-        "documents": Document,
-    }
-
     indexed = 0
     by_type = {}
     errors = []
 
-    for entity_type, model in entity_map.items():
+    for entity_type, model in ENTITY_MODELS.items():
         count = 0
         try:
             items = model.query.all()
@@ -1,259 +1,932 @@
 """
 Subnet auto-discovery service.
 
-All stdlib — no new pip dependencies.
-Reuses ping_host() from health.py.
+asyncio engine on one event loop under a global connection semaphore.
+Each host goes through two phases:
+
+  1. Sweep — is it alive? Kernel ARP table, an ICMP echo and TCP knocks
+     on a few SWEEP_PORTS.
+  2. Probe — live hosts only: a connect to every port in the scan's
+     profile, each open port's probe plugins (probes.py) on that same
+     connection, and reverse DNS, all concurrently.
+
+Hosts are pulled lazily from the range into a bounded window, so a /16
+runs in flat memory, and on sparse ranges the expensive phase scales with
+live hosts, not address-space size. Results are held as compact
+HostResult records (integer IP, port bitmask) until serialization.
+Reverse DNS goes through the shared resolver (resolver.py): cached, and
+bounded by a deadline so a hung PTR server can't stall the scan.
+
+Hosts are labelled by the compiled signature engine (signatures.py)
+from their ports, HTTP title/Server header, banners and MAC address, and
+the MAC's vendor is looked up in the OUI database (oui.py).
+
+Every ICMP echo and TCP connect passes the process-wide rate limiter
+(ratelimit.py), so concurrent scans share one packets/s and
+connections/s budget, globally and per subnet.
+
+Given a HostCache (discovery_cache), results are written through per IP;
+incremental scans re-probe only the field groups whose TTL has expired
+and report what changed.
+
+Uses icmplib (already a dependency for health checks) and the stdlib.
 """
 from __future__ import annotations
 
+import asyncio
+import bisect
+import heapq
 import ipaddress
-import socket
+import itertools
+import logging
+import queue
+import ssl
+import threading
 import time
-import urllib.request
-import urllib.error
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from html.parser import HTMLParser
-from typing import Optional
-
-from .health import ping_host
+from typing import AsyncIterator, Iterable, Iterator, Optional
+
+from .discovery_cache import diff
+from .discovery_v6 import neighbors
+from .probes import (
+    CATALOGUE,
+    DEFAULT_PROFILE,
+    HTTP_TITLE_ORDER,
+    PROBES,
+    PROFILES,
+    SSL_CTX,
+    ProbeContext,
+    mask_to_ports,
+    ports_to_mask,
+    profile_ports,
+)
+from .oui import mac_vendor
+from .ratelimit import get_limiter
+from .resolver import get_resolver
+from .signatures import HostFeatures, get_engine
+
+logger = logging.getLogger(__name__)
 
 # ---------------------------------------------------------------------------
-# Port catalogue
+# Port catalogue (see probes.py for the full catalogue, profiles and plugins)
 # ---------------------------------------------------------------------------
 
-KNOWN_PORTS: dict[int, str] = {
-    22: "SSH",
-    80: "HTTP",
-    443: "HTTPS",
-    3306: "MySQL",
-    5432: "PostgreSQL",
-    5900: "VNC",
-    6443: "Kubernetes",
-    8006: "Proxmox",
-    8080: "HTTP-alt",
-    8443: "HTTPS-alt",
-    9090: "Cockpit",
-    9100: "Node Exporter",
-}
+KNOWN_PORTS: dict[int, str] = {p: CATALOGUE[p].service for p in PROFILES[DEFAULT_PROFILE]}
 
 HTTP_PORTS = {80, 443, 8006, 8080, 8443, 9090}
 
+# Plugin fields fed to the signature engine's banner patterns
+_BANNER_FIELDS = ("banner", "mysql_version", "redis_version")
+
+# TCP ports knocked during the liveness sweep (open *or* refused = alive)
+SWEEP_PORTS = (22, 80, 443)
+
+# Max simultaneously open sockets across a scan (enough for a /24 in one wave)
+DEFAULT_CONCURRENCY = 512
+
+# Lower bound for adaptive per-host connect timeouts (the scan timeout is the upper)
+DEFAULT_MIN_TIMEOUT = 0.05
+
+# Hosts in flight per unit of concurrency; more are pulled only as these finish
+_WINDOW_FACTOR = 2
+# Hosts per batched cache read/write when a HostCache is in use
+_CACHE_BATCH = 256
+# Results buffered between the scan thread and an iter_scan() consumer
+_HANDOFF_QUEUE = 1024
+
+
 
 # ---------------------------------------------------------------------------
 # Internal helpers
 # ---------------------------------------------------------------------------
 
-class _TitleParser(HTMLParser):
-    """Minimal HTML parser that extracts the <title> text."""
+async def _close(writer: asyncio.StreamWriter) -> None:
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except (OSError, ssl.SSLError):
+        pass
 
-    def __init__(self) -> None:
-        super().__init__()
-        self._in_title = False
-        self.title: Optional[str] = None
 
-    def handle_starttag(self, tag: str, attrs: list) -> None:
-        if tag.lower() == "title":
-            self._in_title = True
+class RttEstimator:
+    """
+    Per-host adaptive probe timeout, the way TCP (RFC 6298) and nmap do it.
 
-    def handle_endtag(self, tag: str) -> None:
-        if tag.lower() == "title":
-            self._in_title = False
+    Seeded with the sweep's round-trip time, refined by every connect that
+    completes or is refused; timeout() is srtt + multiplier × rttvar,
+    clamped to [floor, ceiling]. A filtered port on a 0.3 ms LAN host is
+    then given up on after *floor*, not after the full scan timeout.
+    """
 
-    def handle_data(self, data: str) -> None:
-        if self._in_title and self.title is None:
-            self.title = data.strip()
+    __slots__ = ("srtt", "rttvar", "floor", "ceiling", "multiplier")
 
+    def __init__(self, first_rtt: float, floor: float, ceiling: float, multiplier: float = 4.0) -> None:
+        self.srtt = first_rtt
+        self.rttvar = first_rtt / 2
+        self.floor = floor
+        self.ceiling = ceiling
+        self.multiplier = multiplier
 
-def _tcp_connect(ip: str, port: int, timeout: float) -> bool:
-    """Return True if a TCP connection succeeds."""
-    try:
-        with socket.create_connection((ip, port), timeout=timeout):
-            return True
-    except OSError:
-        return False
+    def sample(self, rtt: float) -> None:
+        err = rtt - self.srtt
+        self.srtt += err / 8
+        self.rttvar += (abs(err) - self.rttvar) / 4
 
+    def timeout(self) -> float:
+        return min(self.ceiling, max(self.floor, self.srtt + self.multiplier * self.rttvar))
 
-def _grab_ssh_banner(ip: str, timeout: float) -> Optional[str]:
-    """Read the SSH identification string from port 22."""
-    try:
-        with socket.create_connection((ip, 22), timeout=timeout) as s:
-            banner = s.recv(256)
-            return banner.decode("ascii", errors="replace").strip()
-    except OSError:
-        return None
 
+async def _probe_port(
+    ip: str,
+    port: int,
+    timeout: float,
+    sem: asyncio.Semaphore,
+    rtt: Optional[RttEstimator] = None,
+    plugins: bool = True,
+) -> Optional[dict]:
+    """
+    Connect to *port*; None if it's closed, else the fields its probe
+    plugins read (``{}`` if it has none, or *plugins* is False).
+
+    Plugins run on the connection the port check opened — TLS upgrade and
+    certificate first for TLS ports, then the port's probe — so an open
+    port costs one connection, not one per plugin. The semaphore is held
+    for the connection's whole lifetime; the rate limiter is waited on
+    once the semaphore is held, before the connect is timed.
+
+    With an *rtt* estimator the connect is bounded by its adaptive timeout
+    (taken once the socket budget admits us, so queueing doesn't count)
+    and the handshake — or the RST of a closed port — feeds it a sample.
+    Plugins get the full *timeout*: they wait on the server, not the network.
+    """
+    spec = CATALOGUE.get(port)
+    loop = asyncio.get_running_loop()
+    async with sem:
+        await get_limiter().acquire(ip, connections=1)
+        start = loop.time()
+        try:
+            reader, writer = await asyncio.wait_for(
+                asyncio.open_connection(ip, port), rtt.timeout() if rtt else timeout
+            )
+        except ConnectionRefusedError:
+            if rtt:
+                rtt.sample(loop.time() - start)
+            return None
+        except (OSError, asyncio.TimeoutError):
+            return None
+        if rtt:
+            rtt.sample(loop.time() - start)
+
+        fields: dict = {}
+        chain = []
+        if plugins and spec is not None:
+            if spec.tls:
+                chain.append("tls_cert")
+            if spec.probe:
+                chain.append(spec.probe)
+        try:
+            if chain:
+                await asyncio.wait_for(_run_chain(reader, writer, ip, port, timeout, spec, chain, fields), timeout)
+        except (OSError, EOFError, asyncio.TimeoutError, ssl.SSLError, UnicodeError, ValueError):
+            pass  # keep whatever the chain gathered before it failed
+        finally:
+            await _close(writer)
+        return fields
+
+
+async def _run_chain(reader, writer, ip: str, port: int, timeout: float, spec, chain: list[str], fields: dict) -> None:
+    if spec.tls:
+        await writer.start_tls(SSL_CTX)
+    ctx = ProbeContext(ip, port, timeout)
+    for name in chain:
+        try:
+            found = await PROBES[name](reader, writer, ctx)
+        except (OSError, EOFError, asyncio.TimeoutError, ssl.SSLError):
+            raise
+        except Exception:
+            # A plugin choking on a weird reply loses its own fields, not the
+            # port or the scan; the stream is in an unknown state, so stop here
+            logger.debug("Probe plugin %s failed on %s:%d", name, ip, port, exc_info=True)
+            return
+        fields.update({k: v for k, v in found.items() if v is not None})
+
+
+def fingerprint_host(
+    open_ports: list[int],
+    http_title: Optional[str] = None,
+    ssh_banner: Optional[str] = None,
+    mac: Optional[str] = None,
+    server: Optional[str] = None,
+) -> tuple[str, str]:
+    """
+    Map open ports, HTTP title, banner and MAC to (fingerprint label,
+    suggested_type) using the signature database (signatures.py).
+    """
+    return get_engine().classify(HostFeatures(frozenset(open_ports), http_title, server, ssh_banner, mac))
 
-def _grab_http_title(ip: str, port: int, timeout: float) -> Optional[str]:
-    """Perform a simple GET and extract the <title> from the response."""
-    scheme = "https" if port in (443, 8443) else "http"
-    url = f"{scheme}://{ip}:{port}/"
-    try:
-        import ssl
-        ctx = ssl.create_default_context()
-        ctx.check_hostname = False
-        ctx.verify_mode = ssl.CERT_NONE
-        req = urllib.request.Request(url, headers={"User-Agent": "homelab-discovery/1.0"})
-        with urllib.request.urlopen(req, timeout=timeout, context=ctx) as resp:
-            raw = resp.read(4096)
-            html = raw.decode("utf-8", errors="replace")
-    except urllib.error.URLError:
-        return None
-    except Exception:
+
+def classify_many(results: list["HostResult"]) -> None:
+    """Fingerprint a batch of live results in one pass over the signature engine."""
+    live = [r for r in results if r.alive and r.fingerprint is None]
+    for r, fp in zip(live, get_engine().classify_many(r.features() for r in live)):
+        r.fingerprint = fp
+
+
+# ---------------------------------------------------------------------------
+# Compact results
+# ---------------------------------------------------------------------------
+
+def _ip_str(ip: int) -> str:
+    return str(ipaddress.IPv4Address(ip) if ip < 1 << 32 else ipaddress.IPv6Address(ip))
+
+
+class HostResult:
+    """
+    One host's scan outcome in compact form: integer IP, open ports as a
+    bitmask over the catalogue (probes.ports_to_mask), and probe plugin
+    output only for ports that produced any. A dead host is just
+    ``HostResult(ip)``. Call to_dict() at the serialization boundary.
+    """
+
+    __slots__ = (
+        "ip", "alive", "latency_ms", "hostname", "ports", "details", "error",
+        "mac", "fingerprint", "change", "opened", "closed",
+    )
+
+    def __init__(
+        self,
+        ip: int,
+        alive: bool = False,
+        latency_ms: Optional[float] = None,
+        hostname: Optional[str] = None,
+        ports: int = 0,
+        details: Optional[dict[int, dict]] = None,
+        error: Optional[str] = None,
+        mac: Optional[str] = None,
+    ) -> None:
+        self.ip = ip
+        self.alive = alive
+        self.latency_ms = latency_ms
+        self.hostname = hostname
+        self.ports = ports
+        self.details = details
+        self.error = error
+        self.mac = mac
+        # (label, suggested_type), filled in bulk by classify_many() or lazily by to_dict()
+        self.fingerprint: Optional[tuple[str, str]] = None
+        # Set by incremental scans: "new" | "gone" | "changed" | "unchanged" + port masks
+        self.change: Optional[str] = None
+        self.opened = 0
+        self.closed = 0
+
+    @property
+    def http_title(self) -> Optional[str]:
+        details = self.details or {}
+        for port in (*HTTP_TITLE_ORDER, *sorted(details)):
+            title = details.get(port, {}).get("title")
+            if title:
+                return title
         return None
 
-    parser = _TitleParser()
+    @property
+    def ssh_banner(self) -> Optional[str]:
+        return (self.details or {}).get(22, {}).get("banner")
+
+    def features(self) -> HostFeatures:
+        """What the signature engine matches on."""
+        details = self.details or {}
+        server = next((d["server"] for _, d in sorted(details.items()) if d.get("server")), None)
+        banners = [
+            d[key] for _, d in sorted(details.items())
+            for key in _BANNER_FIELDS if d.get(key)
+        ]
+        return HostFeatures(
+            frozenset(mask_to_ports(self.ports)), self.http_title, server, "\n".join(banners) or None, self.mac
+        )
+
+    def to_dict(self) -> dict:
+        ip = _ip_str(self.ip)
+        open_ports = mask_to_ports(self.ports)
+        http_title = self.http_title
+        if not self.alive:
+            fingerprint, suggested_type = "Unknown", "misc"
+        else:
+            if self.fingerprint is None:
+                self.fingerprint = get_engine().classify(self.features())
+            fingerprint, suggested_type = self.fingerprint
+        result = {
+            "ip": ip,
+            "alive": self.alive,
+            "latency_ms": self.latency_ms,
+            "hostname": self.hostname,
+            "mac_address": self.mac,
+            "mac_vendor": mac_vendor(self.mac),
+            "open_ports": open_ports,
+            "services": {str(p): CATALOGUE[p].service for p in open_ports},
+            "http_title": http_title,
+            "ssh_banner": self.ssh_banner,
+            "probes": {str(p): d for p, d in sorted((self.details or {}).items())},
+            "fingerprint": fingerprint,
+            "suggested_type": suggested_type,
+            "suggested_name": self.hostname or ip,
+        }
+        if self.error is not None:
+            result["error"] = self.error
+        if self.change is not None:
+            result["change"] = {
+                "status": self.change,
+                "ports_opened": mask_to_ports(self.opened),
+                "ports_closed": mask_to_ports(self.closed),
+            }
+        return result
+
+
+# ---------------------------------------------------------------------------
+# Phase 1: liveness sweep
+# ---------------------------------------------------------------------------
+
+def _read_arp_table(path: str = "/proc/net/arp") -> dict[str, str]:
+    """Return {ip: mac} for complete entries in the kernel ARP/neighbour table."""
+    table: dict[str, str] = {}
     try:
-        parser.feed(html)
-    except Exception:
+        with open(path) as fh:
+            next(fh, None)  # header
+            for line in fh:
+                fields = line.split()
+                if len(fields) < 4:
+                    continue
+                ip, flags, mac = fields[0], fields[2], fields[3]
+                # ATF_COM (0x2) = resolved; incomplete entries carry a zero MAC
+                if int(flags, 16) & 0x2 and mac != "00:00:00:00:00:00":
+                    table[ip] = mac.lower()
+    except (OSError, ValueError):
         pass
-    return parser.title
+    return table
 
 
-def _reverse_dns(ip: str) -> Optional[str]:
-    try:
-        hostname, _, _ = socket.gethostbyaddr(ip)
-        return hostname
-    except OSError:
+class _ArpTable:
+    """
+    The ARP table as of scan start (a sweep shortcut), plus MAC lookups
+    that re-read it on a miss — the scan's own connects populate entries
+    for on-link hosts — at most once per *refresh* seconds. Once an IPv6
+    address is looked up, re-reads include the IPv6 neighbor cache.
+    """
+
+    def __init__(self, refresh: float = 1.0) -> None:
+        self.refresh = refresh
+        self.ipv6 = False
+        self.initial = frozenset(self._load())
+
+    def _load(self) -> dict[str, str]:
+        self.table = _read_arp_table()
+        if self.ipv6:
+            self.table.update((ip, mac) for ip, mac in neighbors().items() if mac)
+        self.loaded = time.monotonic()
+        return self.table
+
+    def __contains__(self, ip: str) -> bool:
+        return ip in self.initial
+
+    def mac(self, ip: str) -> Optional[str]:
+        mac = self.table.get(ip)
+        if mac is None and ":" in ip and not self.ipv6:
+            self.ipv6 = True
+            return self._load().get(ip)
+        if mac is None and time.monotonic() - self.loaded >= self.refresh:
+            mac = self._load().get(ip)
+        return mac
+
+
+_icmp_ok: Optional[bool] = None
+
+
+def _icmp_available() -> bool:
+    """Whether unprivileged ICMP sockets work here (checked once per process)."""
+    global _icmp_ok
+    if _icmp_ok is None:
+        try:
+            from icmplib import ICMPv4Socket
+            ICMPv4Socket(privileged=False).close()
+            _icmp_ok = True
+        except Exception:
+            _icmp_ok = False
+    return _icmp_ok
+
+
+async def _icmp_rtt(ip: str, timeout: float, sem: asyncio.Semaphore) -> Optional[float]:
+    """One ICMP echo; round-trip in ms, or None (no reply / ICMP unavailable)."""
+    if not _icmp_available():
         return None
+    from icmplib import async_ping
+    async with sem:
+        await get_limiter().acquire(ip)
+        try:
+            host = await async_ping(ip, count=1, timeout=timeout, privileged=False)
+        except Exception:
+            return None
+    return round(host.avg_rtt, 2) if host.is_alive else None
 
 
-def fingerprint_host(open_ports: list[int], http_title: Optional[str]) -> tuple[str, str]:
+async def _tcp_alive(ip: str, timeout: float, sem: asyncio.Semaphore) -> Optional[float]:
+    """
+    Knock on SWEEP_PORTS; handshake time in ms if any port completes *or*
+    actively refuses (an RST proves the host is up as well as a SYN/ACK),
+    else None.
     """
-    Map open ports (and optional HTTP title) to (fingerprint label, suggested_type).
+    loop = asyncio.get_running_loop()
 
-    Priority order matches the plan.
+    async def knock(port: int) -> Optional[float]:
+        async with sem:
+            await get_limiter().acquire(ip, connections=1)
+            start = loop.time()
+            try:
+                _, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), timeout)
+            except ConnectionRefusedError:
+                return round((loop.time() - start) * 1000, 2)
+            except (OSError, asyncio.TimeoutError):
+                return None
+            rtt = round((loop.time() - start) * 1000, 2)
+            await _close(writer)
+            return rtt
+
+    rtts = [r for r in await asyncio.gather(*(knock(p) for p in SWEEP_PORTS)) if r is not None]
+    return min(rtts) if rtts else None
+
+
+async def _sweep_host(ip: str, in_arp: bool, timeout: float, sem: asyncio.Semaphore) -> tuple[bool, Optional[float]]:
     """
-    port_set = set(open_ports)
-
-    if 8006 in port_set:
-        return "Proxmox VE", "hardware"
-    if 9090 in port_set:
-        return "Cockpit", "hardware"
-    if 6443 in port_set:
-        return "Kubernetes API", "misc"
-    if 5900 in port_set:
-        return "VNC Host", "hardware"
-    if 22 in port_set and not port_set.intersection(HTTP_PORTS):
-        return "SSH Host", "hardware"
-    if port_set.intersection({80, 443}):
-        return "Web Server", "apps"
-    if open_ports:
-        return "Unknown", "misc"
-    return "Unknown", "misc"
+    Liveness for one address → (alive, latency_ms).
+
+    A complete ARP entry is proof enough; otherwise an ICMP echo and a TCP
+    knock run side by side. ICMP latency is preferred when both answer.
+    """
+    if in_arp:
+        return True, await _icmp_rtt(ip, timeout, sem)
+    icmp, tcp = await asyncio.gather(_icmp_rtt(ip, timeout, sem), _tcp_alive(ip, timeout, sem))
+    if icmp is not None:
+        return True, icmp
+    return tcp is not None, tcp
 
 
 # ---------------------------------------------------------------------------
-# Per-host probe
+# Phase 2: per-host probe
 # ---------------------------------------------------------------------------
 
-def _probe_host(ip: str, timeout: float) -> dict:
-    """Run the full fingerprinting pipeline for a single IP address."""
-    start = time.monotonic()
+def _has_plugins(port: int) -> bool:
+    spec = CATALOGUE.get(port)
+    return spec is not None and (spec.tls or spec.probe is not None)
 
-    # 1. Ping
-    ping_result = ping_host(ip)
-    alive = ping_result.get("alive", False)
-    latency_ms = ping_result.get("latency_ms")
 
-    if not alive:
-        return {
-            "ip": ip,
-            "alive": False,
-            "latency_ms": None,
-            "hostname": None,
-            "open_ports": [],
-            "services": {},
-            "http_title": None,
-            "ssh_banner": None,
-            "fingerprint": "Unknown",
-            "suggested_type": "misc",
-            "suggested_name": ip,
-        }
+async def _probe_host(
+    ip: str,
+    ports: tuple[int, ...],
+    timeout: float,
+    sem: asyncio.Semaphore,
+    prev: Optional[dict] = None,
+    fresh: frozenset[str] = frozenset(),
+    rtt: Optional[RttEstimator] = None,
+) -> tuple[int, Optional[str], dict[int, dict]]:
+    """
+    Port-scan and probe a host the sweep found alive.
 
-    # 2. Reverse DNS
-    hostname = _reverse_dns(ip)
+    Every port in *ports* is connected at once and each open port's probe
+    plugins run on that same connection, so a host settles in roughly one
+    connect plus one plugin exchange however many ports are scanned.
 
-    # 3. TCP port scan
-    open_ports: list[int] = []
-    for port in KNOWN_PORTS:
-        if _tcp_connect(ip, port, timeout):
-            open_ports.append(port)
-    open_ports.sort()
+    Field groups named in *fresh* (see discovery_cache) are taken from the
+    cached *prev* entry instead of being probed again; cached plugin output
+    is only reused for ports that are still open.
 
-    # 4. Banner grabs
-    services: dict[str, str] = {str(p): KNOWN_PORTS[p] for p in open_ports}
+    Returns (port mask, hostname, {port: plugin fields}).
+    """
+    # 1. Reverse DNS — runs in the background while ports are probed
+    dns_task = None if "dns" in fresh else asyncio.ensure_future(get_resolver().areverse(ip))
+
+    cached: dict[int, dict] = dict(prev.get("details") or {}) if "banners" in fresh else {}
+
+    # 2. Ports + plugins — every port at once
+    if "ports" in fresh:
+        open_ports = [p for p in prev["ports"] if p in CATALOGUE]
+        to_probe = [p for p in open_ports if p not in cached and _has_plugins(p)]
+        found = await asyncio.gather(*(_probe_port(ip, p, timeout, sem, rtt) for p in to_probe))
+        # A re-probed port that no longer connects has closed since it was cached
+        closed = {p for p, f in zip(to_probe, found) if f is None}
+        open_ports = [p for p in open_ports if p not in closed]
+        fields = {
+            **{p: cached[p] for p in open_ports if p in cached},
+            **{p: f for p, f in zip(to_probe, found) if f is not None},
+        }
+    else:
+        found = await asyncio.gather(
+            *(_probe_port(ip, p, timeout, sem, rtt, plugins=p not in cached) for p in ports)
+        )
+        open_ports = [p for p, f in zip(ports, found) if f is not None]
+        fields = {p: cached.get(p) or f for p, f in zip(ports, found) if f is not None}
+
+    details = {p: f for p, f in fields.items() if f}
+    hostname = prev.get("hostname") if dns_task is None else await dns_task
+    return ports_to_mask(open_ports), hostname, details
+
+
+async def _scan_host(
+    ip: int,
+    ports: tuple[int, ...],
+    arp: _ArpTable,
+    timeout: float,
+    sem: asyncio.Semaphore,
+    prev: Optional[dict] = None,
+    fresh: frozenset[str] = frozenset(),
+    min_timeout: float = DEFAULT_MIN_TIMEOUT,
+) -> HostResult:
+    """Sweep one address, then probe it only if it answered."""
+    addr = _ip_str(ip)
+    try:
+        if "alive" in fresh:
+            alive, latency_ms = prev["alive"], prev.get("latency_ms")
+        else:
+            alive, latency_ms = await _sweep_host(addr, addr in arp, timeout, sem)
+        if not alive:
+            return HostResult(ip)
+        rtt = RttEstimator(latency_ms / 1000, min_timeout, timeout) if latency_ms is not None else None
+        mask, hostname, details = await _probe_host(addr, ports, timeout, sem, prev, fresh, rtt)
+        return HostResult(ip, True, latency_ms, hostname, mask, details or None, mac=arp.mac(addr))
+    except Exception as exc:
+        return HostResult(ip, error=str(exc))
+
+
+def _with_cache(
+    ips: Iterable[int], cache, incremental: bool, scope: tuple[int, ...]
+) -> Iterator[tuple[int, Optional[dict], frozenset[str]]]:
+    """Pair each IP with its cached entry and fresh field groups, one batched read per _CACHE_BATCH."""
+    source = iter(ips)
+    while True:
+        batch = list(itertools.islice(source, _CACHE_BATCH))
+        if not batch:
+            return
+        prevs = cache.get_many(batch) if cache is not None else [None] * len(batch)
+        now = time.time()
+        for ip, prev in zip(batch, prevs):
+            fresh = cache.fresh_groups(prev, now, scope) if incremental and cache is not None else frozenset()
+            yield ip, prev, fresh
+
+
+async def _scan_iter(
+    ips: Iterable[int],
+    concurrency: int,
+    timeout: float,
+    include_dead: bool = True,
+    cache=None,
+    incremental: bool = False,
+    min_timeout: float = DEFAULT_MIN_TIMEOUT,
+    profile: str = DEFAULT_PROFILE,
+) -> AsyncIterator[HostResult]:
+    """
+    Async generator yielding each host's HostResult as soon as it is known.
 
-    ssh_banner: Optional[str] = None
-    if 22 in open_ports:
-        ssh_banner = _grab_ssh_banner(ip, timeout)
+    *ips* is consumed lazily: at most ``concurrency * _WINDOW_FACTOR``
+    hosts are in flight, and a new one is started each time one finishes,
+    so memory stays flat however large the range. Within each host the
+    cheap sweep runs first and the full port probe only for live hosts.
 
-    http_title: Optional[str] = None
-    for port in (8006, 80, 443, 8080, 8443, 9090):
-        if port in open_ports:
-            title = _grab_http_title(ip, port, timeout)
-            if title:
-                http_title = title
-                break
+    With a *cache* (discovery_cache.HostCache) every result is written
+    through; *incremental* also reuses fresh cached fields and tags each
+    result with what changed since the previous scan.
+
+    *timeout* bounds every probe; once a host's RTT is known its port
+    connects use an adaptive timeout no lower than *min_timeout*.
+    *profile* (probes.PROFILES) selects which ports are scanned.
+    """
+    ports = profile_ports(profile)
+    scope = ports_to_mask(ports)
+    sem = asyncio.Semaphore(concurrency)
+    arp = _ArpTable()
+    window = max(1, concurrency * _WINDOW_FACTOR)
+    source = _with_cache(ips, cache, incremental, ports)
+    finished: asyncio.Queue[asyncio.Task] = asyncio.Queue()
+    in_flight: dict[asyncio.Task, tuple[Optional[dict], frozenset[str]]] = {}
+    to_store: dict[int, dict] = {}
+
+    def launch() -> bool:
+        item = next(source, None)
+        if item is None:
+            return False
+        ip, prev, fresh = item
+        task = asyncio.ensure_future(_scan_host(ip, ports, arp, timeout, sem, prev, fresh, min_timeout))
+        task.add_done_callback(finished.put_nowait)
+        in_flight[task] = (prev, fresh)
+        return True
 
-    # 5. Fingerprint
-    fingerprint, suggested_type = fingerprint_host(open_ports, http_title)
-    suggested_name = hostname or ip
-
-    return {
-        "ip": ip,
-        "alive": True,
-        "latency_ms": latency_ms,
-        "hostname": hostname,
-        "open_ports": open_ports,
-        "services": services,
-        "http_title": http_title,
-        "ssh_banner": ssh_banner,
-        "fingerprint": fingerprint,
-        "suggested_type": suggested_type,
-        "suggested_name": suggested_name,
-    }
+    try:
+        while len(in_flight) < window and launch():
+            pass
+        while in_flight:
+            task = await finished.get()
+            prev, fresh = in_flight.pop(task)
+            launch()
+            result = task.result()
+            if cache is not None and result.error is None:
+                to_store[result.ip] = cache.entry_for(result, prev, fresh, ports)
+                if len(to_store) >= _CACHE_BATCH:
+                    cache.set_many(to_store)
+                    to_store = {}
+            if incremental:
+                result.change, result.opened, result.closed = diff(prev, result, scope)
+            if result.alive or include_dead or result.change == "gone":
+                yield result
+    finally:
+        for task in in_flight:
+            task.cancel()
+        if cache is not None:
+            cache.set_many(to_store)
+
+
+async def _scan(ips: Iterable[int], concurrency: int, timeout: float, **opts):
+    """Collect a scan compactly: HostResults worth keeping plus the integer IPs of plain dead hosts."""
+    live: list[HostResult] = []
+    dead: list[int] = []
+    async for r in _scan_iter(ips, concurrency, timeout, **opts):
+        if r.alive or r.error is not None or r.change is not None:
+            live.append(r)
+        else:
+            dead.append(r.ip)
+    return live, dead
+
+
+def _raise_fd_limit(wanted: int) -> None:
+    """Lift the soft open-files limit so *wanted* concurrent sockets fit."""
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        target = wanted + 256
+        if soft != resource.RLIM_INFINITY and soft < target:
+            new_soft = target if hard == resource.RLIM_INFINITY else min(target, hard)
+            resource.setrlimit(resource.RLIMIT_NOFILE, (new_soft, hard))
+    except (ImportError, ValueError, OSError):
+        pass
 
 
 # ---------------------------------------------------------------------------
 # Public API
 # ---------------------------------------------------------------------------
 
+def host_count(cidr: str) -> int:
+    """Number of addresses network.hosts() yields for *cidr*, without iterating."""
+    # Not len(): it overflows ssize_t for IPv6 prefixes wider than about /65
+    hosts = host_range(cidr)
+    return hosts.stop - hosts.start
+
+
+def host_range(cidr: str) -> range:
+    """
+    The addresses network.hosts() would yield, as a lazy range of integers.
+
+    Indexing and slicing are O(1), so callers can resume mid-network
+    without walking the addresses before the cursor.
+    """
+    network = ipaddress.ip_network(cidr, strict=False)
+    first = int(network.network_address)
+    if network.num_addresses <= 2:
+        return range(first, first + network.num_addresses)
+    # IPv4 excludes network + broadcast; IPv6 excludes only the subnet-router anycast
+    last = first + network.num_addresses - (1 if network.version == 4 else 0)
+    return range(first + 1, last)
+
+
+def _subtract(span: tuple[int, int], taken: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """Parts of the half-open *span* not covered by the sorted, disjoint *taken* spans."""
+    start, stop = span
+    out = []
+    for lo, hi in taken:
+        if hi <= start:
+            continue
+        if lo >= stop:
+            break
+        if lo > start:
+            out.append((start, lo))
+        start = max(start, hi)
+    if start < stop:
+        out.append((start, stop))
+    return out
+
+
+def _claim(span: tuple[int, int], taken: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    """
+    Parts of *span* not yet in *taken*, which then gains *span* in place.
+
+    Only the spans touching *span* are looked at (found by bisection), so
+    building thousands of /128 targets stays O(n log n) instead of
+    re-merging the whole list on every CIDR.
+    """
+    start, stop = span
+    i = bisect.bisect_left(taken, (start,))
+    if i and taken[i - 1][1] >= start:
+        i -= 1
+    j = bisect.bisect_left(taken, (stop + 1,), lo=i)
+    touching = taken[i:j]
+    free = _subtract(span, touching)
+    lo = min(start, touching[0][0]) if touching else start
+    hi = max(stop, touching[-1][1]) if touching else stop
+    taken[i:j] = [(lo, hi)]
+    return free
+
+
+def _merge_spans(spans: list[tuple[int, int]]) -> list[tuple[int, int]]:
+    merged: list[tuple[int, int]] = []
+    for lo, hi in sorted(spans):
+        if merged and lo <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], hi))
+        else:
+            merged.append((lo, hi))
+    return merged
+
+
+class ScanTargets:
+    """
+    The addresses of several CIDRs minus exclusions, each scanned once.
+
+    Overlaps are resolved in request order: an address belongs to the
+    first CIDR that covers it, so a /24 listed after its /16 adds nothing.
+    Exclusions remove whole networks (or single IPs), network and
+    broadcast addresses included.
+
+    Iterating interleaves the subnets round-robin, one address from each in
+    turn. The scan window therefore holds hosts from every subnet at once
+    and they share its concurrency evenly, instead of one VLAN waiting for
+    the previous one to finish; a small subnet drops out when exhausted.
+    """
+
+    def __init__(self, cidrs: Iterable[str], exclude: Iterable[str] = ()) -> None:
+        taken: dict[int, list[tuple[int, int]]] = {4: [], 6: []}
+        for net in (ipaddress.ip_network(e, strict=False) for e in exclude):
+            taken[net.version].append((int(net.network_address), int(net.broadcast_address) + 1))
+        taken = {v: _merge_spans(spans) for v, spans in taken.items()}
+
+        self.subnets: list[tuple[str, list[range]]] = []
+        for net in (ipaddress.ip_network(c, strict=False) for c in cidrs):
+            hosts = host_range(str(net))
+            spans = _claim((hosts.start, hosts.stop), taken[net.version])
+            self.subnets.append((str(net), [range(lo, hi) for lo, hi in spans]))
+
+    @property
+    def cidrs(self) -> list[str]:
+        return [cidr for cidr, _ in self.subnets]
+
+    def counts(self) -> dict[str, int]:
+        """Addresses each CIDR contributes after dedup and exclusions."""
+        return {cidr: sum(r.stop - r.start for r in ranges) for cidr, ranges in self.subnets}
+
+    def size(self) -> int:
+        """Total addresses. Not __len__: len() can't return more than ssize_t, and an IPv6 /64 is 2**64."""
+        return sum(r.stop - r.start for _, ranges in self.subnets for r in ranges)
+
+    def __iter__(self) -> Iterator[int]:
+        streams = [itertools.chain.from_iterable(ranges) for _, ranges in self.subnets]
+        while streams:
+            alive = []
+            for stream in streams:
+                ip = next(stream, None)
+                if ip is not None:
+                    alive.append(stream)
+                    yield ip
+            streams = alive
+
+
+def _targets(cidr, exclude: Iterable[str] = ()):
+    """A CIDR string, a list of CIDRs or a ScanTargets → an iterable of integer IPs."""
+    if isinstance(cidr, ScanTargets):
+        return cidr
+    if isinstance(cidr, str) and not exclude:
+        return host_range(cidr)
+    return ScanTargets([cidr] if isinstance(cidr, str) else cidr, exclude)
+
+
 def scan_cidr(
-    cidr: str,
-    concurrency: int = 50,
+    cidr,
+    concurrency: int = DEFAULT_CONCURRENCY,
     timeout: float = 1.0,
+    include_dead: bool = True,
+    cache=None,
+    incremental: bool = False,
+    min_timeout: float = DEFAULT_MIN_TIMEOUT,
+    profile: str = DEFAULT_PROFILE,
+    exclude: Iterable[str] = (),
 ) -> list[dict]:
     """
     Scan every host in *cidr* and return a list of probe results.
 
-    Dead hosts are included so the caller sees the full subnet picture.
+    *cidr* may also be a list of CIDRs or a ScanTargets; together with
+    *exclude* they are deduplicated and interleaved (see ScanTargets) and
+    scanned as one job under one budget. Hosts are drawn lazily in a
+    bounded window; sockets across the whole scan are capped by
+    *concurrency*.
+
+    Dead hosts are included so the caller sees the full subnet picture,
+    unless *include_dead* is False. *cache*, *incremental*, *min_timeout*
+    and *profile*: see _scan_iter().
     """
-    network = ipaddress.ip_network(cidr, strict=False)
-    hosts = list(network.hosts())
+    return _scan_ints(
+        _targets(cidr, exclude), concurrency, timeout,
+        include_dead=include_dead, cache=cache, incremental=incremental, min_timeout=min_timeout,
+        profile=profile,
+    )
+
+
+def scan_ips(
+    ips: Iterable[str],
+    concurrency: int = DEFAULT_CONCURRENCY,
+    timeout: float = 1.0,
+    include_dead: bool = True,
+    cache=None,
+    incremental: bool = False,
+    min_timeout: float = DEFAULT_MIN_TIMEOUT,
+    profile: str = DEFAULT_PROFILE,
+) -> list[dict]:
+    """Probe an explicit list of addresses; results sorted by IP."""
+    return _scan_ints(
+        (int(ipaddress.ip_address(ip)) for ip in ips), concurrency, timeout,
+        include_dead=include_dead, cache=cache, incremental=incremental, min_timeout=min_timeout,
+        profile=profile,
+    )
+
+
+def _scan_ints(ips: Iterable[int], concurrency: int, timeout: float, **opts) -> list[dict]:
+    concurrency = max(1, concurrency)
+    _raise_fd_limit(concurrency)
+    live, dead = asyncio.run(_scan(ips, concurrency, timeout, **opts))
+
+    # Sorted by IP for deterministic output; dicts are only built here
+    live.sort(key=lambda r: r.ip)
+    dead.sort()
+    classify_many(live)
+    merged = heapq.merge(live, (HostResult(ip) for ip in dead), key=lambda r: r.ip)
+    return [r.to_dict() for r in merged]
+
 
-    results: list[dict] = []
-    with ThreadPoolExecutor(max_workers=min(concurrency, len(hosts) or 1)) as pool:
-        futures = {pool.submit(_probe_host, str(ip), timeout): str(ip) for ip in hosts}
-        for future in as_completed(futures):
+_DONE = object()
+
+
+def iter_scan(
+    cidr,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    timeout: float = 1.0,
+    include_dead: bool = True,
+    cache=None,
+    incremental: bool = False,
+    min_timeout: float = DEFAULT_MIN_TIMEOUT,
+    profile: str = DEFAULT_PROFILE,
+    exclude: Iterable[str] = (),
+) -> Iterator[dict]:
+    """
+    Like scan_cidr(), but yield each host result as soon as it is known.
+
+    Results arrive in completion order, not IP order. The event loop runs
+    on a helper thread; closing the generator early (e.g. the HTTP client
+    disconnected) cancels the outstanding probes. The hand-off queue is
+    bounded, so a slow consumer pauses the scan rather than buffering it.
+    """
+    ips = _targets(cidr, exclude)
+    concurrency = max(1, concurrency)
+    _raise_fd_limit(concurrency)
+
+    out: queue.Queue = queue.Queue(maxsize=_HANDOFF_QUEUE)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
             try:
-                results.append(future.result())
-            except Exception as exc:
-                ip = futures[future]
-                results.append({
-                    "ip": ip,
-                    "alive": False,
-                    "latency_ms": None,
-                    "hostname": None,
-                    "open_ports": [],
-                    "services": {},
-                    "http_title": None,
-                    "ssh_banner": None,
-                    "fingerprint": "Unknown",
-                    "suggested_type": "misc",
-                    "suggested_name": ip,
-                    "error": str(exc),
-                })
-
-    # Sort by IP address for deterministic output
-    results.sort(key=lambda r: ipaddress.ip_address(r["ip"]))
-    return results
+                out.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    async def pump() -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            async for result in _scan_iter(
+                ips, concurrency, timeout, include_dead, cache, incremental, min_timeout, profile
+            ):
+                try:
+                    out.put_nowait(result)
+                except queue.Full:
+                    # Consumer is behind: wait off-loop so in-flight probes keep running
+                    if not await loop.run_in_executor(None, put, result):
+                        break
+                if stop.is_set():
+                    break
+        except BaseException as exc:
+            put(exc)
+        finally:
+            put(_DONE)
+
+    worker = threading.Thread(target=asyncio.run, args=(pump(),), name="discovery-scan", daemon=True)
+    worker.start()
+    try:
+        while True:
+            item = out.get()
+            if item is _DONE:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item.to_dict()
+    finally:
+        stop.set()
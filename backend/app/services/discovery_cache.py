@@ -0,0 +1,150 @@
+"""
+Per-host discovery result cache for incremental rescans.
+
+Each scanned IP keeps its last-known state in the Flask-Caching backend
+(Redis) under ``discovery:host:<int ip>``. The state is split into field
+groups that go stale independently:
+
+  alive    liveness + latency            DISCOVERY_CACHE_TTL_ALIVE
+  ports    open ports + the ports probed DISCOVERY_CACHE_TTL_PORTS
+  dns      reverse-DNS hostname          DISCOVERY_CACHE_TTL_DNS
+  banners  probe plugin output per port  DISCOVERY_CACHE_TTL_BANNERS
+
+Ports are stored as plain lists (bitmask positions depend on the
+process's port catalogue). Cached ports only count as fresh for a scan
+whose profile they cover — a "quick" result can't stand in for "deep".
+
+Every scan writes through the cache. An incremental scan also reads it:
+fresh groups are reused, only stale ones are probed again, and each host
+is reported as new / gone / changed / unchanged against its previous
+state. The entry itself lives for DISCOVERY_CACHE_RETAIN so there is
+still a baseline to diff against long after its fields have gone stale.
+
+Cache failures are logged and treated as misses — a scan never fails
+because Redis is down.
+"""
+from __future__ import annotations
+
+import logging
+import time
+from typing import Optional
+
+from .probes import mask_to_ports, ports_to_mask
+
+logger = logging.getLogger(__name__)
+
+GROUPS = ("alive", "ports", "dns", "banners")
+
+_KEY = "discovery:host:{}"
+
+
+class HostCache:
+    """Batched reads/writes of per-host scan state with per-group TTLs."""
+
+    def __init__(self, backend, ttls: dict[str, float], retain: int) -> None:
+        self.backend = backend
+        self.ttls = ttls
+        self.retain = retain
+
+    @classmethod
+    def from_app(cls, app) -> Optional["HostCache"]:
+        """Build from app config and the app's cache backend (None if no cache is configured)."""
+        from .cache import cache
+
+        with app.app_context():
+            backend = getattr(cache, "cache", None)
+        if backend is None:
+            return None
+        cfg = app.config
+        ttls = {
+            "alive": cfg.get("DISCOVERY_CACHE_TTL_ALIVE", 120),
+            "ports": cfg.get("DISCOVERY_CACHE_TTL_PORTS", 1800),
+            "dns": cfg.get("DISCOVERY_CACHE_TTL_DNS", 86400),
+            "banners": cfg.get("DISCOVERY_CACHE_TTL_BANNERS", 86400),
+        }
+        return cls(backend, ttls, cfg.get("DISCOVERY_CACHE_RETAIN", 7 * 86400))
+
+    # -- storage -----------------------------------------------------------
+
+    def get_many(self, ips: list[int]) -> list[Optional[dict]]:
+        try:
+            return list(self.backend.get_many(*(_KEY.format(ip) for ip in ips)))
+        except Exception as exc:
+            logger.warning("Discovery cache read failed: %s", exc)
+            return [None] * len(ips)
+
+    def set_many(self, entries: dict[int, dict]) -> None:
+        if not entries:
+            return
+        try:
+            self.backend.set_many({_KEY.format(ip): e for ip, e in entries.items()}, timeout=self.retain)
+        except Exception as exc:
+            logger.warning("Discovery cache write failed: %s", exc)
+
+    # -- freshness ---------------------------------------------------------
+
+    def fresh_groups(
+        self, entry: Optional[dict], now: Optional[float] = None, scope: tuple[int, ...] = ()
+    ) -> frozenset[str]:
+        """Field groups of *entry* still within their TTL (ports: and covering *scope*)."""
+        if not entry:
+            return frozenset()
+        now = time.time() if now is None else now
+        fresh = {
+            g for g in GROUPS
+            if entry.get(f"{g}_at") is not None and now - entry[f"{g}_at"] < self.ttls[g]
+        }
+        if not set(scope) <= set(entry.get("scope", ())):
+            fresh.discard("ports")
+        return frozenset(fresh)
+
+    @staticmethod
+    def entry_for(
+        result, prev: Optional[dict], fresh: frozenset[str], scope: tuple[int, ...] = (), now: Optional[float] = None
+    ) -> dict:
+        """
+        The entry to store after scanning *result* (a discovery HostResult).
+
+        Groups reused from cache keep their original timestamp. A dead host
+        only refreshes liveness; its last-known ports, hostname and banners
+        are kept as the baseline for when it comes back.
+        """
+        now = time.time() if now is None else now
+        entry = dict(prev or {})
+
+        def stamp(group: str) -> None:
+            if group not in fresh:
+                entry[f"{group}_at"] = now
+
+        entry["alive"] = result.alive
+        entry["latency_ms"] = result.latency_ms
+        stamp("alive")
+        if result.alive:
+            entry["ports"] = mask_to_ports(result.ports)
+            if "ports" not in fresh:
+                entry["scope"] = list(scope)
+            entry["hostname"] = result.hostname
+            entry["mac"] = result.mac or entry.get("mac")
+            entry["details"] = result.details or {}
+            for group in ("ports", "dns", "banners"):
+                stamp(group)
+        return entry
+
+
+def diff(prev: Optional[dict], result, scope: int = -1) -> tuple[str, int, int]:
+    """
+    Compare *result* with the previous cache entry, over the ports in the
+    *scope* bitmask (the ports this scan probed).
+
+    Returns (status, opened_mask, closed_mask); status is one of
+    "new", "gone", "changed" or "unchanged".
+    """
+    was_alive = bool(prev and prev.get("alive"))
+    if not result.alive:
+        return ("gone" if was_alive else "unchanged"), 0, 0
+    if not was_alive:
+        return "new", result.ports, 0
+    before = ports_to_mask(prev.get("ports", ()))
+    opened = result.ports & ~before & scope
+    closed = before & ~result.ports & scope
+    return ("changed" if opened or closed else "unchanged"), opened, closed
@@ -0,0 +1,338 @@
+"""
+Deduplicating import of discovered hosts into inventory.
+
+import_hosts() takes the rows the discovery UI (or MCP) selected and,
+instead of inserting one new row per host:
+
+  1. looks up every existing Hardware / VM / AppService / Misc row that
+     shares an IP, MAC or hostname with the batch — a few indexed
+     ``IN (...)`` queries per table (see migration 010), not one per host;
+  2. merges each host into its match: the IP follows the host (DHCP
+     moves), empty hostname/MAC/notes are filled in, curated fields such
+     as the name are left alone;
+  3. inserts the rest in one flush, all inside the request's single
+     transaction. If that flush fails, it is replayed one row per
+     SAVEPOINT so a bad row is reported in ``errors`` without discarding
+     the others;
+  4. after commit, re-embeds every created or changed entity with one
+     batched SearchService.upsert_many().
+
+Matching: MAC beats IP beats hostname. A match in the table of the
+requested type is preferred, then the host tables (hardware, vms, misc).
+Apps are only matched when importing as apps, since several apps share
+one host's IP. A candidate whose known MAC differs from the host's is
+another device that took over the address, and is not merged. Each
+existing entity takes at most one row per import, the one matching it
+most strongly; other rows that match only it come back as conflicts in
+``errors``.
+
+Usage:
+    from app.services.discovery_import import import_hosts
+
+    summary = import_hosts([{"ip": "192.168.1.42", "type": "hardware", "name": "pve"}])
+"""
+from __future__ import annotations
+
+import ipaddress
+import logging
+from typing import Callable
+
+from sqlalchemy import func
+
+from ..models import AppService, Hardware, Misc, VM, db
+from .oui import normalize_mac
+from .resolver import get_resolver
+from .search import SearchService
+
+logger = logging.getLogger(__name__)
+
+# Types an import can create, and where existing hosts may already live
+CREATE_MODELS = {"hardware": Hardware, "apps": AppService, "misc": Misc}
+HOST_MODELS = {"hardware": Hardware, "vms": VM, "misc": Misc}
+_ALL_MODELS = {**HOST_MODELS, "apps": AppService}
+
+# Values per IN (...) list; keeps bind-parameter counts well under driver limits
+_IN_CHUNK = 500
+
+
+def _is_ip(value: str) -> bool:
+    try:
+        ipaddress.ip_address(value)
+        return True
+    except ValueError:
+        return False
+
+
+def import_row(host: dict) -> dict:
+    """The import request row for a scan result, as the UI and MCP tool build it."""
+    notes = [
+        f"Fingerprint: {host['fingerprint']}" if host.get("fingerprint") not in (None, "Unknown") else None,
+        f"Open ports: {', '.join(map(str, host['open_ports']))}" if host.get("open_ports") else None,
+        f"HTTP title: {host['http_title']}" if host.get("http_title") else None,
+        f"SSH banner: {host['ssh_banner']}" if host.get("ssh_banner") else None,
+    ]
+    return {
+        "ip": host["ip"],
+        "type": host.get("suggested_type") or "misc",
+        "name": host.get("suggested_name") or host["ip"],
+        "hostname": host.get("hostname") or host["ip"],
+        "mac_address": host.get("mac_address"),
+        "notes": "\n".join(n for n in notes if n),
+    }
+
+
+def _normalize(hosts: list[dict]) -> tuple[list[dict], list[dict]]:
+    """Request rows → (clean rows, one per IP; errors). Later rows repeating an IP are errors."""
+    rows: dict[str, dict] = {}
+    errors: list[dict] = []
+    for host in hosts:
+        ip = (host.get("ip") or "").strip()
+        if not _is_ip(ip):
+            errors.append({"ip": ip, "error": "invalid or missing 'ip'"})
+            continue
+        if ip in rows:
+            errors.append({"ip": ip, "error": "duplicate 'ip' in this import; the first row for it was used"})
+            continue
+        hostname = (host.get("hostname") or "").strip()
+        rows[ip] = {
+            "ip": ip,
+            "type": host.get("type") if host.get("type") in CREATE_MODELS else "misc",
+            "name": host.get("name") or ip,
+            # The UI sends the IP when there's no name; that's not a hostname
+            "hostname": hostname if hostname and hostname != ip else None,
+            "mac": normalize_mac(host.get("mac_address")),
+            "notes": host.get("notes") or "",
+        }
+
+    missing = [ip for ip, row in rows.items() if not row["hostname"]]
+    if missing:
+        for ip, name in get_resolver().reverse_many(missing).items():
+            rows[ip]["hostname"] = name
+    return list(rows.values()), errors
+
+
+class _Index:
+    """Existing entities by IP, MAC and lower-cased hostname."""
+
+    def __init__(self) -> None:
+        self.keys: dict[str, dict[str, list[tuple[str, object]]]] = {"mac": {}, "ip": {}, "hostname": {}}
+
+    def add(self, entity_type: str, obj) -> None:
+        for kind, value in (
+            ("ip", obj.ip_address),
+            ("mac", normalize_mac(getattr(obj, "mac_address", None))),
+            ("hostname", (obj.hostname or "").lower() or None),
+        ):
+            if value:
+                self.keys[kind].setdefault(value, []).append((entity_type, obj))
+
+    def load(self, rows: list[dict]) -> None:
+        values = {
+            "ip": sorted({r["ip"] for r in rows}),
+            "mac": sorted({r["mac"] for r in rows if r["mac"]}),
+            "hostname": sorted({r["hostname"].lower() for r in rows if r["hostname"]}),
+        }
+        seen: set[tuple[str, int]] = set()
+        for entity_type, model in _ALL_MODELS.items():
+            columns = {"ip": model.ip_address, "hostname": func.lower(model.hostname)}
+            if hasattr(model, "mac_address"):
+                # Stored normalized (the models' validator, migration 012)
+                columns["mac"] = func.lower(model.mac_address)
+            for kind, column in columns.items():
+                wanted = values[kind]
+                for start in range(0, len(wanted), _IN_CHUNK):
+                    for obj in model.query.filter(column.in_(wanted[start:start + _IN_CHUNK])):
+                        if (entity_type, obj.id) not in seen:
+                            seen.add((entity_type, obj.id))
+                            self.add(entity_type, obj)
+
+    def matches(self, row: dict) -> list[tuple[int, str, object]]:
+        """(strength, entity type, entity) candidates for *row*, strongest first: 0 MAC, 1 IP, 2 hostname."""
+        order = [row["type"]] + [t for t in HOST_MODELS if t != row["type"]]
+        found = []
+        keys = (("mac", row["mac"]), ("ip", row["ip"]), ("hostname", (row["hostname"] or "").lower()))
+        for strength, (kind, value) in enumerate(keys):
+            candidates = self.keys[kind].get(value) if value else None
+            if not candidates:
+                continue
+            for entity_type in order:
+                for cand_type, obj in candidates:
+                    if cand_type != entity_type:
+                        continue
+                    known = normalize_mac(getattr(obj, "mac_address", None))
+                    if known and row["mac"] and known != row["mac"]:
+                        continue
+                    found.append((strength, cand_type, obj))
+        return found
+
+
+def _assign(rows: list[dict], index: _Index) -> tuple[dict[int, tuple[str, object]], list[dict]]:
+    """
+    Pair rows with existing entities, each entity with at most one row.
+
+    Every MAC match is settled before any IP match, and every IP match
+    before any hostname match, so a weak match can't take an entity from a
+    row that identifies it more strongly; among equals the earlier row
+    wins. A row whose candidates were all taken isn't merged (that would
+    move the entity's IP once per row) nor created (a duplicate of the
+    device): it is reported as a conflict. Returns ({row index: (type,
+    entity)}, conflicts).
+    """
+    candidates = [index.matches(row) for row in rows]
+    claimed: dict[tuple[str, int], dict] = {}
+    assigned: dict[int, tuple[str, object]] = {}
+    for strength in range(3):
+        for i, row in enumerate(rows):
+            if i in assigned:
+                continue
+            for s, entity_type, obj in candidates[i]:
+                if s == strength and (entity_type, obj.id) not in claimed:
+                    claimed[(entity_type, obj.id)] = row
+                    assigned[i] = (entity_type, obj)
+                    break
+
+    conflicts = []
+    for i, row in enumerate(rows):
+        if i not in assigned and candidates[i]:
+            _, entity_type, obj = candidates[i][0]
+            conflicts.append({
+                "ip": row["ip"],
+                "error": f"matches {entity_type} {obj.id}, already merged with {claimed[(entity_type, obj.id)]['ip']} "
+                         "in this import",
+            })
+    return assigned, conflicts
+
+
+def _merge(obj, row: dict) -> bool:
+    """Fold a discovered host into an existing entity; True if anything changed."""
+    changes: dict = {}
+    if obj.ip_address != row["ip"]:
+        changes["ip_address"] = row["ip"]
+    if row["hostname"] and (not obj.hostname or obj.hostname == obj.ip_address):
+        changes["hostname"] = row["hostname"]
+    if row["mac"] and hasattr(obj, "mac_address") and not obj.mac_address:
+        changes["mac_address"] = row["mac"]
+    if row["notes"] and not obj.notes:
+        changes["notes"] = row["notes"]
+    changes = {k: v for k, v in changes.items() if getattr(obj, k) != v}
+    if changes:
+        obj.update_from_dict(changes)
+    return bool(changes)
+
+
+def _new_entity(row: dict):
+    model = CREATE_MODELS[row["type"]]
+    obj = model()
+    data = {
+        "name": row["name"],
+        "hostname": row["hostname"] or row["ip"],
+        "ip_address": row["ip"],
+        "notes": row["notes"],
+    }
+    if row["mac"]:
+        data["mac_address"] = row["mac"]  # ignored by models without the column
+    obj.update_from_dict(data)
+    return obj
+
+
+def _flush(steps: list[tuple[dict, Callable[[], None]]], errors: list[dict]) -> set[int]:
+    """
+    Apply and flush every step in one go; if that fails, replay them one
+    SAVEPOINT each so only the failing rows are dropped. Returns the
+    indices of steps that did not make it.
+    """
+    if not steps:
+        return set()
+    try:
+        with db.session.begin_nested():
+            for _, apply in steps:
+                apply()
+            db.session.flush()
+        return set()
+    except Exception as exc:
+        logger.info("Bulk import flush failed (%s); retrying row by row", exc)
+
+    failed: set[int] = set()
+    for i, (row, apply) in enumerate(steps):
+        try:
+            with db.session.begin_nested():
+                apply()
+                db.session.flush()
+        except Exception as exc:
+            failed.add(i)
+            errors.append({"ip": row["ip"], "error": str(exc)})
+    return failed
+
+
+def import_hosts(hosts: list[dict]) -> dict:
+    """
+    Upsert discovered *hosts* ({ip, type, name, hostname?, mac_address?,
+    notes?}) into inventory and commit.
+
+    Returns {imported, updated, unchanged, by_type, hosts, errors}; hosts
+    lists {ip, type, id, action} with action created / updated / unchanged.
+    Raises on commit failure (the session is rolled back).
+    """
+    rows, errors = _normalize(hosts)
+    index = _Index()
+    index.load(rows)
+
+    assigned, conflicts = _assign(rows, index)
+    errors.extend(conflicts)
+    conflicted = {c["ip"] for c in conflicts}
+
+    creates: list[tuple[dict, object]] = []
+    updates: list[tuple[dict, str, object]] = []
+    results: list[dict] = []
+    for i, row in enumerate(rows):
+        if i in assigned:
+            updates.append((row, *assigned[i]))
+        elif row["ip"] not in conflicted:
+            creates.append((row, _new_entity(row)))
+
+    changed: dict[int, bool] = {}
+
+    def merge(i: int, obj, row: dict) -> None:
+        changed[i] = _merge(obj, row)
+
+    update_failed = _flush(
+        [(row, lambda i=i, obj=obj, row=row: merge(i, obj, row)) for i, (row, _, obj) in enumerate(updates)],
+        errors,
+    )
+    create_failed = _flush([(row, lambda obj=obj: db.session.add(obj)) for row, obj in creates], errors)
+
+    try:
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    to_index: list[tuple[str, int, dict]] = []
+    by_type: dict[str, int] = {}
+    counts = {"created": 0, "updated": 0, "unchanged": 0}
+
+    def record(row: dict, entity_type: str, obj, action: str) -> None:
+        counts[action] += 1
+        if action != "unchanged":
+            by_type[entity_type] = by_type.get(entity_type, 0) + 1
+            to_index.append((entity_type, obj.id, obj.to_dict()))
+        results.append({"ip": row["ip"], "type": entity_type, "id": obj.id, "action": action})
+
+    for i, (row, obj) in enumerate(creates):
+        if i not in create_failed:
+            record(row, row["type"], obj, "created")
+    for i, (row, entity_type, obj) in enumerate(updates):
+        if i not in update_failed:
+            record(row, entity_type, obj, "updated" if changed.get(i) else "unchanged")
+
+    position = {row["ip"]: i for i, row in enumerate(rows)}
+    results.sort(key=lambda r: position[r["ip"]])
+    SearchService.upsert_many(to_index)
+    return {
+        "imported": counts["created"],
+        "updated": counts["updated"],
+        "unchanged": counts["unchanged"],
+        "by_type": by_type,
+        "hosts": results,
+        "errors": errors,
+    }
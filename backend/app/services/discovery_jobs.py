@@ -0,0 +1,209 @@
+"""
+Background discovery jobs.
+
+A job scans one CIDR in fixed-size chunks of hosts. After each chunk the
+results and the job's cursor are committed together, so a worker restart
+or crash loses at most one chunk: another runner picks the job up once
+its heartbeat goes stale and resumes from the cursor.
+
+Each gunicorn worker runs one JobRunner thread (started from wsgi.py, or
+lazily on first submit). Runners claim jobs with SELECT … FOR UPDATE
+SKIP LOCKED, so several workers never process the same job. A runner
+whose heartbeat went stale mid-chunk may find its job resumed elsewhere;
+every commit is conditional on the job still naming this runner, so a
+runner that lost its job stops without writing the chunk.
+
+Usage:
+    from app.services.discovery_jobs import submit_job, cancel_job
+
+    job = submit_job("10.0.0.0/20", concurrency=512, timeout=1.0)
+    cancel_job(job.id)
+"""
+from __future__ import annotations
+
+import ipaddress
+import json
+import logging
+import os
+import socket
+import threading
+from datetime import timedelta
+
+from sqlalchemy import and_, or_, update
+
+from ..models import DiscoveryJob, DiscoveryResult, db
+from ..models.discovery import utcnow
+from .discovery import host_count, host_range, scan_ips
+
+logger = logging.getLogger(__name__)
+
+_runner: "JobRunner | None" = None
+_runner_lock = threading.Lock()
+
+
+def submit_job(cidr: str, concurrency: int, timeout: float) -> DiscoveryJob:
+    job = DiscoveryJob(
+        cidr=cidr,
+        concurrency=concurrency,
+        timeout=timeout,
+        status="queued",
+        total_hosts=host_count(cidr),
+    )
+    db.session.add(job)
+    db.session.commit()
+    if _runner is not None:
+        _runner.wake()
+    return job
+
+
+def cancel_job(job: DiscoveryJob) -> DiscoveryJob:
+    """Flag *job* for cancellation; queued jobs are cancelled immediately."""
+    if job.status == "queued":
+        job.status = "cancelled"
+        job.finished_at = utcnow()
+    elif job.status == "running":
+        job.cancel_requested = True
+    db.session.commit()
+    return job
+
+
+def _hosts_slice(cidr: str, start: int, count: int) -> list[str]:
+    # host_range() slices in O(1): resuming at host 60,000 doesn't walk the first 60,000
+    return [str(ipaddress.ip_address(ip)) for ip in host_range(cidr)[start:start + count]]
+
+
+class JobRunner(threading.Thread):
+    """Claims queued (or abandoned) jobs and works through them chunk by chunk."""
+
+    def __init__(self, app) -> None:
+        super().__init__(name="discovery-jobs", daemon=True)
+        self.app = app
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.chunk_size = app.config.get("DISCOVERY_JOB_CHUNK", 256)
+        self.poll_interval = app.config.get("DISCOVERY_JOB_POLL", 2.0)
+        self.stale_after = timedelta(seconds=app.config.get("DISCOVERY_JOB_STALE", 120))
+        self._wake = threading.Event()
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def run(self) -> None:
+        while True:
+            worked = False
+            with self.app.app_context():
+                try:
+                    job_id = self._claim()
+                    if job_id is not None:
+                        self._process(job_id)
+                        worked = True
+                except Exception:
+                    logger.exception("Discovery job runner iteration failed")
+                finally:
+                    db.session.remove()
+            if not worked:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def _claim(self) -> int | None:
+        stale_cutoff = utcnow() - self.stale_after
+        job = (
+            DiscoveryJob.query
+            .filter(or_(
+                DiscoveryJob.status == "queued",
+                and_(DiscoveryJob.status == "running", DiscoveryJob.heartbeat_at < stale_cutoff),
+            ))
+            .order_by(DiscoveryJob.id)
+            .with_for_update(skip_locked=True)
+            .first()
+        )
+        if job is None:
+            db.session.rollback()
+            return None
+
+        if job.status == "running":
+            logger.info("Resuming discovery job %s at host %s/%s", job.id, job.cursor, job.total_hosts)
+        now = utcnow()
+        job.status = "running"
+        job.worker_id = self.worker_id
+        job.started_at = job.started_at or now
+        job.heartbeat_at = now
+        db.session.commit()
+        return job.id
+
+    def _update_owned(self, job_id: int, *conditions, **values) -> bool:
+        """
+        Update the job only while this runner still owns it (and *conditions*
+        hold); False if another runner has taken it over because our
+        heartbeat went stale mid-chunk.
+        """
+        result = db.session.execute(
+            update(DiscoveryJob)
+            .where(DiscoveryJob.id == job_id, DiscoveryJob.worker_id == self.worker_id, *conditions)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount == 1
+
+    def _lost(self, job_id: int) -> None:
+        db.session.rollback()
+        logger.warning("Discovery job %s was taken over by another runner; stopping", job_id)
+
+    def _process(self, job_id: int) -> None:
+        job = db.session.get(DiscoveryJob, job_id)
+        try:
+            while job.cursor < job.total_hosts:
+                db.session.refresh(job)
+                if job.worker_id != self.worker_id:
+                    self._lost(job_id)
+                    return
+                if job.cancel_requested:
+                    if not self._update_owned(job_id, status="cancelled", finished_at=utcnow()):
+                        self._lost(job_id)
+                        return
+                    db.session.commit()
+                    logger.info("Discovery job %s cancelled at %s/%s", job_id, job.cursor, job.total_hosts)
+                    return
+
+                cursor = job.cursor
+                ips = _hosts_slice(job.cidr, cursor, self.chunk_size)
+                results = scan_ips(ips, concurrency=job.concurrency, timeout=job.timeout)
+
+                # Results and cursor advance in one transaction → resumable. The
+                # conditional UPDATE goes first so it takes the row lock, and a
+                # runner that lost the job meanwhile commits nothing.
+                if not self._update_owned(
+                    job_id,
+                    DiscoveryJob.cursor == cursor,
+                    cursor=cursor + len(ips),
+                    alive_count=DiscoveryJob.alive_count + sum(1 for r in results if r["alive"]),
+                    heartbeat_at=utcnow(),
+                ):
+                    self._lost(job_id)
+                    return
+                db.session.add_all(
+                    DiscoveryResult(job_id=job_id, ip=r["ip"], alive=bool(r["alive"]), data=json.dumps(r))
+                    for r in results
+                )
+                db.session.commit()
+
+            if self._update_owned(job_id, status="done", finished_at=utcnow()):
+                db.session.commit()
+            else:
+                self._lost(job_id)
+        except Exception as exc:
+            db.session.rollback()
+            logger.exception("Discovery job %s failed", job_id)
+            if self._update_owned(job_id, status="failed", error=str(exc), finished_at=utcnow()):
+                db.session.commit()
+            else:
+                db.session.rollback()
+
+
+def start_job_runner(app) -> JobRunner:
+    """Start this process's job runner (idempotent)."""
+    global _runner
+    with _runner_lock:
+        if _runner is None or not _runner.is_alive():
+            _runner = JobRunner(app)
+            _runner.start()
+    return _runner
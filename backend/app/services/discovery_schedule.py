@@ -0,0 +1,342 @@
+"""
+Scheduled periodic discovery with a change feed.
+
+Every CIDR in DISCOVERY_SCHEDULE_CIDRS is rescanned each
+DISCOVERY_SCHEDULE_INTERVAL seconds. Subnets are staggered evenly across
+the interval (the i-th of n first runs at i/n of it) and keep that phase,
+so the load is spread out rather than arriving in one burst.
+
+A run is an incremental scan of live hosts only, so the discovery cache
+spares re-probing ports, DNS and banners that are still fresh. Its
+result is diffed against the discovered_hosts baseline, and only the
+differences are stored, as discovery_changes rows:
+
+  appeared       a host not alive at the last run answers now
+  disappeared    a known host missed DISCOVERY_SCHEDULE_MISSES runs in a row
+  ports_changed  open ports differ (opened / closed)
+  mac_changed    the IP now answers from a different MAC
+  ip_drift       the MAC belongs to an inventory entity recorded at another IP
+  mac_drift      the IP belongs to an inventory entity recorded with another MAC
+
+Drift is reported once, when it starts or changes. Baseline rows are
+only rewritten when something changed; last_seen_at is bumped with one
+UPDATE per run.
+
+Each gunicorn worker runs a DiscoveryScheduler thread (started from
+wsgi.py). Subnets are claimed with SELECT … FOR UPDATE SKIP LOCKED, as
+discovery jobs are, so one run happens per subnet per interval however
+many workers there are.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import timedelta
+from typing import Optional
+
+from sqlalchemy import func, or_
+from sqlalchemy.exc import IntegrityError
+
+from ..models import VM, DiscoveredHost, DiscoveryChange, DiscoverySubnet, Hardware, db
+from ..models.discovery import utcnow
+from .discovery import scan_cidr
+from .discovery_cache import HostCache
+from .oui import normalize_mac
+
+logger = logging.getLogger(__name__)
+
+_scheduler: "DiscoveryScheduler | None" = None
+_scheduler_lock = threading.Lock()
+
+_IN_CHUNK = 500
+
+
+def scheduled_cidrs(app) -> list[str]:
+    return [c.strip() for c in app.config.get("DISCOVERY_SCHEDULE_CIDRS", "").split(",") if c.strip()]
+
+
+def _chunks(values: list, size: int = _IN_CHUNK):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+# ---------------------------------------------------------------------------
+# Diffing
+# ---------------------------------------------------------------------------
+
+def _inventory_by_mac_and_ip(hosts: list[dict]) -> tuple[dict[str, dict], dict[str, dict]]:
+    """Inventory entities with a MAC that share a MAC or IP with *hosts*."""
+    macs = sorted({h["mac"] for h in hosts if h["mac"]})
+    ips = sorted({h["ip"] for h in hosts})
+    by_mac: dict[str, dict] = {}
+    by_ip: dict[str, dict] = {}
+    for entity_type, model in (("hardware", Hardware), ("vms", VM)):
+        rows = []
+        for chunk in _chunks(macs):
+            rows += model.query.filter(func.lower(model.mac_address).in_(chunk)).all()
+        for chunk in _chunks(ips):
+            rows += model.query.filter(model.ip_address.in_(chunk), model.mac_address.isnot(None)).all()
+        for row in rows:
+            mac = normalize_mac(row.mac_address)
+            if not mac:
+                continue
+            entity = {"entity_type": entity_type, "entity_id": row.id, "name": row.name,
+                      "ip": row.ip_address, "mac": mac}
+            by_mac.setdefault(mac, entity)
+            if row.ip_address:
+                by_ip.setdefault(row.ip_address, entity)
+    return by_mac, by_ip
+
+
+def _drift(host: dict, by_mac: dict[str, dict], by_ip: dict[str, dict]) -> list[tuple[str, dict]]:
+    events = []
+    owner = by_mac.get(host["mac"]) if host["mac"] else None
+    if owner and owner["ip"] != host["ip"]:
+        events.append(("ip_drift", {
+            "entity_type": owner["entity_type"], "entity_id": owner["entity_id"], "name": owner["name"],
+            "inventory_ip": owner["ip"], "observed_ip": host["ip"], "mac": host["mac"],
+        }))
+    holder = by_ip.get(host["ip"])
+    if holder and host["mac"] and holder["mac"] != host["mac"]:
+        events.append(("mac_drift", {
+            "entity_type": holder["entity_type"], "entity_id": holder["entity_id"], "name": holder["name"],
+            "inventory_mac": holder["mac"], "observed_mac": host["mac"], "ip": host["ip"],
+        }))
+    return events
+
+
+def _drift_key(events: list[tuple[str, dict]]) -> Optional[str]:
+    if not events:
+        return None
+    return ";".join(
+        f"{kind}:{d['entity_type']}/{d['entity_id']}:{d.get('inventory_ip') or d.get('inventory_mac')}"
+        for kind, d in events
+    )
+
+
+def record_run(cidr: str, results: list[dict], misses_allowed: int, now=None) -> list[DiscoveryChange]:
+    """
+    Diff one run's live *results* against the baseline for *cidr*, stage
+    the changed baseline rows and the change events in the session, and
+    return the events (the caller commits).
+    """
+    now = now or utcnow()
+    seen = {
+        r["ip"]: {
+            "ip": r["ip"],
+            "mac": normalize_mac(r.get("mac_address")),
+            "hostname": r.get("hostname"),
+            "ports": sorted(r.get("open_ports") or []),
+            "fingerprint": r.get("fingerprint"),
+        }
+        for r in results if r.get("alive")
+    }
+
+    baseline = {h.ip: h for h in DiscoveredHost.query.filter_by(cidr=cidr)}
+    # Hosts last recorded under another (overlapping) scheduled subnet
+    for chunk in _chunks(sorted(set(seen) - set(baseline))):
+        baseline.update((h.ip, h) for h in DiscoveredHost.query.filter(DiscoveredHost.ip.in_(chunk)))
+
+    by_mac, by_ip = _inventory_by_mac_and_ip(list(seen.values()))
+    changes: list[DiscoveryChange] = []
+    untouched: list[str] = []
+
+    def emit(ip: str, kind: str, detail: dict) -> None:
+        changes.append(DiscoveryChange(cidr=cidr, ip=ip, kind=kind, detail=json.dumps(detail), created_at=now))
+
+    for ip, host in seen.items():
+        drift = _drift(host, by_mac, by_ip)
+        drift_key = _drift_key(drift)
+        row = baseline.get(ip)
+        if row is None or not row.alive:
+            emit(ip, "appeared", {"mac": host["mac"], "hostname": host["hostname"],
+                                  "open_ports": host["ports"], "fingerprint": host["fingerprint"]})
+            if row is None:
+                row = DiscoveredHost(ip=ip, first_seen_at=now)
+                db.session.add(row)
+        else:
+            before = row.ports()
+            if before != host["ports"]:
+                emit(ip, "ports_changed", {
+                    "opened": sorted(set(host["ports"]) - set(before)),
+                    "closed": sorted(set(before) - set(host["ports"])),
+                })
+            if row.mac_address and host["mac"] and row.mac_address != host["mac"]:
+                emit(ip, "mac_changed", {"old": row.mac_address, "new": host["mac"]})
+        if drift_key and drift_key != row.drift:
+            for kind, detail in drift:
+                emit(ip, kind, detail)
+
+        state = {
+            "cidr": cidr,
+            "alive": True,
+            "misses": 0,
+            "mac_address": host["mac"] or row.mac_address,
+            "hostname": host["hostname"] or row.hostname,
+            "open_ports": json.dumps(host["ports"]),
+            "fingerprint": host["fingerprint"],
+            "drift": drift_key,
+        }
+        if any(getattr(row, k) != v for k, v in state.items()):
+            for k, v in state.items():
+                setattr(row, k, v)
+            row.last_seen_at = now
+        else:
+            untouched.append(ip)
+
+    for ip, row in baseline.items():
+        if ip in seen or row.cidr != cidr or not row.alive:
+            continue
+        row.misses += 1
+        if row.misses >= misses_allowed:
+            row.alive = False
+            emit(ip, "disappeared", {"mac": row.mac_address, "hostname": row.hostname,
+                                     "last_seen_at": row.last_seen_at.isoformat()})
+
+    for chunk in _chunks(untouched):
+        DiscoveredHost.query.filter(DiscoveredHost.ip.in_(chunk)).update(
+            {DiscoveredHost.last_seen_at: now}, synchronize_session=False
+        )
+    db.session.add_all(changes)
+    return changes
+
+
+# ---------------------------------------------------------------------------
+# Scheduler
+# ---------------------------------------------------------------------------
+
+class DiscoveryScheduler(threading.Thread):
+    """Claims due subnets, scans them and records what changed."""
+
+    def __init__(self, app) -> None:
+        super().__init__(name="discovery-scheduler", daemon=True)
+        cfg = app.config
+        self.app = app
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.cidrs = scheduled_cidrs(app)
+        self.interval = timedelta(seconds=cfg.get("DISCOVERY_SCHEDULE_INTERVAL", 300))
+        self.poll_interval = cfg.get("DISCOVERY_JOB_POLL", 2.0)
+        # A run doesn't heartbeat mid-scan, so allow at least one interval
+        self.stale_after = max(timedelta(seconds=cfg.get("DISCOVERY_JOB_STALE", 120)), self.interval)
+        self.misses = max(1, cfg.get("DISCOVERY_SCHEDULE_MISSES", 2))
+        self.retain = timedelta(days=cfg.get("DISCOVERY_CHANGE_RETAIN_DAYS", 30))
+        self.scan_opts = dict(
+            concurrency=cfg.get("DISCOVERY_SCHEDULE_CONCURRENCY", 256),
+            timeout=cfg.get("DISCOVERY_SCHEDULE_TIMEOUT", 1.0),
+            min_timeout=cfg.get("DISCOVERY_RTT_FLOOR", 0.05),
+            profile=cfg.get("DISCOVERY_SCHEDULE_PROFILE", "standard"),
+        )
+        self._wake = threading.Event()
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def run(self) -> None:
+        while True:
+            cidr = None
+            with self.app.app_context():
+                try:
+                    self._sync()
+                    cidr = self._claim()
+                    if cidr is not None:
+                        self._run(cidr)
+                except Exception:
+                    logger.exception("Discovery scheduler iteration failed")
+                finally:
+                    db.session.remove()
+            if cidr is None:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def _sync(self) -> None:
+        """Create schedule rows for new subnets, staggered across one interval."""
+        existing = {s.cidr for s in DiscoverySubnet.query.with_entities(DiscoverySubnet.cidr)}
+        now = utcnow()
+        added = False
+        for i, cidr in enumerate(self.cidrs):
+            if cidr not in existing:
+                db.session.add(DiscoverySubnet(cidr=cidr, next_run_at=now + self.interval * i / len(self.cidrs)))
+                added = True
+        if added:
+            try:
+                db.session.commit()
+            except IntegrityError:  # another worker got there first
+                db.session.rollback()
+
+    def _claim(self) -> Optional[str]:
+        now = utcnow()
+        subnet = (
+            DiscoverySubnet.query
+            .filter(
+                DiscoverySubnet.cidr.in_(self.cidrs),
+                DiscoverySubnet.next_run_at <= now,
+                or_(DiscoverySubnet.worker_id.is_(None), DiscoverySubnet.heartbeat_at < now - self.stale_after),
+            )
+            .order_by(DiscoverySubnet.next_run_at)
+            .with_for_update(skip_locked=True)
+            .first()
+        )
+        if subnet is None:
+            db.session.rollback()
+            return None
+        # Keep the subnet's phase; if we fell behind, start a fresh cadence from now
+        subnet.next_run_at = max(subnet.next_run_at + self.interval, now + self.interval / 2)
+        subnet.worker_id = self.worker_id
+        subnet.heartbeat_at = now
+        subnet.last_started_at = now
+        db.session.commit()
+        return subnet.cidr
+
+    def _run(self, cidr: str) -> None:
+        t0 = time.monotonic()
+        cache = HostCache.from_app(self.app)
+        try:
+            results = scan_cidr(cidr, include_dead=False, cache=cache, incremental=cache is not None, **self.scan_opts)
+            changes = record_run(cidr, results, self.misses)
+            DiscoveryChange.query.filter(DiscoveryChange.created_at < utcnow() - self.retain).delete(
+                synchronize_session=False
+            )
+            error = None
+        except Exception as exc:
+            db.session.rollback()
+            logger.exception("Scheduled discovery of %s failed", cidr)
+            results, changes, error = [], [], str(exc)
+
+        subnet = db.session.get(DiscoverySubnet, cidr)
+        subnet.worker_id = None
+        subnet.last_finished_at = utcnow()
+        subnet.last_duration_ms = round((time.monotonic() - t0) * 1000, 1)
+        subnet.last_alive = sum(1 for r in results if r.get("alive"))
+        subnet.last_changes = len(changes)
+        subnet.last_error = error
+        db.session.commit()
+        if changes:
+            logger.info("Scheduled discovery of %s: %d change(s)", cidr, len(changes))
+
+
+def run_now(cidr: str) -> Optional[DiscoverySubnet]:
+    """Make a scheduled subnet due immediately; None if it isn't scheduled."""
+    subnet = db.session.get(DiscoverySubnet, cidr)
+    if subnet is None:
+        return None
+    subnet.next_run_at = utcnow()
+    db.session.commit()
+    if _scheduler is not None:
+        _scheduler.wake()
+    return subnet
+
+
+def start_scheduler(app) -> Optional[DiscoveryScheduler]:
+    """Start this process's scheduler if any subnets are configured (idempotent)."""
+    global _scheduler
+    if not scheduled_cidrs(app):
+        return None
+    with _scheduler_lock:
+        if _scheduler is None or not _scheduler.is_alive():
+            _scheduler = DiscoveryScheduler(app)
+            _scheduler.start()
+    return _scheduler
@@ -0,0 +1,273 @@
+"""
+IPv6 candidate discovery.
+
+An IPv6 /64 has 2^64 addresses, so walking it the way scan_cidr() walks
+an IPv4 subnet is impossible. Instead this gathers the addresses that are
+actually in use and hands only those to the regular probe pipeline:
+
+  neighbors   the kernel's IPv6 neighbor cache (what ``ip -6 neigh``
+              shows), read over rtnetlink, with the MAC of each entry
+  multicast   echo replies to all-nodes multicast (ff02::1) on every
+              interface. The echo is sent once from each of the
+              interface's global/ULA addresses, so hosts answer from their
+              own global address (RFC 6724 source selection), and once from
+              its link-local address
+  derived     for a link-local reply fe80::<iid>, <on-link /64>::<iid>.
+              Hosts with EUI-64 or otherwise stable interface IDs use the
+              same ID in every prefix; wrong guesses just don't answer
+  inventory   IPv6 addresses already recorded on Hardware, VMs, apps and misc
+
+Link-local addresses themselves are not probed: they need a zone
+(fe80::1%eth0) that the integer-IP scan pipeline can't carry.
+
+Multicast echo needs an unprivileged ICMPv6 socket (net.ipv4.ping_group_range
+must include the process's group) or CAP_NET_RAW; without one that source
+is skipped and the others still work.
+"""
+from __future__ import annotations
+
+import ipaddress
+import logging
+import os
+import select
+import socket
+import struct
+import time
+from typing import Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+ALL_NODES = "ff02::1"
+
+# rtnetlink constants (linux/rtnetlink.h, linux/neighbour.h)
+_RTM_NEWNEIGH = 28
+_RTM_GETNEIGH = 30
+_NLM_F_REQUEST = 0x1
+_NLM_F_DUMP = 0x300
+_NLMSG_ERROR = 2
+_NLMSG_DONE = 3
+_NDA_DST = 1
+_NDA_LLADDR = 2
+_NUD_INCOMPLETE = 0x01
+_NUD_FAILED = 0x20
+_NUD_NOARP = 0x40
+
+_NLMSGHDR = struct.Struct("=IHHII")
+_NDMSG = struct.Struct("=BBHiHBB")
+_RTATTR = struct.Struct("=HH")
+
+_ICMP6_ECHO_REQUEST = 128
+
+
+def _align(n: int) -> int:
+    return (n + 3) & ~3
+
+
+# ---------------------------------------------------------------------------
+# Local interfaces
+# ---------------------------------------------------------------------------
+
+def local_addresses(path: str = "/proc/net/if_inet6") -> list[tuple[str, int, ipaddress.IPv6Interface]]:
+    """This host's IPv6 addresses as (ifname, ifindex, address/prefix), loopback excluded."""
+    out = []
+    try:
+        with open(path) as fh:
+            for line in fh:
+                parts = line.split()
+                if len(parts) < 6 or parts[5] == "lo":
+                    continue
+                addr = ipaddress.IPv6Address(bytes.fromhex(parts[0]))
+                out.append((parts[5], int(parts[1], 16), ipaddress.IPv6Interface(f"{addr}/{int(parts[2], 16)}")))
+    except OSError:
+        pass
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Neighbor cache
+# ---------------------------------------------------------------------------
+
+def _parse_neighbors(data: bytes, out: dict[str, Optional[str]]) -> bool:
+    """Parse one rtnetlink dump datagram into *out*; False once the dump is done."""
+    offset = 0
+    while offset + _NLMSGHDR.size <= len(data):
+        length, msg_type, _, _, _ = _NLMSGHDR.unpack_from(data, offset)
+        if length < _NLMSGHDR.size:
+            return False
+        if msg_type in (_NLMSG_DONE, _NLMSG_ERROR):
+            return False
+        if msg_type == _RTM_NEWNEIGH:
+            body = offset + _NLMSGHDR.size
+            family, _, _, _, state, _, _ = _NDMSG.unpack_from(data, body)
+            dst = mac = None
+            attr = body + _NDMSG.size
+            while attr + _RTATTR.size <= offset + length:
+                attr_len, attr_type = _RTATTR.unpack_from(data, attr)
+                if attr_len < _RTATTR.size:
+                    break
+                value = data[attr + _RTATTR.size:attr + attr_len]
+                if attr_type == _NDA_DST and len(value) == 16:
+                    dst = str(ipaddress.IPv6Address(value))
+                elif attr_type == _NDA_LLADDR and len(value) == 6:
+                    mac = ":".join(f"{b:02x}" for b in value)
+                attr += _align(attr_len)
+            if family == socket.AF_INET6 and dst and not state & (_NUD_INCOMPLETE | _NUD_FAILED | _NUD_NOARP):
+                out[dst] = mac
+        offset += _align(length)
+    return True
+
+
+def neighbors(timeout: float = 1.0) -> dict[str, Optional[str]]:
+    """The kernel's IPv6 neighbor cache as {address: mac or None} (empty if unreadable)."""
+    out: dict[str, Optional[str]] = {}
+    try:
+        with socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE) as sock:
+            sock.settimeout(timeout)
+            sock.bind((0, 0))
+            request = _NDMSG.pack(socket.AF_INET6, 0, 0, 0, 0, 0, 0)
+            header = _NLMSGHDR.pack(_NLMSGHDR.size + len(request), _RTM_GETNEIGH,
+                                    _NLM_F_REQUEST | _NLM_F_DUMP, 1, 0)
+            sock.send(header + request)
+            while _parse_neighbors(sock.recv(65536), out):
+                pass
+    except (OSError, AttributeError, struct.error) as exc:  # AttributeError: no AF_NETLINK (non-Linux)
+        logger.debug("IPv6 neighbor dump failed: %s", exc)
+    return out
+
+
+# ---------------------------------------------------------------------------
+# All-nodes multicast echo
+# ---------------------------------------------------------------------------
+
+def _echo_socket(source: str, ifindex: int) -> socket.socket:
+    try:
+        sock = socket.socket(socket.AF_INET6, socket.SOCK_DGRAM, socket.IPPROTO_ICMPV6)
+    except PermissionError:
+        sock = socket.socket(socket.AF_INET6, socket.SOCK_RAW, socket.IPPROTO_ICMPV6)
+    try:
+        sock.setblocking(False)
+        sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_MULTICAST_IF, ifindex)
+        sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_MULTICAST_HOPS, 1)
+        sock.bind((source, 0, 0, ifindex if source.startswith("fe80") else 0))
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def multicast_echo(
+    interfaces: Optional[Iterable[str]] = None, timeout: float = 1.0
+) -> set[tuple[str, int]]:
+    """
+    Ping ff02::1 from every IPv6 address of each interface (all but
+    loopback by default) and collect the replies for *timeout* seconds.
+
+    Returns {(replying address, ifindex)}; empty if ICMPv6 sockets aren't
+    permitted here.
+    """
+    wanted = set(interfaces) if interfaces else None
+    sockets: dict[socket.socket, int] = {}
+    ident = os.getpid() & 0xFFFF
+    packet = struct.pack("!BBHHH", _ICMP6_ECHO_REQUEST, 0, 0, ident, 1) + b"homelab-hub"
+    for ifname, ifindex, iface in local_addresses():
+        if wanted is not None and ifname not in wanted:
+            continue
+        if not (iface.ip.is_link_local or iface.ip.is_global or iface.ip.is_private):
+            continue
+        try:
+            sock = _echo_socket(str(iface.ip), ifindex)
+            sockets[sock] = ifindex
+            sock.sendto(packet, (ALL_NODES, 0, 0, ifindex))
+        except OSError as exc:
+            logger.debug("Multicast echo from %s%%%s failed: %s", iface.ip, ifname, exc)
+
+    replies: set[tuple[str, int]] = set()
+    deadline = time.monotonic() + timeout
+    try:
+        while sockets and (remaining := deadline - time.monotonic()) > 0:
+            ready, _, _ = select.select(list(sockets), [], [], remaining)
+            for sock in ready:
+                try:
+                    data, addr = sock.recvfrom(1500)
+                except OSError:
+                    continue
+                if data and data[0] == _ICMP6_ECHO_REQUEST + 1:
+                    replies.add((addr[0].split("%")[0], sockets[sock]))
+    finally:
+        for sock in sockets:
+            sock.close()
+    return replies
+
+
+# ---------------------------------------------------------------------------
+# Candidates
+# ---------------------------------------------------------------------------
+
+def inventory_addresses() -> set[str]:
+    """IPv6 addresses recorded on inventory entities."""
+    from ..models import AppService, Hardware, Misc, VM
+
+    found = set()
+    for model in (Hardware, VM, AppService, Misc):
+        for (value,) in model.query.with_entities(model.ip_address).filter(model.ip_address.contains(":")):
+            try:
+                found.add(str(ipaddress.IPv6Address(value.strip())))
+            except ValueError:
+                continue
+    return found
+
+
+def _probeable(addr: ipaddress.IPv6Address) -> bool:
+    return not (addr.is_link_local or addr.is_multicast or addr.is_loopback or addr.is_unspecified)
+
+
+def gather_candidates(
+    scope: Iterable[str] = (),
+    interfaces: Optional[Iterable[str]] = None,
+    timeout: float = 1.0,
+    inventory: Iterable[str] = (),
+) -> dict[str, set[str]]:
+    """
+    Collect IPv6 addresses worth probing.
+
+    *scope* (IPv6 prefixes) limits the result; by default any probeable
+    address is kept. *inventory* is extra known addresses (see
+    inventory_addresses()). Returns {address: sources}; MACs are picked up
+    from the same neighbor cache during the scan.
+    """
+    prefixes = [ipaddress.IPv6Network(p, strict=False) for p in scope]
+    local = local_addresses()
+    own = {str(iface.ip) for _, _, iface in local}
+    on_link: dict[int, list[ipaddress.IPv6Network]] = {}
+    for _, ifindex, iface in local:
+        if _probeable(iface.ip) and iface.network.prefixlen == 64:
+            on_link.setdefault(ifindex, []).append(iface.network)
+
+    found: dict[str, set[str]] = {}
+
+    def add(address: str, source: str) -> None:
+        addr = ipaddress.IPv6Address(address)
+        if not _probeable(addr) or str(addr) in own:
+            return
+        if prefixes and not any(addr in p for p in prefixes):
+            return
+        found.setdefault(str(addr), set()).add(source)
+
+    replies = multicast_echo(interfaces, timeout)
+    for address, ifindex in replies:
+        addr = ipaddress.IPv6Address(address)
+        if address in own:  # multicast loops back to us
+            continue
+        if addr.is_link_local:
+            iid = int(addr) & ((1 << 64) - 1)
+            for network in on_link.get(ifindex, ()):
+                add(str(network[iid]), "derived")
+        else:
+            add(address, "multicast")
+
+    # Read after the echo: replies have just populated the cache
+    for address in neighbors():
+        add(address, "neighbors")
+    for address in inventory:
+        add(address, "inventory")
+    return found
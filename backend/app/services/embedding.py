@@ -0,0 +1,119 @@
+"""
+Embedding backends for semantic search.
+
+Two interchangeable backends produce the same 384-dim, L2-normalised
+all-MiniLM-L6-v2 vectors:
+
+  sentence-transformers  PyTorch model via sentence-transformers (default).
+                         Downloads the model on first use.
+  onnx                   int8-quantised ONNX graph run with onnxruntime and
+                         a HuggingFace `tokenizers` tokenizer. No torch
+                         needed; loads from a local model directory built by
+                         scripts/export_onnx_model.py.
+
+Select with EMBEDDING_BACKEND; the ONNX model directory is EMBEDDING_MODEL_DIR.
+
+Both expose encode(text | list[str]) → numpy array, mirroring
+SentenceTransformer.encode: a single string gives a 1-D vector, a list
+gives an (n, 384) matrix.
+"""
+from __future__ import annotations
+
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+EMBEDDING_DIM = 384
+
+BACKENDS = ("sentence-transformers", "onnx")
+
+
+class SentenceTransformerEmbedder:
+    """The original in-process PyTorch backend."""
+
+    name = "sentence-transformers"
+
+    def __init__(self, model_name: str = MODEL_NAME) -> None:
+        from sentence_transformers import SentenceTransformer
+        self._model = SentenceTransformer(model_name)
+
+    def encode(self, texts):
+        return self._model.encode(texts)
+
+
+class OnnxEmbedder:
+    """
+    all-MiniLM-L6-v2 as a (quantised) ONNX graph.
+
+    Reproduces the sentence-transformers pipeline: WordPiece tokenisation,
+    transformer forward pass, attention-masked mean pooling, L2 normalise.
+
+    The model directory must contain ``tokenizer.json`` and either
+    ``model_quantized.onnx`` (preferred) or ``model.onnx``.
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_dir: str, max_length: int = 256, threads: int | None = None) -> None:
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        model_path = os.path.join(model_dir, "model_quantized.onnx")
+        if not os.path.isfile(model_path):
+            model_path = os.path.join(model_dir, "model.onnx")
+        if not os.path.isfile(model_path):
+            raise FileNotFoundError(f"No model_quantized.onnx or model.onnx in {model_dir}")
+
+        self._tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self._tokenizer.enable_truncation(max_length=max_length)
+        self._tokenizer.enable_padding()
+
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            opts.intra_op_num_threads = threads
+        self._session = ort.InferenceSession(
+            model_path, sess_options=opts, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {i.name for i in self._session.get_inputs()}
+        logger.info("Loaded ONNX embedder from %s", model_path)
+
+    def encode(self, texts):
+        import numpy as np
+
+        single = isinstance(texts, str)
+        batch = [texts] if single else list(texts)
+        if not batch:
+            return np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+
+        encodings = self._tokenizer.encode_batch(batch)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+
+        token_embeddings = self._session.run(None, feeds)[0]
+
+        mask = attention_mask[..., None].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        counts = np.clip(mask.sum(axis=1), 1e-9, None)
+        pooled = summed / counts
+        norms = np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        vectors = (pooled / norms).astype(np.float32)
+
+        return vectors[0] if single else vectors
+
+
+def create_embedder(backend: str = "sentence-transformers", model_dir: str | None = None):
+    """Instantiate the embedding backend named by *backend*."""
+    if backend == "onnx":
+        if not model_dir:
+            raise ValueError("EMBEDDING_MODEL_DIR is required for the onnx backend")
+        return OnnxEmbedder(model_dir)
+    if backend == "sentence-transformers":
+        return SentenceTransformerEmbedder()
+    raise ValueError(f"Unknown embedding backend {backend!r} (expected one of {', '.join(BACKENDS)})")
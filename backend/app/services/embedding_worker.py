@@ -0,0 +1,275 @@
+"""
+Shared embedding worker (sidecar) for all gunicorn workers.
+
+One process loads the embedding model and serves encode requests over a
+local Unix socket, so model memory is paid once per host no matter how
+many gunicorn workers run. Requests that arrive close together are
+micro-batched into a single encode() call.
+
+Start it before gunicorn (docker-entrypoint.sh does this when
+EMBEDDING_SOCKET is set, restarting it if it exits):
+
+    python -m app.services.embedding_worker --socket /tmp/homelab-embed.sock
+
+Wire protocol — every frame is a 4-byte big-endian length plus a body:
+    request   JSON {"texts": [str, ...]}
+    response  1 status byte, then
+                0 → float32 little-endian matrix, len(texts) × EMBEDDING_DIM
+                1 → UTF-8 error message
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+from .embedding import EMBEDDING_DIM, create_embedder
+
+logger = logging.getLogger(__name__)
+
+_LEN = struct.Struct(">I")
+
+
+def _recv_exact(sock: socket.socket, n: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("socket closed")
+        buf += chunk
+    return bytes(buf)
+
+
+def _recv_frame(sock: socket.socket) -> bytes:
+    (length,) = _LEN.unpack(_recv_exact(sock, _LEN.size))
+    return _recv_exact(sock, length)
+
+
+def _send_frame(sock: socket.socket, body: bytes) -> None:
+    sock.sendall(_LEN.pack(len(body)) + body)
+
+
+# ---------------------------------------------------------------------------
+# Server
+# ---------------------------------------------------------------------------
+
+class _Pending:
+    """One client request waiting for its slice of a batch."""
+
+    __slots__ = ("texts", "done", "result", "error")
+
+    def __init__(self, texts: list[str]) -> None:
+        self.texts = texts
+        self.done = threading.Event()
+        self.result = None
+        self.error: str | None = None
+
+
+class _Batcher:
+    """
+    Collect pending requests for up to *max_wait_ms* (or *max_batch* texts)
+    and encode them together.
+    """
+
+    def __init__(self, embedder, max_batch: int, max_wait_ms: float) -> None:
+        self.embedder = embedder
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.queue: queue.Queue[_Pending] = queue.Queue()
+        threading.Thread(target=self._run, name="embed-batcher", daemon=True).start()
+
+    def submit(self, texts: list[str]) -> _Pending:
+        pending = _Pending(texts)
+        self.queue.put(pending)
+        return pending
+
+    def _run(self) -> None:
+        while True:
+            batch = [self.queue.get()]
+            size = len(batch[0].texts)
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                size += len(item.texts)
+            self._encode(batch)
+
+    def _encode(self, batch: list[_Pending]) -> None:
+        import numpy as np
+
+        texts = [t for p in batch for t in p.texts]
+        try:
+            vectors = np.asarray(self.embedder.encode(texts), dtype="<f4").reshape(len(texts), EMBEDDING_DIM)
+        except Exception as exc:
+            logger.exception("Batch encode failed (%d texts)", len(texts))
+            for p in batch:
+                p.error = str(exc)
+                p.done.set()
+            return
+
+        offset = 0
+        for p in batch:
+            p.result = vectors[offset:offset + len(p.texts)]
+            offset += len(p.texts)
+            p.done.set()
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self) -> None:
+        batcher: _Batcher = self.server.batcher
+        while True:
+            try:
+                body = _recv_frame(self.request)
+            except (ConnectionError, OSError):
+                return
+            try:
+                texts = json.loads(body)["texts"]
+                if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+                    raise ValueError("'texts' must be a list of strings")
+            except (ValueError, KeyError, TypeError) as exc:
+                _send_frame(self.request, b"\x01" + str(exc).encode())
+                continue
+
+            pending = batcher.submit(texts)
+            pending.done.wait()
+            if pending.error is not None:
+                _send_frame(self.request, b"\x01" + pending.error.encode())
+            else:
+                _send_frame(self.request, b"\x00" + pending.result.tobytes())
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 256  # every gunicorn worker thread may connect at once
+
+
+def serve(
+    socket_path: str,
+    backend: str = "sentence-transformers",
+    model_dir: str | None = None,
+    max_batch: int = 64,
+    max_wait_ms: float = 5.0,
+) -> None:
+    """Load the model once and serve encode requests on *socket_path* forever."""
+    embedder = create_embedder(backend, model_dir)
+    embedder.encode("warm-up")
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    server = _Server(socket_path, _Handler)
+    server.batcher = _Batcher(embedder, max_batch=max_batch, max_wait_ms=max_wait_ms)
+    os.chmod(socket_path, 0o660)
+    logger.info("Embedding worker (%s) listening on %s", backend, socket_path)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+# ---------------------------------------------------------------------------
+# Client
+# ---------------------------------------------------------------------------
+
+class WorkerUnavailable(ConnectionError):
+    """The shared worker isn't listening, or didn't answer in time."""
+
+
+class RemoteEmbedder:
+    """
+    Drop-in embedder that forwards encode() to the shared worker.
+
+    Keeps one persistent connection per thread. A kept connection that
+    turns out dead (the worker was restarted) is replaced once; a missing
+    socket, a refused connect or a timeout raise WorkerUnavailable at
+    once, without retrying, so callers can fall back to encoding
+    in-process instead of waiting out another timeout.
+    """
+
+    name = "remote"
+
+    def __init__(self, socket_path: str, timeout: float = 30.0) -> None:
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connect(self) -> socket.socket:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError as exc:
+            sock.close()
+            raise WorkerUnavailable(f"{self.socket_path}: {exc}") from exc
+        self._local.sock = sock
+        return sock
+
+    def _exchange(self, sock: socket.socket, body: bytes) -> bytes:
+        try:
+            _send_frame(sock, body)
+            return _recv_frame(sock)
+        except BaseException:
+            sock.close()
+            self._local.sock = None
+            raise
+
+    def _roundtrip(self, body: bytes) -> bytes:
+        sock = getattr(self._local, "sock", None)
+        try:
+            if sock is not None:
+                try:
+                    return self._exchange(sock, body)
+                except socket.timeout:
+                    raise
+                except (ConnectionError, OSError):
+                    pass  # kept connection went stale: one fresh connect below
+            return self._exchange(self._connect(), body)
+        except WorkerUnavailable:
+            raise
+        except socket.timeout as exc:
+            raise WorkerUnavailable(f"{self.socket_path}: no reply in {self.timeout:.0f}s") from exc
+        except (ConnectionError, OSError) as exc:
+            # Refused, or the worker died mid-request
+            raise WorkerUnavailable(f"{self.socket_path}: {exc}") from exc
+
+    def encode(self, texts):
+        import numpy as np
+
+        single = isinstance(texts, str)
+        batch = [texts] if single else list(texts)
+        reply = self._roundtrip(json.dumps({"texts": batch}).encode())
+        if reply[:1] != b"\x00":
+            raise RuntimeError(f"embedding worker error: {reply[1:].decode(errors='replace')}")
+        vectors = np.frombuffer(reply[1:], dtype="<f4").reshape(len(batch), EMBEDDING_DIM)
+        return vectors[0] if single else vectors
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Shared embedding worker")
+    parser.add_argument("--socket", default=os.environ.get("EMBEDDING_SOCKET", "/tmp/homelab-embed.sock"))
+    parser.add_argument("--backend", default=os.environ.get("EMBEDDING_BACKEND", "sentence-transformers"))
+    parser.add_argument("--model-dir", default=os.environ.get("EMBEDDING_MODEL_DIR"))
+    parser.add_argument("--max-batch", type=int, default=int(os.environ.get("EMBEDDING_MAX_BATCH", 64)))
+    parser.add_argument("--max-wait-ms", type=float, default=float(os.environ.get("EMBEDDING_MAX_WAIT_MS", 5)))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    serve(args.socket, args.backend, args.model_dir, args.max_batch, args.max_wait_ms)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+Status-change events over Redis pub/sub, for the SSE stream.
+
+Dashboards used to poll /api/health-check and /api/map/graph on timers.
+Instead, state changes are published once to a Redis channel and
+/api/events streams them to every open dashboard, whichever gunicorn
+worker (or container) it is connected to:
+
+  host     a monitored host went up or down (published by the health
+           monitor when a sweep's result differs from the cached one)
+  entity   an inventory row was created, updated or deleted
+
+Entity events come from SQLAlchemy session hooks, so every write path —
+CRUD routes, discovery import, inventory import, map edges — is covered
+without each one remembering to publish. Rows touched by a flush are
+collected and published only after the transaction commits; a rollback
+discards them. A commit touching more than BULK_THRESHOLD rows publishes
+a single ``bulk`` event instead, telling clients to refetch.
+
+Each worker process holds one Redis subscription, fanned out in process
+to a bounded queue per connected client, so a dashboard costs one idle
+HTTP connection and no Redis connection of its own. A client too slow to
+drain its queue gets an ``overflow`` event and should refetch.
+
+An open stream also holds one of the worker's gunicorn threads, so
+subscribe() takes a *limit* (EVENTS_MAX_CLIENTS) past which it refuses
+new clients, keeping threads free for ordinary requests.
+
+Publishing never raises: if Redis is down, events are dropped (clients
+reconnect and refetch) and the write that triggered them still succeeds.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "homelab:events"
+
+# Tables whose writes are published as entity events
+ENTITY_TABLES = frozenset({
+    "hardware", "vms", "apps", "storage", "shares", "networks", "network_members",
+    "misc", "documents", "map_edges", "relationships",
+})
+
+# Rows per commit above which one "bulk" event replaces the individual ones
+BULK_THRESHOLD = 100
+
+# Events buffered per client before it is sent "overflow"
+CLIENT_QUEUE_SIZE = 256
+
+# Seconds publishing is skipped after a failure, so writes don't each
+# wait out a connect timeout while Redis is down
+PUBLISH_BACKOFF = 30.0
+
+_OVERFLOW = {"type": "overflow"}
+
+
+class EventBus:
+    """Publishes to CHANNEL and fans received events out to local subscribers."""
+
+    def __init__(self, redis_url: str) -> None:
+        self.redis_url = redis_url
+        self._client = None
+        self._lock = threading.Lock()
+        self._subscribers: set[queue.Queue] = set()
+        self._listener: Optional[threading.Thread] = None
+        self._down_until = 0.0
+
+    def _redis(self):
+        if self._client is None:
+            import redis
+
+            self._client = redis.Redis.from_url(self.redis_url, socket_connect_timeout=2, health_check_interval=30)
+        return self._client
+
+    # -- publishing ----------------------------------------------------------
+
+    def publish(self, event: dict) -> None:
+        self.publish_many([event])
+
+    def publish_many(self, events: list[dict]) -> None:
+        if not events or time.monotonic() < self._down_until:
+            return
+        try:
+            at = datetime.now(timezone.utc).isoformat()
+            pipe = self._redis().pipeline(transaction=False)
+            for event in events:
+                event.setdefault("at", at)
+                pipe.publish(CHANNEL, json.dumps(event))
+            pipe.execute()
+        except Exception as exc:
+            self._down_until = time.monotonic() + PUBLISH_BACKOFF
+            logger.warning("Event publish failed, dropping events for %.0fs: %s", PUBLISH_BACKOFF, exc)
+
+    # -- subscribing ---------------------------------------------------------
+
+    def subscribe(self, limit: Optional[int] = None) -> Optional[queue.Queue]:
+        """
+        A queue receiving every event from now on; pass it to unsubscribe()
+        when done. None if *limit* subscribers are already connected.
+        """
+        q: queue.Queue = queue.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        with self._lock:
+            if limit is not None and len(self._subscribers) >= limit:
+                return None
+            self._subscribers.add(q)
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name="event-listener", daemon=True)
+                self._listener.start()
+        return q
+
+    def unsubscribe(self, q: queue.Queue) -> None:
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def subscribers(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def _dispatch(self, event: dict) -> None:
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait(event)
+            except queue.Full:
+                # Replace the backlog with one marker telling the client to refetch
+                with q.mutex:
+                    q.queue.clear()
+                q.put_nowait(_OVERFLOW)
+
+    def _listen(self) -> None:
+        """Relay CHANNEL to local subscribers, reconnecting with backoff."""
+        backoff = 1.0
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._listener = None
+                    return
+            try:
+                pubsub = self._redis().pubsub(ignore_subscribe_messages=True)
+                try:
+                    pubsub.subscribe(CHANNEL)
+                    backoff = 1.0
+                    while self.subscribers():
+                        message = pubsub.get_message(timeout=5.0)
+                        if message and message.get("type") == "message":
+                            try:
+                                self._dispatch(json.loads(message["data"]))
+                            except ValueError:
+                                continue
+                finally:
+                    # Also on a dropped connection, so each retry doesn't leak one
+                    pubsub.close()
+            except Exception as exc:
+                logger.warning("Event subscription failed, retrying in %.0fs: %s", backoff, exc)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+
+
+def sse_stream(bus: EventBus, q: queue.Queue, heartbeat: float = 15.0) -> Iterator[str]:
+    """
+    Server-Sent Events for the client subscribed as *q*: a ``ready``
+    event, then every published event, with a comment line every
+    *heartbeat* seconds so proxies keep the connection open and dead
+    clients are noticed. Unsubscribes when the stream is closed.
+    """
+    try:
+        yield "retry: 5000\nevent: ready\ndata: {}\n\n"
+        while True:
+            try:
+                event = q.get(timeout=heartbeat)
+            except queue.Empty:
+                yield ": keepalive\n\n"
+                continue
+            yield f"event: {event.get('type', 'message')}\ndata: {json.dumps(event)}\n\n"
+    finally:
+        bus.unsubscribe(q)
+
+
+# ---------------------------------------------------------------------------
+# Entity events from the ORM
+# ---------------------------------------------------------------------------
+
+def _entity_event(obj, action: str) -> Optional[dict]:
+    table = getattr(obj, "__tablename__", None)
+    if table not in ENTITY_TABLES:
+        return None
+    event = {"type": "entity", "action": action, "entity": table, "id": getattr(obj, "id", None)}
+    name = getattr(obj, "name", None)
+    if isinstance(name, str):
+        event["name"] = name
+    return event
+
+
+def _after_flush(session, flush_context) -> None:
+    pending = session.info.setdefault("entity_events", {})
+    for action, objects in (
+        ("created", session.new),
+        ("updated", (o for o in session.dirty if session.is_modified(o, include_collections=False))),
+        ("deleted", session.deleted),
+    ):
+        for obj in objects:
+            event = _entity_event(obj, action)
+            if event is not None:
+                key = (event["entity"], event["id"])
+                # created-then-updated in one transaction is still "created"
+                if pending.get(key, {}).get("action") != "created" or action == "deleted":
+                    pending[key] = event
+
+
+def _after_commit(session) -> None:
+    pending = session.info.pop("entity_events", None)
+    if not pending or _bus is None:
+        return
+    events = list(pending.values())
+    if len(events) > BULK_THRESHOLD:
+        entities = sorted({e["entity"] for e in events})
+        events = [{"type": "entity", "action": "bulk", "entities": entities, "count": len(events)}]
+    _bus.publish_many(events)
+
+
+def _after_rollback(session) -> None:
+    session.info.pop("entity_events", None)
+
+
+# ---------------------------------------------------------------------------
+# Process-wide instance
+# ---------------------------------------------------------------------------
+
+_bus: Optional[EventBus] = None
+_bus_lock = threading.Lock()
+_hooks_installed = False
+
+
+def get_bus() -> Optional[EventBus]:
+    """The process-wide bus (None until init_events())."""
+    return _bus
+
+
+def init_events(app) -> Optional[EventBus]:
+    """Connect the bus to REDIS_URL and publish entity writes; EVENTS_ENABLED=False turns both off."""
+    global _bus, _hooks_installed
+    from sqlalchemy import event as sa_event
+
+    from ..models import db
+
+    with _bus_lock:
+        _bus = EventBus(app.config["REDIS_URL"]) if app.config.get("EVENTS_ENABLED", True) else None
+        if _bus is not None and not _hooks_installed:
+            sa_event.listen(db.session, "after_flush", _after_flush)
+            sa_event.listen(db.session, "after_commit", _after_commit)
+            sa_event.listen(db.session, "after_rollback", _after_rollback)
+            _hooks_installed = True
+    return _bus
@@ -5,15 +5,44 @@ Uses icmplib for ICMP ping. Falls back to a TCP connect on port 80
 if ICMP requires elevated privileges (common in containers without
 NET_RAW capability).
 
-Results are cached in Redis for 60s to avoid hammering the network
-on every page load.
+Hostnames are resolved through the shared resolver, so a slow DNS
+server costs at most its deadline and repeat checks hit the cache.
+
+ping_hosts() checks many hosts at once: one icmplib echo task per
+address, or, where ICMP isn't permitted, all the TCP fallbacks in
+parallel. Each probe has a per-call *timeout* and the whole batch a
+*budget*; only the hosts still unanswered when the budget runs out are
+reported dead with method "timeout" (replies already in are kept), so
+500 hosts take about one timeout.
+
+Results are cached by the background monitor (health_monitor.py) so page
+loads don't hammer the network.
 """
+import asyncio
+import ipaddress
 import logging
 import socket
+import time
+from typing import Optional
+
+from .resolver import get_resolver
 
 logger = logging.getLogger(__name__)
 
 
+def _resolve(host: str):
+    """IP literal as-is, otherwise the resolver's (cached, deadline-bounded) answer."""
+    try:
+        ipaddress.ip_address(host)
+        return host
+    except ValueError:
+        return get_resolver().forward(host)
+
+
+def _unresolved(host: str) -> dict:
+    return {"host": host, "alive": False, "latency_ms": None, "method": "dns"}
+
+
 def _tcp_reachable(host: str, port: int = 80, timeout: float = 1.0) -> bool:
     try:
         with socket.create_connection((host, port), timeout=timeout):
@@ -29,10 +58,14 @@ def ping_host(host: str) -> dict:
     if not host:
         return {"host": host, "alive": False, "latency_ms": None, "method": "none"}
 
+    address = _resolve(host)
+    if address is None:
+        return _unresolved(host)
+
     # Try ICMP first
     try:
         from icmplib import ping as icmp_ping, SocketPermissionError
-        result = icmp_ping(host, count=1, timeout=1, privileged=False)
+        result = icmp_ping(address, count=1, timeout=1, privileged=False)
         return {
             "host": host,
             "alive": result.is_alive,
@@ -43,7 +76,7 @@ def ping_host(host: str) -> dict:
         pass
 
     # Fallback: TCP port 80
-    alive = _tcp_reachable(host, port=80)
+    alive = _tcp_reachable(address, port=80)
     return {
         "host": host,
         "alive": alive,
@@ -52,6 +85,182 @@ def ping_host(host: str) -> dict:
     }
 
 
-def ping_hosts(hosts: list[str]) -> dict[str, dict]:
-    """Ping multiple hosts, return results keyed by host string."""
-    return {h: ping_host(h) for h in hosts if h}
+async def _tcp_reachable_async(host: str, port: int = 80, timeout: float = 1.0) -> bool:
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return True
+
+
+async def async_ping_host(host: str, timeout: float = 1.0) -> dict:
+    """asyncio twin of ping_host(): same result shape, no thread held while waiting."""
+    if not host:
+        return {"host": host, "alive": False, "latency_ms": None, "method": "none"}
+
+    address = await asyncio.get_running_loop().run_in_executor(None, _resolve, host)
+    if address is None:
+        return _unresolved(host)
+
+    try:
+        from icmplib import async_ping
+        result = await async_ping(address, count=1, timeout=timeout, privileged=False)
+        return {
+            "host": host,
+            "alive": result.is_alive,
+            "latency_ms": round(result.avg_rtt, 2) if result.is_alive else None,
+            "method": "icmp",
+        }
+    except Exception:
+        pass
+
+    alive = await _tcp_reachable_async(address, port=80, timeout=timeout)
+    return {
+        "host": host,
+        "alive": alive,
+        "latency_ms": None,
+        "method": "tcp:80",
+    }
+
+
+# Concurrent ICMP echoes / TCP connects per batch
+DEFAULT_CONCURRENCY = 256
+
+
+def _result(host: str, alive: bool, latency_ms: Optional[float], method: str) -> dict:
+    return {"host": host, "alive": alive, "latency_ms": latency_ms, "method": method}
+
+
+_icmp_allowed: dict[int, bool] = {}
+
+
+def _icmp_permitted(version: int) -> bool:
+    """Whether unprivileged ICMP echo sockets work for IP *version* (checked once)."""
+    if version not in _icmp_allowed:
+        if version == 4:
+            family, proto = socket.AF_INET, socket.IPPROTO_ICMP
+        else:
+            family, proto = socket.AF_INET6, socket.IPPROTO_ICMPV6
+        try:
+            socket.socket(family, socket.SOCK_DGRAM, proto).close()
+            _icmp_allowed[version] = True
+        except OSError:
+            _icmp_allowed[version] = False
+    return _icmp_allowed[version]
+
+
+async def _icmp_many(
+    addresses: list[str], timeout: float, concurrency: int, budget: float
+) -> tuple[dict[str, Optional[float]], list[str]]:
+    """
+    ({address: rtt ms or None} for the addresses that finished within
+    *budget*, addresses whose echo couldn't be sent). Each address is its
+    own task, so one slow host running out the budget costs only its own
+    result, not the replies already in.
+    """
+    from icmplib import async_ping
+
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(address: str) -> Optional[float]:
+        async with sem:
+            reply = await async_ping(address, count=1, timeout=timeout, privileged=False)
+            return round(reply.avg_rtt, 2) if reply.is_alive else None
+
+    tasks = {asyncio.ensure_future(one(a)): a for a in addresses}
+    done, pending = await asyncio.wait(tasks, timeout=max(0.0, budget))
+    for task in pending:
+        task.cancel()
+    rtts: dict[str, Optional[float]] = {}
+    failed: list[str] = []
+    for task in done:
+        if task.exception() is not None:
+            logger.debug("ICMP echo to %s failed, using TCP:80: %s", tasks[task], task.exception())
+            failed.append(tasks[task])
+        else:
+            rtts[tasks[task]] = task.result()
+    return rtts, failed
+
+
+async def _tcp_many(addresses: list[str], timeout: float, concurrency: int, budget: float) -> dict[str, bool]:
+    """{address: reachable on TCP:80} for the addresses that finished within *budget*."""
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(address: str) -> bool:
+        async with sem:
+            return await _tcp_reachable_async(address, port=80, timeout=timeout)
+
+    tasks = {asyncio.ensure_future(one(a)): a for a in addresses}
+    done, pending = await asyncio.wait(tasks, timeout=max(0.0, budget))
+    for task in pending:
+        task.cancel()
+    return {tasks[t]: t.result() for t in done}
+
+
+async def async_ping_hosts(
+    hosts: list[str],
+    timeout: float = 1.0,
+    budget: Optional[float] = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> dict[str, dict]:
+    """
+    Ping many hosts concurrently; results keyed by host string.
+
+    *timeout* bounds each probe, *budget* (default: 2 x timeout plus the
+    DNS deadline) the whole call, name resolution included.
+    """
+    hosts = [h for h in dict.fromkeys(hosts) if h]
+    if not hosts:
+        return {}
+    resolver = get_resolver()
+    if budget is None:
+        budget = 2 * timeout + resolver.deadline
+    deadline = time.monotonic() + budget
+
+    names = []
+    addresses: dict[str, Optional[str]] = {}
+    for h in hosts:
+        try:
+            ipaddress.ip_address(h)
+            addresses[h] = h
+        except ValueError:
+            names.append(h)
+    if names:
+        loop = asyncio.get_running_loop()
+        addresses.update(await loop.run_in_executor(None, resolver.forward_many, names, min(resolver.deadline, budget)))
+
+    results = {h: _unresolved(h) for h, a in addresses.items() if a is None}
+    targets = {a for a in addresses.values() if a is not None}
+    icmp = sorted(a for a in targets if _icmp_permitted(ipaddress.ip_address(a).version))
+    tcp = sorted(targets.difference(icmp))
+    by_address: dict[str, tuple[bool, Optional[float], str]] = {}
+    if icmp:
+        # Hosts still unanswered when the budget runs out come back "timeout"
+        rtts, failed = await _icmp_many(icmp, timeout, concurrency, deadline - time.monotonic())
+        by_address = {a: (rtt is not None, rtt, "icmp") for a, rtt in rtts.items()}
+        tcp = sorted(set(tcp).union(failed))
+    if tcp:
+        reachable = await _tcp_many(tcp, timeout, concurrency, deadline - time.monotonic())
+        by_address.update((a, (ok, None, "tcp:80")) for a, ok in reachable.items())
+
+    for h, address in addresses.items():
+        if address is None:
+            continue
+        alive, latency_ms, method = by_address.get(address, (False, None, "timeout"))
+        results[h] = _result(h, alive, latency_ms, method)
+    return {h: results[h] for h in hosts}
+
+
+def ping_hosts(
+    hosts: list[str],
+    timeout: float = 1.0,
+    budget: Optional[float] = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> dict[str, dict]:
+    """Blocking form of async_ping_hosts(), for threads without an event loop."""
+    return asyncio.run(async_ping_hosts(hosts, timeout, budget, concurrency))
@@ -0,0 +1,268 @@
+"""
+Per-host health history in fixed-size ring buffers.
+
+Each monitored host gets one file, HEALTH_HISTORY_DIR/<host>.ring, holding
+three ring buffers, one per rollup tier:
+
+  1m   1-minute buckets, the last 1440 (one day)
+  1h   1-hour buckets, the last 720 (30 days)
+  1d   1-day buckets, the last 365 (a year)
+
+A bucket aggregates every sample that fell into it: samples taken, how
+many were up, latency sum/min/max over those with a latency, and up/down
+flips (a flapping NIC shows as many flips at a high up-ratio). Recording
+a sample updates the current bucket of each tier in place, so the tiers
+roll up as they go and nothing has to be downsampled later. A bucket
+index (epoch // resolution) is stored in each slot; a slot holding an
+older index is reset on reuse, so the ring never needs a sweep to expire
+data.
+
+The file size is fixed by the tier sizes (about 60 KB), however long the
+host has been watched. Files are mmap'd: a sample writes three 24-byte
+slots, and a history query reads only the slots its range covers.
+
+Samples come from the health monitor's sweeps, which one worker at a time
+takes (see health_monitor.py), so there is a single writer; readers in
+other workers map the same files read-only. Only the writer creates a
+file or resets one of the wrong size or layout; a reader treats such a
+file as no history yet.
+
+Usage:
+    from app.services.health_history import get_history
+
+    store = get_history()                                # None if disabled
+    store.record_many(results)                           # {host: ping result}
+    store.series("192.168.1.10", parse_range("24h"))     # 1-minute points
+"""
+from __future__ import annotations
+
+import logging
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from urllib.parse import quote
+
+logger = logging.getLogger(__name__)
+
+# (name, bucket seconds, buckets kept), finest first
+TIERS = (("1m", 60, 1440), ("1h", 3600, 720), ("1d", 86400, 365))
+
+MAGIC = b"HHRING\x01\x00"
+_HEADER = struct.Struct("<8s255pB")  # magic, host, last state (0 unknown, 1 down, 2 up)
+# bucket index, samples, up, latency samples, flips, latency sum/min/max
+_SLOT = struct.Struct("<IHHHHfff")
+_TIER_OFFSETS = []
+_offset = _HEADER.size
+for _, _, _slots in TIERS:
+    _TIER_OFFSETS.append(_offset)
+    _offset += _slots * _SLOT.size
+FILE_SIZE = _offset
+del _offset, _slots
+
+_RANGE = re.compile(r"^(\d+)([mhdw])$")
+_UNIT_SECONDS = {"m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+
+
+def parse_range(value: str) -> int:
+    """Seconds in a range such as ``90m``, ``24h``, ``7d`` or ``4w``; raises ValueError."""
+    match = _RANGE.match(value.strip().lower())
+    if not match or int(match.group(1)) == 0:
+        raise ValueError(f"range {value!r}: expected a number followed by m, h, d or w (e.g. 24h)")
+    return int(match.group(1)) * _UNIT_SECONDS[match.group(2)]
+
+
+def tier_for(seconds: int) -> int:
+    """Index of the finest tier whose retention covers *seconds* (the coarsest if none does)."""
+    for i, (_, resolution, slots) in enumerate(TIERS):
+        if seconds <= resolution * slots:
+            return i
+    return len(TIERS) - 1
+
+
+class HostHistory:
+    """
+    One host's ring buffer file, mapped read-write. With create=False it
+    is mapped read-only, and a missing file raises FileNotFoundError and a
+    foreign one ValueError instead of being created or reset.
+    """
+
+    def __init__(self, path: str, host: str, create: bool = True) -> None:
+        self.path = path
+        self.writable = create
+        if not create:
+            self._mm = self._map_readonly(path)
+            return
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size != FILE_SIZE:
+                # New (or written by a different layout): start empty
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, FILE_SIZE)
+                os.pwrite(fd, _HEADER.pack(MAGIC, host.encode("utf-8"), 0), 0)
+            self._mm = mmap.mmap(fd, FILE_SIZE)
+        finally:
+            os.close(fd)
+        magic, _, _ = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self._mm[:] = bytes(FILE_SIZE)
+            _HEADER.pack_into(self._mm, 0, MAGIC, host.encode("utf-8"), 0)
+
+    @staticmethod
+    def _map_readonly(path: str) -> mmap.mmap:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            if os.fstat(fd).st_size != FILE_SIZE:
+                raise ValueError(f"{path}: not a health history file of this layout")
+            mm = mmap.mmap(fd, FILE_SIZE, access=mmap.ACCESS_READ)
+        finally:
+            os.close(fd)
+        if _HEADER.unpack_from(mm, 0)[0] != MAGIC:
+            mm.close()
+            raise ValueError(f"{path}: not a health history file of this layout")
+        return mm
+
+    def record(self, ts: float, alive: bool, latency_ms: Optional[float]) -> None:
+        """Fold one sample taken at epoch *ts* into every tier."""
+        mm = self._mm
+        last = mm[_HEADER.size - 1]
+        state = 2 if alive else 1
+        flip = 1 if last and last != state else 0
+        mm[_HEADER.size - 1] = state
+        for (_, resolution, slots), base in zip(TIERS, _TIER_OFFSETS):
+            bucket = int(ts) // resolution
+            offset = base + (bucket % slots) * _SLOT.size
+            index, samples, up, lat_n, flips, lat_sum, lat_min, lat_max = _SLOT.unpack_from(mm, offset)
+            if index != bucket or samples == 0:
+                samples = up = lat_n = flips = 0
+                lat_sum, lat_min, lat_max = 0.0, float("inf"), 0.0
+            samples = min(samples + 1, 0xFFFF)
+            up = min(up + (1 if alive else 0), 0xFFFF)
+            flips = min(flips + flip, 0xFFFF)
+            if latency_ms is not None:
+                lat_n = min(lat_n + 1, 0xFFFF)
+                lat_sum += latency_ms
+                lat_min = min(lat_min, latency_ms)
+                lat_max = max(lat_max, latency_ms)
+            _SLOT.pack_into(mm, offset, bucket, samples, up, lat_n, flips, lat_sum, lat_min, lat_max)
+
+    def series(self, tier: int, since: float, until: float) -> list[dict]:
+        """Buckets of *tier* between epochs *since* and *until* that hold samples, oldest first."""
+        _, resolution, slots = TIERS[tier]
+        base = _TIER_OFFSETS[tier]
+        first = max(int(since) // resolution, int(until) // resolution - slots + 1)
+        points = []
+        for bucket in range(first, int(until) // resolution + 1):
+            offset = base + (bucket % slots) * _SLOT.size
+            index, samples, up, lat_n, flips, lat_sum, lat_min, lat_max = _SLOT.unpack_from(self._mm, offset)
+            if index != bucket or not samples:
+                continue
+            points.append({
+                "t": bucket * resolution,
+                "samples": samples,
+                "up_ratio": round(up / samples, 4),
+                "flips": flips,
+                "latency_avg_ms": round(lat_sum / lat_n, 2) if lat_n else None,
+                "latency_min_ms": round(lat_min, 2) if lat_n else None,
+                "latency_max_ms": round(lat_max, 2) if lat_n else None,
+            })
+        return points
+
+    def close(self) -> None:
+        self._mm.close()
+
+
+class HistoryStore:
+    """The directory of per-host ring files, with a bounded set kept mapped."""
+
+    def __init__(self, directory: str, max_open: int = 1024) -> None:
+        self.directory = directory
+        self.max_open = max_open
+        self._open: OrderedDict[str, HostHistory] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, host: str) -> str:
+        return os.path.join(self.directory, quote(host, safe="") + ".ring")
+
+    def _host(self, host: str, create: bool) -> Optional[HostHistory]:
+        history = self._open.get(host)
+        if history is not None and (history.writable or not create):
+            self._open.move_to_end(host)
+            return history
+        if history is not None:
+            # Mapped read-only by an earlier query; the writer needs its own mapping
+            del self._open[host]
+            history.close()
+        if create:
+            os.makedirs(self.directory, exist_ok=True)
+        try:
+            history = HostHistory(self._path(host), host, create=create)
+        except (FileNotFoundError, ValueError):
+            if create:
+                raise
+            return None
+        self._open[host] = history
+        while len(self._open) > self.max_open:
+            self._open.popitem(last=False)[1].close()
+        return history
+
+    def record_many(self, results: dict[str, dict], ts: Optional[float] = None) -> None:
+        """Record one sweep's {host: ping result}; failures are logged, never raised."""
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            for host, result in results.items():
+                try:
+                    self._host(host, create=True).record(ts, result["alive"], result.get("latency_ms"))
+                except (OSError, ValueError) as exc:
+                    logger.warning("Health history write for %s failed: %s", host, exc)
+
+    def series(self, host: str, seconds: int, now: Optional[float] = None) -> Optional[dict]:
+        """
+        The last *seconds* of *host*'s history from the finest tier that
+        covers them; None if the host has never been recorded.
+        """
+        now = time.time() if now is None else now
+        tier = tier_for(seconds)
+        with self._lock:
+            history = self._host(host, create=False)
+            if history is None:
+                return None
+            points = history.series(tier, now - seconds, now)
+        name, resolution, slots = TIERS[tier]
+        return {
+            "host": host,
+            "resolution": name,
+            "resolution_seconds": resolution,
+            "retention_seconds": resolution * slots,
+            "points": points,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            for history in self._open.values():
+                history.close()
+            self._open.clear()
+
+
+_store: Optional[HistoryStore] = None
+_store_lock = threading.Lock()
+
+
+def get_history() -> Optional[HistoryStore]:
+    """The process-wide store (None if init_history() wasn't called or history is disabled)."""
+    return _store
+
+
+def init_history(app) -> Optional[HistoryStore]:
+    """Open HEALTH_HISTORY_DIR; an empty setting disables history."""
+    global _store
+    directory = app.config.get("HEALTH_HISTORY_DIR", "")
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+        _store = HistoryStore(directory) if directory else None
+    return _store
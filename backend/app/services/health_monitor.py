@@ -0,0 +1,246 @@
+"""
+Background health monitor with a shared status cache.
+
+Pinging on request means every dashboard load waits on the network and
+every open dashboard multiplies the probe traffic. Instead a monitor
+thread probes every address the inventory knows about — the IPs and
+hostnames of Hardware, VMs, apps, misc entries and shares — each
+HEALTH_MONITOR_INTERVAL seconds, and writes each host's result to the
+Flask-Caching backend (Redis) under ``health:host:<host>``.
+
+/api/health-check reads those entries with one get_many() (a single
+MGET), so a request costs O(1) per host however many hosts are watched.
+Only hosts with no entry — not in inventory, or the monitor isn't
+running — are probed live, and their results are cached the same way.
+
+Entries live for HEALTH_STATUS_TTL, a few sweep intervals: if the
+monitor stops, statuses expire rather than going stale forever, and
+requests fall back to live probes.
+
+Each gunicorn worker runs a HealthMonitor thread (started from wsgi.py).
+A sweep starts only after taking a lease key with add() (SET NX), held
+for one interval, so the inventory is swept once per interval however
+many workers there are.
+
+Each sweep's results are also appended to the per-host latency history
+(health_history.py), and hosts whose up/down state differs from their
+cached entry are published as ``host`` events (events.py).
+
+Cache failures are logged and treated as misses — a health check never
+fails because Redis is down.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Iterable, Optional
+
+from .events import get_bus
+from .health import ping_hosts
+from .health_history import get_history
+
+logger = logging.getLogger(__name__)
+
+_KEY = "health:host:{}"
+_LEASE_KEY = "health:monitor:lease"
+_LAST_SWEEP_KEY = "health:monitor:last"
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class StatusCache:
+    """Batched reads/writes of per-host health results."""
+
+    def __init__(self, backend, ttl: float) -> None:
+        self.backend = backend
+        self.ttl = ttl
+
+    @classmethod
+    def from_app(cls, app) -> Optional["StatusCache"]:
+        """Build from app config and the app's cache backend (None if no cache is configured)."""
+        from .cache import cache
+
+        with app.app_context():
+            backend = getattr(cache, "cache", None)
+        if backend is None:
+            return None
+        return cls(backend, app.config.get("HEALTH_STATUS_TTL", 90))
+
+    def get_many(self, hosts: list[str]) -> dict[str, dict]:
+        """Cached results for *hosts*; hosts without an entry are left out."""
+        if not hosts:
+            return {}
+        try:
+            values = self.backend.get_many(*(_KEY.format(h) for h in hosts))
+        except Exception as exc:
+            logger.warning("Health status cache read failed: %s", exc)
+            return {}
+        return {h: v for h, v in zip(hosts, values) if v is not None}
+
+    def set_many(self, results: dict[str, dict]) -> None:
+        if not results:
+            return
+        try:
+            self.backend.set_many({_KEY.format(h): r for h, r in results.items()}, timeout=self.ttl)
+        except Exception as exc:
+            logger.warning("Health status cache write failed: %s", exc)
+
+    def acquire_lease(self, owner: str, seconds: float) -> bool:
+        """Take the sweep lease for *seconds*; False if another worker holds it."""
+        try:
+            return bool(self.backend.add(_LEASE_KEY, owner, timeout=max(1, int(seconds))))
+        except Exception as exc:
+            logger.warning("Health monitor lease failed: %s", exc)
+            return False
+
+    def last_sweep(self) -> Optional[dict]:
+        try:
+            return self.backend.get(_LAST_SWEEP_KEY)
+        except Exception:
+            return None
+
+    def record_sweep(self, summary: dict) -> None:
+        try:
+            self.backend.set(_LAST_SWEEP_KEY, summary, timeout=0)
+        except Exception as exc:
+            logger.warning("Health monitor summary write failed: %s", exc)
+
+
+def monitored_hosts() -> list[str]:
+    """Every distinct IP and hostname recorded in the inventory."""
+    from ..models import AppService, Hardware, Misc, Share, VM
+
+    columns = [
+        (Hardware, ("ip_address", "hostname")),
+        (VM, ("ip_address", "hostname")),
+        (AppService, ("ip_address", "hostname")),
+        (Misc, ("ip_address", "hostname")),
+        (Share, ("ip", "hostname")),
+    ]
+    hosts: dict[str, None] = {}
+    for model, names in columns:
+        for row in model.query.with_entities(*(getattr(model, n) for n in names)):
+            for value in row:
+                value = (value or "").strip()
+                if value and " " not in value:
+                    hosts[value] = None
+    return list(hosts)
+
+
+def stamp(results: dict[str, dict]) -> dict[str, dict]:
+    """Add checked_at to fresh probe results."""
+    checked_at = _now_iso()
+    for result in results.values():
+        result["checked_at"] = checked_at
+    return results
+
+
+def ping_options(app) -> dict:
+    """ping_hosts() keyword arguments from HEALTH_PING_* settings."""
+    cfg = app.config
+    return {
+        "timeout": cfg.get("HEALTH_PING_TIMEOUT", 1.0),
+        "budget": cfg.get("HEALTH_PING_BUDGET", 5.0),
+        "concurrency": cfg.get("HEALTH_PING_CONCURRENCY", 256),
+    }
+
+
+def check_hosts(hosts: Iterable[str], status: Optional[StatusCache], **ping_opts) -> dict[str, dict]:
+    """
+    Results for *hosts*, from the status cache where present; the rest
+    are probed live (with *ping_opts*) and cached. Keyed by host, in
+    request order.
+    """
+    hosts = [h for h in dict.fromkeys(hosts) if h]
+    cached = status.get_many(hosts) if status is not None else {}
+    missing = [h for h in hosts if h not in cached]
+    if missing:
+        live = stamp(ping_hosts(missing, **ping_opts))
+        if status is not None:
+            status.set_many(live)
+        cached.update(live)
+    return {h: cached[h] for h in hosts if h in cached}
+
+
+class HealthMonitor(threading.Thread):
+    """Sweeps the inventory's hosts into the status cache (see module docstring)."""
+
+    def __init__(self, app, status: StatusCache) -> None:
+        super().__init__(name="health-monitor", daemon=True)
+        self.app = app
+        self.status = status
+        self.interval = app.config.get("HEALTH_MONITOR_INTERVAL", 30)
+        self.ping_opts = ping_options(app)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        # How often a worker without the lease checks whether it has expired
+        self.poll_interval = min(5.0, self.interval)
+
+    def run(self) -> None:
+        while True:
+            if self.status.acquire_lease(self.worker_id, self.interval):
+                try:
+                    self.sweep()
+                except Exception:
+                    logger.exception("Health monitor sweep failed")
+            time.sleep(self.poll_interval)
+
+    def sweep(self) -> dict:
+        from ..models import db
+
+        t0 = time.monotonic()
+        started_at = _now_iso()
+        with self.app.app_context():
+            try:
+                hosts = monitored_hosts()
+            finally:
+                db.session.remove()
+        previous = self.status.get_many(hosts)
+        results = stamp(ping_hosts(hosts, **self.ping_opts))
+        self.status.set_many(results)
+        transitions = [
+            {"type": "host", **result, "previous_alive": previous[host]["alive"]}
+            for host, result in results.items()
+            if host in previous and previous[host].get("alive") != result["alive"]
+        ]
+        bus = get_bus()
+        if transitions and bus is not None:
+            bus.publish_many(transitions)
+        history = get_history()
+        if history is not None:
+            history.record_many(results)
+        summary = {
+            "started_at": started_at,
+            "duration_ms": round((time.monotonic() - t0) * 1000, 1),
+            "hosts": len(results),
+            "alive": sum(1 for r in results.values() if r["alive"]),
+            "transitions": len(transitions),
+            "worker_id": self.worker_id,
+        }
+        self.status.record_sweep(summary)
+        logger.debug("Health sweep: %(alive)d/%(hosts)d alive in %(duration_ms)sms", summary)
+        return summary
+
+
+_monitor: Optional[HealthMonitor] = None
+_monitor_lock = threading.Lock()
+
+
+def start_health_monitor(app) -> Optional[HealthMonitor]:
+    """Start this process's monitor unless HEALTH_MONITOR_INTERVAL is 0 (idempotent)."""
+    global _monitor
+    if app.config.get("HEALTH_MONITOR_INTERVAL", 30) <= 0:
+        return None
+    status = StatusCache.from_app(app)
+    if status is None:
+        return None
+    with _monitor_lock:
+        if _monitor is None or not _monitor.is_alive():
+            _monitor = HealthMonitor(app, status)
+            _monitor.start()
+    return _monitor
@@ -0,0 +1,144 @@
+"""
+In-process latency histograms.
+
+Cheap fixed-bucket histograms for timing pipeline stages. Each gunicorn
+worker keeps its own registry; scrape every worker (or run one) to see
+the full picture.
+
+Usage:
+    from app.services.metrics import timed
+
+    with timed("search.query.encode"):
+        vector = embedder.encode(q)
+
+Inside a request, every timed() stage is also recorded on flask.g so the
+route can emit a Server-Timing header (see server_timing_header()).
+"""
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context
+
+# Upper bounds in milliseconds; the implicit last bucket is +Inf
+BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Histogram:
+    """Thread-safe cumulative histogram over BUCKETS_MS."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms: float) -> None:
+        idx = len(BUCKETS_MS)
+        for i, bound in enumerate(BUCKETS_MS):
+            if ms <= bound:
+                idx = i
+                break
+        with self._lock:
+            self.counts[idx] += 1
+            self.count += 1
+            self.sum_ms += ms
+            if ms > self.max_ms:
+                self.max_ms = ms
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counts = list(self.counts)
+            count, sum_ms, max_ms = self.count, self.sum_ms, self.max_ms
+        return {
+            "count": count,
+            "sum_ms": round(sum_ms, 3),
+            "avg_ms": round(sum_ms / count, 3) if count else None,
+            "max_ms": round(max_ms, 3),
+            "p50_ms": _quantile(counts, count, 0.50),
+            "p95_ms": _quantile(counts, count, 0.95),
+            "p99_ms": _quantile(counts, count, 0.99),
+            "buckets": {
+                **{str(b): c for b, c in zip(BUCKETS_MS, counts)},
+                "+Inf": counts[-1],
+            },
+        }
+
+
+def _quantile(counts: list[int], total: int, q: float):
+    """Bucket upper bound containing the q-quantile (None if empty / overflow)."""
+    if not total:
+        return None
+    rank = q * total
+    seen = 0
+    for bound, c in zip(BUCKETS_MS, counts):
+        seen += c
+        if seen >= rank:
+            return bound
+    return None
+
+
+_registry: dict[str, Histogram] = {}
+_registry_lock = threading.Lock()
+
+
+def histogram(name: str) -> Histogram:
+    h = _registry.get(name)
+    if h is None:
+        with _registry_lock:
+            h = _registry.setdefault(name, Histogram())
+    return h
+
+
+def observe(name: str, ms: float) -> None:
+    histogram(name).observe(ms)
+    if has_request_context():
+        g.setdefault("_server_timing", []).append((name.rsplit(".", 1)[-1], ms))
+
+
+@contextmanager
+def timed(name: str):
+    """Time the enclosed block and record it under *name*."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, (time.perf_counter() - start) * 1000)
+
+
+def server_timing_header() -> str:
+    """Format the stages timed during this request as a Server-Timing value."""
+    stages = g.get("_server_timing", []) if has_request_context() else []
+    return ", ".join(f"{label};dur={ms:.2f}" for label, ms in stages)
+
+
+def snapshot() -> dict:
+    with _registry_lock:
+        items = list(_registry.items())
+    return {name: h.snapshot() for name, h in sorted(items)}
+
+
+def render_prometheus() -> str:
+    """Render all histograms in the Prometheus text exposition format."""
+    lines = [
+        "# HELP homelab_stage_duration_seconds Pipeline stage latency",
+        "# TYPE homelab_stage_duration_seconds histogram",
+    ]
+    with _registry_lock:
+        items = sorted(_registry.items())
+    for name, h in items:
+        with h._lock:
+            counts, count, sum_ms = list(h.counts), h.count, h.sum_ms
+        cumulative = 0
+        for bound, c in zip(BUCKETS_MS, counts):
+            cumulative += c
+            lines.append(
+                f'homelab_stage_duration_seconds_bucket{{stage="{name}",le="{bound / 1000:g}"}} {cumulative}'
+            )
+        lines.append(f'homelab_stage_duration_seconds_bucket{{stage="{name}",le="+Inf"}} {count}')
+        lines.append(f'homelab_stage_duration_seconds_sum{{stage="{name}"}} {sum_ms / 1000:.6f}')
+        lines.append(f'homelab_stage_duration_seconds_count{{stage="{name}"}} {count}')
+    return "\n".join(lines) + "\n"
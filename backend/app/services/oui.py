@@ -0,0 +1,258 @@
+"""
+MAC vendor (OUI) lookups from a compact, memory-mapped binary table.
+
+The IEEE registry is ~50k prefixes; parsing it as text costs every worker
+process a second of startup and tens of MB of dicts. Instead the table is
+compiled once (scripts/build_oui_db.py) into a sorted binary file that is
+mmap'd read-only: opening it reads nothing, every process shares the same
+page-cache pages, and a lookup is a few binary searches over fixed-size
+records — a couple of microseconds.
+
+File layout (little-endian):
+
+  header     magic b"HHOUI\\x01\\0\\0", then u32 record counts for the
+             24-, 28- and 36-bit sections and the string table offset
+  sections   records of (u64 prefix, u32 vendor offset), sorted by prefix:
+             MA-L (24-bit OUI), then MA-M (28-bit), then MA-S (36-bit)
+  strings    vendor names, each u8 length + UTF-8, deduplicated
+
+A lookup tries the 36-, 28- and 24-bit prefixes of the MAC in that order,
+so a small block the IEEE assigned out of a larger one wins over the
+registry's own MA-L entry.
+
+The bundled app/data/oui.bin is compiled from app/data/oui.txt, a curated
+subset of vendors common on home networks; OUI_DB_PATH points at a
+full-registry build instead. One process-wide instance (get_oui()) is
+shared by discovery and the inventory API.
+
+Usage:
+    from app.services.oui import mac_vendor
+
+    mac_vendor("b8:27:eb:12:34:56")   # "Raspberry Pi Foundation"
+"""
+from __future__ import annotations
+
+import csv
+import io
+import logging
+import mmap
+import os
+import re
+import struct
+import threading
+from typing import Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data")
+BUNDLED_SOURCE = os.path.join(DATA_DIR, "oui.txt")
+BUNDLED_DB = os.path.join(DATA_DIR, "oui.bin")
+
+MAGIC = b"HHOUI\x01\x00\x00"
+PREFIX_BITS = (24, 28, 36)
+
+_HEADER = struct.Struct("<8s4I")
+_RECORD = struct.Struct("<QI")
+_NOT_HEX = re.compile(r"[^0-9a-f]")
+_SEPARATORS = str.maketrans("", "", ":-. ")
+
+
+def _mac_int(mac: str) -> Optional[tuple[int, int]]:
+    """(48-bit value, significant bits) of a MAC or MAC prefix; None if unparseable."""
+    digits = mac.translate(_SEPARATORS)
+    if len(digits) < 6 or len(digits) > 12 or not digits.isalnum():
+        return None
+    try:
+        return int(digits.ljust(12, "0"), 16), len(digits) * 4
+    except ValueError:
+        return None
+
+
+def normalize_mac(mac: Optional[str]) -> Optional[str]:
+    """Canonical lower-case colon form of *mac*, or None if it isn't 6 octets."""
+    if not mac:
+        return None
+    digits = "".join(c for c in mac.lower() if c in "0123456789abcdef")
+    if len(digits) != 12:
+        return None
+    return ":".join(digits[i:i + 2] for i in range(0, 12, 2))
+
+
+class OuiDatabase:
+    """Read-only view of a compiled OUI file (see module docstring)."""
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = path
+        self._mm: Optional[mmap.mmap] = None
+        # (prefix bits, start offset, record count), most specific first
+        self._sections: list[tuple[int, int, int]] = []
+        if path is None:
+            return
+        with open(path, "rb") as fh:
+            size = os.fstat(fh.fileno()).st_size
+            if size < _HEADER.size:
+                raise ValueError(f"{path}: not an OUI database")
+            self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, *counts, strings = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            self._mm.close()
+            raise ValueError(f"{path}: not an OUI database")
+        offset = _HEADER.size
+        for bits, count in zip(PREFIX_BITS, counts):
+            self._sections.append((bits, offset, count))
+            offset += count * _RECORD.size
+        if offset > strings or strings > size:
+            self._mm.close()
+            raise ValueError(f"{path}: truncated OUI database")
+        self._sections.reverse()
+
+    def __len__(self) -> int:
+        return sum(count for _, _, count in self._sections)
+
+    def _vendor(self, offset: int) -> str:
+        length = self._mm[offset]
+        return self._mm[offset + 1:offset + 1 + length].decode("utf-8", "replace")
+
+    def lookup(self, mac: Optional[str]) -> Optional[str]:
+        """Vendor registered for *mac* (a full MAC or a prefix), or None."""
+        if not mac or self._mm is None:
+            return None
+        parsed = _mac_int(mac)
+        if parsed is None:
+            return None
+        value, known = parsed
+        mm = self._mm
+        for bits, start, count in self._sections:
+            if bits > known:
+                continue
+            key = value >> (48 - bits)
+            lo, hi = 0, count
+            while lo < hi:
+                mid = (lo + hi) >> 1
+                prefix, vendor = _RECORD.unpack_from(mm, start + mid * _RECORD.size)
+                if prefix < key:
+                    lo = mid + 1
+                elif prefix > key:
+                    hi = mid
+                else:
+                    return self._vendor(vendor)
+        return None
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+
+
+# ---------------------------------------------------------------------------
+# Building
+# ---------------------------------------------------------------------------
+
+def parse_manuf(lines: Iterable[str]) -> Iterator[tuple[int, int, str]]:
+    """
+    (prefix, bits, vendor) from Wireshark "manuf" lines:
+    ``00:00:0C<tab>Cisco<tab>Cisco Systems, Inc`` (the long name wins) or
+    ``00:1B:C5:00:00/36<tab>...``. Comments and blank lines are skipped.
+    """
+    for line in lines:
+        line = line.split("#", 1)[0].rstrip()
+        if not line.strip():
+            continue
+        fields = [f.strip() for f in line.split("\t") if f.strip()]
+        if len(fields) < 2:
+            continue
+        prefix, _, length = fields[0].partition("/")
+        digits = _NOT_HEX.sub("", prefix.lower())
+        bits = int(length) if length else len(digits) * 4
+        if bits not in PREFIX_BITS or len(digits) * 4 < bits:
+            continue
+        yield int(digits, 16) >> (len(digits) * 4 - bits), bits, fields[-1]
+
+
+def parse_ieee_csv(text: Iterable[str]) -> Iterator[tuple[int, int, str]]:
+    """(prefix, bits, vendor) from an IEEE registry CSV (oui.csv, mam.csv, oui36.csv)."""
+    for row in csv.DictReader(text):
+        assignment = (row.get("Assignment") or "").strip().lower()
+        vendor = (row.get("Organization Name") or "").strip()
+        bits = len(assignment) * 4
+        if bits in PREFIX_BITS and vendor and not _NOT_HEX.search(assignment):
+            yield int(assignment, 16), bits, vendor
+
+
+def parse_source(text: str) -> Iterator[tuple[int, int, str]]:
+    """Either source format, told apart by the IEEE CSV header."""
+    if text.lstrip("\ufeff").startswith("Registry,"):
+        return parse_ieee_csv(io.StringIO(text.lstrip("\ufeff")))
+    return parse_manuf(text.splitlines())
+
+
+def compile_db(entries: Iterable[tuple[int, int, str]], path: str) -> int:
+    """
+    Write *entries* as an OUI database at *path*; returns the record count.
+
+    Written to a temporary file and renamed into place, so processes that
+    have the old file mapped keep a consistent view.
+    """
+    sections: dict[int, dict[int, str]] = {bits: {} for bits in PREFIX_BITS}
+    for prefix, bits, vendor in entries:
+        # Names are length-prefixed with one byte
+        sections[bits][prefix] = vendor.encode("utf-8")[:255].decode("utf-8", "ignore")
+
+    strings = bytearray()
+    string_at: dict[str, int] = {}
+    total = sum(len(s) for s in sections.values())
+    base = _HEADER.size + total * _RECORD.size
+    records = bytearray()
+    for bits in PREFIX_BITS:
+        for prefix, vendor in sorted(sections[bits].items()):
+            if vendor not in string_at:
+                encoded = vendor.encode("utf-8")
+                string_at[vendor] = base + len(strings)
+                strings += bytes((len(encoded),)) + encoded
+            records += _RECORD.pack(prefix, string_at[vendor])
+
+    header = _HEADER.pack(MAGIC, *(len(sections[b]) for b in PREFIX_BITS), base)
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as fh:
+        fh.write(header + records + strings)
+    os.replace(tmp, path)
+    return total
+
+
+# ---------------------------------------------------------------------------
+# Process-wide instance
+# ---------------------------------------------------------------------------
+
+_db: Optional[OuiDatabase] = None
+_db_lock = threading.Lock()
+
+
+def _open(path: str) -> OuiDatabase:
+    try:
+        return OuiDatabase(path)
+    except (OSError, ValueError) as exc:
+        logger.warning("OUI database unavailable, MAC vendors disabled: %s", exc)
+        return OuiDatabase()
+
+
+def get_oui() -> OuiDatabase:
+    """The process-wide database (the bundled one if init_oui() wasn't called)."""
+    global _db
+    if _db is None:
+        with _db_lock:
+            if _db is None:
+                _db = _open(BUNDLED_DB)
+    return _db
+
+
+def init_oui(app) -> OuiDatabase:
+    """Open OUI_DB_PATH, or the bundled database if it isn't set."""
+    global _db
+    with _db_lock:
+        _db = _open(app.config.get("OUI_DB_PATH") or BUNDLED_DB)
+    return _db
+
+
+def mac_vendor(mac: Optional[str]) -> Optional[str]:
+    """Vendor for *mac* from the process-wide database, or None."""
+    return get_oui().lookup(mac)
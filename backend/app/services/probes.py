@@ -0,0 +1,387 @@
+"""
+Discovery port catalogue and probe plugins.
+
+Every port discovery knows about is a PortSpec in CATALOGUE: its service
+name, whether to speak TLS first, and which probe plugin (if any) reads
+something useful off the open connection. Profiles pick which catalogue
+ports a scan connects to:
+
+  quick     a handful of ports that identify most homelab boxes
+  standard  the default set
+  deep      standard plus common self-hosted services and databases
+
+Probe plugins are registered with @probe("name"). Each one receives the
+already-open (and, for TLS ports, already-upgraded) stream and returns a
+dict of fields for that port; the engine runs every open port's chain
+concurrently on the connection the port scan opened, so probing more
+ports doesn't add round trips per host. Plugins must be read-only and
+cheap: one request at most, no authentication.
+
+The catalogue and profiles can be extended from a JSON file named by
+DISCOVERY_PORTS_FILE (see load_catalogue()).
+
+Open ports are carried as bitmasks over the catalogue (ports_to_mask /
+mask_to_ports); bit positions are only meaningful inside one process.
+"""
+from __future__ import annotations
+
+import asyncio
+import ipaddress
+import json
+import logging
+import ssl
+from datetime import datetime
+from html.parser import HTMLParser
+from typing import Awaitable, Callable, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PortSpec(NamedTuple):
+    service: str
+    probe: Optional[str] = None  # plugin name, run after connect (and TLS)
+    tls: bool = False            # upgrade to TLS and record the certificate first
+
+
+CATALOGUE: dict[int, PortSpec] = {
+    21: PortSpec("FTP", "banner"),
+    22: PortSpec("SSH", "banner"),
+    23: PortSpec("Telnet"),
+    25: PortSpec("SMTP", "banner"),
+    53: PortSpec("DNS"),
+    80: PortSpec("HTTP", "http_title"),
+    139: PortSpec("NetBIOS"),
+    443: PortSpec("HTTPS", "http_title", tls=True),
+    445: PortSpec("SMB"),
+    631: PortSpec("IPP", "http_title"),
+    1883: PortSpec("MQTT"),
+    2375: PortSpec("Docker API"),
+    3000: PortSpec("Grafana", "http_title"),
+    3306: PortSpec("MySQL", "mysql_greeting"),
+    3389: PortSpec("RDP"),
+    5000: PortSpec("HTTP-5000", "http_title"),
+    5001: PortSpec("HTTPS-5001", "http_title", tls=True),
+    5432: PortSpec("PostgreSQL", "postgres_hello"),
+    5900: PortSpec("VNC", "banner"),
+    6379: PortSpec("Redis", "redis_info"),
+    6443: PortSpec("Kubernetes", tls=True),
+    8000: PortSpec("HTTP-8000", "http_title"),
+    8006: PortSpec("Proxmox", "http_title", tls=True),
+    8080: PortSpec("HTTP-alt", "http_title"),
+    8123: PortSpec("Home Assistant", "http_title"),
+    8384: PortSpec("Syncthing", "http_title"),
+    8443: PortSpec("HTTPS-alt", "http_title", tls=True),
+    9000: PortSpec("Portainer", "http_title"),
+    9090: PortSpec("Cockpit", "http_title", tls=True),
+    9100: PortSpec("Node Exporter", "http_title"),
+    9200: PortSpec("Elasticsearch", "http_title"),
+    9443: PortSpec("HTTPS-9443", "http_title", tls=True),
+    10250: PortSpec("Kubelet", tls=True),
+    11211: PortSpec("Memcached"),
+    27017: PortSpec("MongoDB"),
+    32400: PortSpec("Plex", "http_title"),
+}
+
+PROFILES: dict[str, tuple[int, ...]] = {
+    "quick": (22, 80, 443, 8006, 8080, 8443),
+    "standard": (22, 80, 443, 3306, 5432, 5900, 6443, 8006, 8080, 8443, 9090, 9100),
+}
+PROFILES["deep"] = tuple(sorted(CATALOGUE))
+
+DEFAULT_PROFILE = "standard"
+
+# Which port's <title> wins when several answer (then ascending port number)
+HTTP_TITLE_ORDER = (8006, 80, 443, 8080, 8443, 9090)
+
+# One client context for every TLS probe: building one per connection
+# costs more than the handshake on a LAN
+SSL_CTX = ssl.create_default_context()
+SSL_CTX.check_hostname = False
+SSL_CTX.verify_mode = ssl.CERT_NONE
+
+
+# ---------------------------------------------------------------------------
+# Port bitmasks
+# ---------------------------------------------------------------------------
+
+_order: tuple[int, ...] = ()
+_bit: dict[int, int] = {}
+
+
+def _reindex() -> None:
+    global _order, _bit
+    _order = tuple(sorted(CATALOGUE))
+    _bit = {port: 1 << i for i, port in enumerate(_order)}
+
+
+_reindex()
+
+
+def ports_to_mask(ports) -> int:
+    """Bitmask for *ports*; ports outside the catalogue are ignored."""
+    mask = 0
+    for port in ports:
+        mask |= _bit.get(port, 0)
+    return mask
+
+
+def mask_to_ports(mask: int) -> list[int]:
+    return [p for i, p in enumerate(_order) if mask >> i & 1]
+
+
+def profile_ports(name: str) -> tuple[int, ...]:
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown profile {name!r} (expected one of {', '.join(PROFILES)})") from None
+
+
+def load_catalogue(path: str) -> None:
+    """
+    Merge extra ports/profiles from a JSON file:
+
+        {"ports": {"8888": {"service": "Jupyter", "probe": "http_title", "tls": false}},
+         "profiles": {"media": [80, 443, 8096, 32400]}}
+
+    Profiles may only name catalogue ports.
+    """
+    with open(path) as fh:
+        data = json.load(fh)
+    for port, spec in data.get("ports", {}).items():
+        if spec.get("probe") and spec["probe"] not in PROBES:
+            raise ValueError(f"Port {port}: unknown probe {spec['probe']!r}")
+        CATALOGUE[int(port)] = PortSpec(spec["service"], spec.get("probe"), bool(spec.get("tls", False)))
+    for name, ports in data.get("profiles", {}).items():
+        unknown = [p for p in ports if int(p) not in CATALOGUE]
+        if unknown:
+            raise ValueError(f"Profile {name!r}: ports not in catalogue: {unknown}")
+        PROFILES[name] = tuple(sorted(int(p) for p in ports))
+    PROFILES["deep"] = tuple(sorted(set(PROFILES["deep"]) | set(CATALOGUE)))
+    _reindex()
+
+
+def init_probes(app) -> None:
+    """Load DISCOVERY_PORTS_FILE, if configured."""
+    path = app.config.get("DISCOVERY_PORTS_FILE")
+    if path:
+        load_catalogue(path)
+        logger.info("Loaded discovery port catalogue from %s (%d ports)", path, len(CATALOGUE))
+
+
+# ---------------------------------------------------------------------------
+# Plugin registry
+# ---------------------------------------------------------------------------
+
+class ProbeContext(NamedTuple):
+    ip: str
+    port: int
+    timeout: float
+
+
+ProbeFn = Callable[[asyncio.StreamReader, asyncio.StreamWriter, ProbeContext], Awaitable[dict]]
+
+PROBES: dict[str, ProbeFn] = {}
+
+
+def probe(name: str):
+    """Register an async plugin ``fn(reader, writer, ctx) -> dict`` under *name*."""
+    def register(fn: ProbeFn) -> ProbeFn:
+        PROBES[name] = fn
+        return fn
+    return register
+
+
+async def read_up_to(reader: asyncio.StreamReader, limit: int) -> bytes:
+    """Read until EOF or *limit* bytes, whichever comes first."""
+    buf = b""
+    while len(buf) < limit:
+        chunk = await reader.read(limit - len(buf))
+        if not chunk:
+            break
+        buf += chunk
+    return buf
+
+
+def _text(raw: bytes, limit: int = 256) -> Optional[str]:
+    return raw[:limit].decode("utf-8", errors="replace").strip() or None
+
+
+# ---------------------------------------------------------------------------
+# Plugins
+# ---------------------------------------------------------------------------
+
+class _TitleParser(HTMLParser):
+    """Minimal HTML parser that extracts the <title> text."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._in_title = False
+        self.title: Optional[str] = None
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        if tag.lower() == "title":
+            self._in_title = True
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag.lower() == "title":
+            self._in_title = False
+
+    def handle_data(self, data: str) -> None:
+        if self._in_title and self.title is None:
+            self.title = data.strip()
+
+
+@probe("http_title")
+async def http_title(reader, writer, ctx: ProbeContext) -> dict:
+    """GET / → page <title> and Server header."""
+    host = f"[{ctx.ip}]" if ":" in ctx.ip else ctx.ip
+    writer.write(
+        f"GET / HTTP/1.0\r\nHost: {host}:{ctx.port}\r\n"
+        "User-Agent: homelab-discovery/1.0\r\nConnection: close\r\n\r\n".encode()
+    )
+    await writer.drain()
+    raw = await read_up_to(reader, 8192)
+
+    head, _, body = raw.partition(b"\r\n\r\n")
+    server = None
+    for line in head.split(b"\r\n")[1:]:
+        name, _, value = line.partition(b":")
+        if name.strip().lower() == b"server":
+            server = _text(value)
+            break
+    parser = _TitleParser()
+    try:
+        parser.feed(body.decode("utf-8", errors="replace"))
+    except Exception:
+        pass
+    return {"title": parser.title or None, "server": server}
+
+
+@probe("banner")
+async def banner(reader, writer, ctx: ProbeContext) -> dict:
+    """First line the server volunteers (SSH, FTP, SMTP, VNC)."""
+    return {"banner": _text(await reader.readline())}
+
+
+@probe("redis_info")
+async def redis_info(reader, writer, ctx: ProbeContext) -> dict:
+    """INFO server → version, or note that AUTH is required."""
+    writer.write(b"INFO server\r\n")
+    await writer.drain()
+    raw = await reader.read(4096)  # the server keeps the connection open: one read
+    if raw.startswith(b"-"):
+        return {"redis": _text(raw[1:].split(b"\r\n", 1)[0])}
+    for line in raw.split(b"\r\n"):
+        if line.startswith(b"redis_version:"):
+            return {"redis_version": _text(line.partition(b":")[2])}
+    return {}
+
+
+@probe("postgres_hello")
+async def postgres_hello(reader, writer, ctx: ProbeContext) -> dict:
+    """SSLRequest — a PostgreSQL server answers a single 'S' or 'N'."""
+    writer.write((8).to_bytes(4, "big") + (80877103).to_bytes(4, "big"))
+    await writer.drain()
+    reply = await reader.read(1)
+    if reply in (b"S", b"N"):
+        return {"postgres": True, "postgres_ssl": reply == b"S"}
+    return {}
+
+
+@probe("mysql_greeting")
+async def mysql_greeting(reader, writer, ctx: ProbeContext) -> dict:
+    """The initial handshake packet carries the server version."""
+    raw = await reader.read(256)
+    # 3-byte length, 1-byte sequence, protocol version 10, NUL-terminated version
+    if len(raw) > 5 and raw[4] == 10:
+        return {"mysql_version": _text(raw[5:].split(b"\0", 1)[0])}
+    return {}
+
+
+@probe("tls_cert")
+async def tls_cert(reader, writer, ctx: ProbeContext) -> dict:
+    """Subject, issuer, expiry and SANs of the peer certificate (TLS ports only)."""
+    sslobj = writer.get_extra_info("ssl_object")
+    der = sslobj.getpeercert(binary_form=True) if sslobj else None
+    if not der:
+        return {}
+    try:
+        return parse_certificate(der)
+    except Exception:
+        # Malformed or unusual DER; the http_title plugin after us still runs
+        logger.debug("Unparseable certificate from %s:%d", ctx.ip, ctx.port, exc_info=True)
+        return {}
+
+
+# ---------------------------------------------------------------------------
+# Minimal X.509 reader (no dependency beyond the stdlib)
+# ---------------------------------------------------------------------------
+
+_OID_NAMES = {
+    bytes.fromhex("550403"): "CN",
+    bytes.fromhex("55040a"): "O",
+}
+_OID_SAN = bytes.fromhex("551d11")
+
+
+def _tlv(data: bytes, i: int) -> tuple[int, bytes, int]:
+    tag, length = data[i], data[i + 1]
+    i += 2
+    if length & 0x80:
+        n = length & 0x7F
+        length = int.from_bytes(data[i:i + n], "big")
+        i += n
+    return tag, data[i:i + length], i + length
+
+
+def _children(data: bytes) -> list[tuple[int, bytes]]:
+    out, i = [], 0
+    while i < len(data):
+        tag, value, i = _tlv(data, i)
+        out.append((tag, value))
+    return out
+
+
+def _name(data: bytes) -> Optional[str]:
+    parts = []
+    for _, rdn in _children(data):
+        for _, atv in _children(rdn):
+            (_, oid), (_, value) = _children(atv)[:2]
+            if oid in _OID_NAMES:
+                parts.append(f"{_OID_NAMES[oid]}={value.decode('utf-8', errors='replace')}")
+    return ", ".join(parts) or None
+
+
+def _time(tag: int, value: bytes) -> str:
+    fmt = "%y%m%d%H%M%SZ" if tag == 0x17 else "%Y%m%d%H%M%SZ"
+    return datetime.strptime(value.decode(), fmt).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def parse_certificate(der: bytes) -> dict:
+    """tls_subject / tls_issuer / tls_not_after / tls_sans from a DER certificate."""
+    cert = _children(der)[0][1]
+    tbs = _children(_children(cert)[0][1])
+    if tbs[0][0] == 0xA0:  # explicit [0] version
+        tbs = tbs[1:]
+    # serial, signature, issuer, validity, subject, spki, then optional [1] [2] [3]
+    issuer, validity, subject = tbs[2][1], tbs[3][1], tbs[4][1]
+    after_tag, after = _children(validity)[1]
+
+    sans: list[str] = []
+    for tag, value in tbs[6:]:
+        if tag != 0xA3:
+            continue
+        for _, ext in _children(_children(value)[0][1]):
+            fields = _children(ext)
+            if fields[0][1] == _OID_SAN:
+                for gtag, gval in _children(_children(fields[-1][1])[0][1]):
+                    if gtag == 0x82:    # dNSName
+                        sans.append(gval.decode("ascii", errors="replace"))
+                    elif gtag == 0x87:  # iPAddress
+                        sans.append(str(ipaddress.ip_address(gval)))
+    return {
+        "tls_subject": _name(subject),
+        "tls_issuer": _name(issuer),
+        "tls_not_after": _time(after_tag, after),
+        "tls_sans": sans[:20],
+    }
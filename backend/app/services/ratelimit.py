@@ -0,0 +1,230 @@
+"""
+Token-bucket rate limiting for discovery probe traffic.
+
+A scan's concurrency caps how many sockets are open at once, not how fast
+new ones are opened: a /22 at concurrency 512 can fire thousands of SYNs
+in the first few milliseconds, which cheap switches drop and IDS
+appliances flag. This module caps the *rate* instead, in two units:
+
+  packets/s      every probe packet discovery originates — an ICMP echo
+                 or the SYN of a TCP connect
+  connections/s  TCP connects only (sweep knocks and port probes)
+
+Each limit is a token bucket: ``rate`` tokens per second, holding at most
+``burst`` tokens, so short bursts go out at full speed and sustained
+traffic settles at the configured rate. Buckets are thread-safe and not
+tied to an event loop, so one process-wide RateLimiter (get_limiter())
+is shared by every scan running in the process — request scans, jobs,
+the scheduler — whichever thread or loop each runs on.
+
+Every gunicorn worker runs its own job runner and scheduler, so each
+process gets an equal share of the configured rates (1 /
+DISCOVERY_RATE_WORKERS, which defaults to GUNICORN_WORKERS) and the
+deployment as a whole stays within them even when every worker scans.
+
+Limits apply globally (DISCOVERY_RATE_PPS / DISCOVERY_RATE_CPS) and,
+optionally, per destination subnet (DISCOVERY_RATE_SUBNETS). A probe
+waits for its subnet's bucket first and then the global one, so a slow
+subnet queues behind its own limit without holding up the others.
+A rate of 0 means unlimited; with no limits configured, acquire() returns
+immediately.
+
+Usage:
+    from app.services.ratelimit import get_limiter
+
+    await get_limiter().acquire("192.168.1.10", connections=1)   # before a connect
+    get_limiter().stats()
+"""
+from __future__ import annotations
+
+import asyncio
+import ipaddress
+import threading
+import time
+from typing import Optional
+
+# Seconds of traffic at full rate a bucket may hold (its burst size)
+DEFAULT_BURST = 0.25
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket with reservations.
+
+    reserve() always succeeds: it takes the tokens (the balance may go
+    negative) and returns how long the caller must wait before sending.
+    Callers that arrive while the bucket is in debt queue behind earlier
+    ones, so waiting probes go out evenly spaced at ``rate``, in arrival
+    order, without a lock held across the wait.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None) -> None:
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst) if burst is not None else self.rate * DEFAULT_BURST)
+        self._tokens = self.burst
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+        self.granted = 0
+        self.throttled = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def reserve(self, n: float = 1.0) -> float:
+        """Take *n* tokens; seconds to wait before using them (0.0 if available now)."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+            self._stamp = now
+            self._tokens -= n
+            self.granted += 1
+            if self._tokens >= 0:
+                return 0.0
+            delay = -self._tokens / self.rate
+            self.throttled += 1
+            self.wait_total += delay
+            self.wait_max = max(self.wait_max, delay)
+            return delay
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "rate": self.rate,
+                "burst": self.burst,
+                "granted": self.granted,
+                "throttled": self.throttled,
+                "wait_total_s": round(self.wait_total, 3),
+                "wait_max_s": round(self.wait_max, 3),
+            }
+
+
+class _Limits:
+    """The packet and connection buckets of one scope (global or a subnet)."""
+
+    __slots__ = ("pps", "cps")
+
+    def __init__(self, pps: float, cps: float, burst: float) -> None:
+        self.pps = TokenBucket(pps, pps * burst) if pps > 0 else None
+        self.cps = TokenBucket(cps, cps * burst) if cps > 0 else None
+
+    def reserve(self, connections: int, packets: int) -> float:
+        delay = 0.0
+        if packets and self.pps is not None:
+            delay = self.pps.reserve(packets)
+        if connections and self.cps is not None:
+            delay = max(delay, self.cps.reserve(connections))
+        return delay
+
+    def stats(self) -> dict:
+        return {
+            "packets": self.pps.stats() if self.pps else None,
+            "connections": self.cps.stats() if self.cps else None,
+        }
+
+
+def parse_subnet_limits(spec: str) -> dict[str, tuple[float, float]]:
+    """
+    Parse DISCOVERY_RATE_SUBNETS: comma-separated ``cidr=pps/cps`` entries
+    (``/cps`` optional; 0 means unlimited), e.g.
+    ``10.0.0.0/24=200/50,192.168.1.0/24=1000``. Raises ValueError.
+    """
+    limits: dict[str, tuple[float, float]] = {}
+    for entry in filter(None, (e.strip() for e in spec.split(","))):
+        cidr, sep, rates = entry.partition("=")
+        if not sep:
+            raise ValueError(f"Rate limit {entry!r}: expected cidr=pps/cps")
+        pps, _, cps = rates.partition("/")
+        try:
+            network = ipaddress.ip_network(cidr.strip(), strict=False)
+            limits[str(network)] = (float(pps or 0), float(cps or 0))
+        except ValueError as exc:
+            raise ValueError(f"Rate limit {entry!r}: {exc}") from None
+    return limits
+
+
+class RateLimiter:
+    """Global plus per-subnet packet and connection limits (see module docstring)."""
+
+    def __init__(
+        self,
+        pps: float = 0,
+        cps: float = 0,
+        subnets: Optional[dict[str, tuple[float, float]]] = None,
+        burst: float = DEFAULT_BURST,
+    ) -> None:
+        self.global_limits = _Limits(pps, cps, burst)
+        # Most specific subnet first, so lookups take the first match
+        nets = sorted(
+            (ipaddress.ip_network(c) for c in (subnets or {})),
+            key=lambda n: (n.version, -n.prefixlen),
+        )
+        self.subnets = [(n, _Limits(*subnets[str(n)], burst)) for n in nets]
+        self.enabled = any(
+            b is not None
+            for limits in [self.global_limits, *(l for _, l in self.subnets)]
+            for b in (limits.pps, limits.cps)
+        )
+
+    def _subnet(self, ip: str) -> Optional[_Limits]:
+        if not self.subnets:
+            return None
+        addr = ipaddress.ip_address(ip)
+        for network, limits in self.subnets:
+            if addr.version == network.version and addr in network:
+                return limits
+        return None
+
+    async def acquire(self, ip: str, connections: int = 0, packets: int = 1) -> None:
+        """Wait until *ip*'s subnet and the global limits allow sending."""
+        if not self.enabled:
+            return
+        subnet = self._subnet(ip)
+        for limits in (subnet, self.global_limits):
+            if limits is not None:
+                delay = limits.reserve(connections, packets)
+                if delay:
+                    await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        """Configured rates and throttle counters, globally and per subnet."""
+        return {
+            "enabled": self.enabled,
+            "global": self.global_limits.stats(),
+            "subnets": {str(n): limits.stats() for n, limits in self.subnets},
+        }
+
+
+_limiter: Optional[RateLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter() -> RateLimiter:
+    """The process-wide limiter (unlimited if init_ratelimit() wasn't called)."""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter()
+    return _limiter
+
+
+def init_ratelimit(app, share: Optional[float] = None) -> RateLimiter:
+    """
+    Configure the process-wide limiter from DISCOVERY_RATE_* settings.
+
+    *share* scales every rate, for when several processes split one
+    budget: by default 1/DISCOVERY_RATE_WORKERS (the gunicorn workers);
+    the CLI's scan pool gives each of its N processes 1/N.
+    """
+    global _limiter
+    cfg = app.config
+    if share is None:
+        share = 1 / max(1, cfg.get("DISCOVERY_RATE_WORKERS", 1))
+    subnets = parse_subnet_limits(cfg.get("DISCOVERY_RATE_SUBNETS", ""))
+    with _limiter_lock:
+        _limiter = RateLimiter(
+            pps=cfg.get("DISCOVERY_RATE_PPS", 0) * share,
+            cps=cfg.get("DISCOVERY_RATE_CPS", 0) * share,
+            subnets={c: (pps * share, cps * share) for c, (pps, cps) in subnets.items()},
+            burst=cfg.get("DISCOVERY_RATE_BURST", DEFAULT_BURST),
+        )
+    return _limiter
@@ -0,0 +1,241 @@
+"""
+Shared, cached DNS resolver.
+
+libc's resolver (socket.gethostbyaddr / getaddrinfo) blocks, and against a
+slow or missing PTR server a single lookup can hang for several seconds.
+This wraps it so no caller ever waits longer than its deadline:
+
+  * lookups run on a small bounded thread pool, so a hung DNS server can
+    tie up at most ``threads`` threads, never the caller;
+  * every lookup has a deadline — past it the caller gets None and the
+    answer (if it ever arrives) still lands in the cache;
+  * positive and negative answers are cached with separate TTLs, and a
+    lookup that timed out is remembered as negative so the next scan
+    doesn't wait on the same dead server again;
+  * concurrent lookups of the same name share one in-flight query;
+  * queued plus running lookups are capped at ``max_pending``: past it a
+    lookup is answered None (unresolved, not cached) instead of queued, so
+    a hung DNS server during a /16 scan can't leave tens of thousands of
+    queries running for minutes after the scan returned.
+
+One process-wide instance (get_resolver()) is shared by discovery, the
+health checker and host import; init_resolver(app) applies DNS_* config.
+
+Usage:
+    from app.services.resolver import get_resolver
+
+    name = get_resolver().reverse("192.168.1.10")             # blocking, bounded
+    names = get_resolver().reverse_many(ips)                  # one deadline for all
+    addrs = get_resolver().forward_many(hostnames)
+    name = await get_resolver().areverse("192.168.1.10")      # asyncio
+"""
+from __future__ import annotations
+
+import asyncio
+import socket
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures import wait
+from typing import Iterable, Optional
+
+_MISS = object()
+
+
+def _ptr(ip: str) -> Optional[str]:
+    try:
+        return socket.gethostbyaddr(ip)[0]
+    except OSError:
+        return None
+
+
+def _addr(name: str) -> Optional[str]:
+    try:
+        return socket.getaddrinfo(name, None, proto=socket.IPPROTO_TCP)[0][4][0]
+    except (OSError, IndexError):
+        return None
+
+
+class Resolver:
+    """Bounded, deadline-driven lookups with a TTL cache (see module docstring)."""
+
+    def __init__(
+        self,
+        threads: int = 32,
+        deadline: float = 2.0,
+        positive_ttl: float = 3600,
+        negative_ttl: float = 300,
+        max_entries: int = 65536,
+        max_pending: int = 512,
+    ) -> None:
+        self.deadline = deadline
+        self.max_pending = max_pending
+        self.dropped = 0
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="resolver")
+        self._lock = threading.Lock()
+        self._cache: OrderedDict[tuple[str, str], tuple[float, Optional[str]]] = OrderedDict()
+        self._inflight: dict[tuple[str, str], Future] = {}
+
+    # -- cache ---------------------------------------------------------------
+
+    def _cached(self, key: tuple[str, str]):
+        with self._lock:
+            hit = self._cache.get(key)
+            if hit is None:
+                return _MISS
+            expires, value = hit
+            if expires < time.monotonic():
+                del self._cache[key]
+                return _MISS
+            self._cache.move_to_end(key)
+            return value
+
+    def _store(self, key: tuple[str, str], value: Optional[str]) -> None:
+        ttl = self.positive_ttl if value else self.negative_ttl
+        with self._lock:
+            self._cache[key] = (time.monotonic() + ttl, value)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    # -- lookups -------------------------------------------------------------
+
+    def _submit(self, kind: str, query: str):
+        """Cached value, or the (shared) in-flight Future for *query*."""
+        key = (kind, query)
+        value = self._cached(key)
+        if value is not _MISS:
+            return value
+        with self._lock:
+            fut = self._inflight.get(key)
+            if fut is not None:
+                return fut
+            if len(self._inflight) >= self.max_pending:
+                # DNS isn't keeping up: give up on this one rather than queue it
+                self.dropped += 1
+                return None
+            fut = self._pool.submit(_ptr if kind == "ptr" else _addr, query)
+            self._inflight[key] = fut
+        # Outside the lock: a lookup that has already finished runs the callback inline
+        fut.add_done_callback(lambda f, key=key: self._finish(key, f))
+        return fut
+
+    def _finish(self, key: tuple[str, str], fut: Future) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+        if not fut.cancelled():
+            self._store(key, fut.result())
+
+    def _timed_out(self, key: tuple[str, str]) -> None:
+        # Remember the stall so the next caller doesn't wait on it too; a late
+        # answer from the still-running query overwrites this.
+        if self._cached(key) is _MISS:
+            self._store(key, None)
+
+    def _lookup(self, kind: str, query: str, deadline: Optional[float]) -> Optional[str]:
+        pending = self._submit(kind, query)
+        if not isinstance(pending, Future):
+            return pending
+        try:
+            return pending.result(timeout=self.deadline if deadline is None else deadline)
+        except FutureTimeout:
+            self._timed_out((kind, query))
+            return None
+
+    def reverse(self, ip: str, deadline: Optional[float] = None) -> Optional[str]:
+        """PTR name for *ip*, or None (no record, error, or deadline passed)."""
+        return self._lookup("ptr", ip, deadline)
+
+    def forward(self, name: str, deadline: Optional[float] = None) -> Optional[str]:
+        """First address *name* resolves to, or None."""
+        return self._lookup("addr", name, deadline)
+
+    def _lookup_many(self, kind: str, queries: Iterable[str], deadline: Optional[float]) -> dict[str, Optional[str]]:
+        pending = {q: self._submit(kind, q) for q in dict.fromkeys(queries)}
+        futures = [f for f in pending.values() if isinstance(f, Future)]
+        if futures:
+            wait(futures, timeout=self.deadline if deadline is None else deadline)
+        out: dict[str, Optional[str]] = {}
+        for query, p in pending.items():
+            if not isinstance(p, Future):
+                out[query] = p
+            elif p.done() and not p.cancelled():
+                out[query] = p.result()
+            else:
+                self._timed_out((kind, query))
+                out[query] = None
+        return out
+
+    def reverse_many(self, ips: Iterable[str], deadline: Optional[float] = None) -> dict[str, Optional[str]]:
+        """Resolve many IPs concurrently; one *deadline* bounds the whole batch."""
+        return self._lookup_many("ptr", ips, deadline)
+
+    def forward_many(self, names: Iterable[str], deadline: Optional[float] = None) -> dict[str, Optional[str]]:
+        """forward() for many names concurrently, under one *deadline*."""
+        return self._lookup_many("addr", names, deadline)
+
+    async def areverse(self, ip: str, deadline: Optional[float] = None) -> Optional[str]:
+        """asyncio form of reverse(); awaiting it holds no thread."""
+        pending = self._submit("ptr", ip)
+        if not isinstance(pending, Future):
+            return pending
+        # A private loop future, not wrap_future(): timing out must not cancel a
+        # lookup other callers share, and a late answer must not trip over a
+        # loop that has since closed.
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+
+        def settle(fut: Future) -> None:
+            if not waiter.done():
+                waiter.set_result(None if fut.cancelled() else fut.result())
+
+        def wake(fut: Future) -> None:
+            try:
+                loop.call_soon_threadsafe(settle, fut)
+            except RuntimeError:  # loop already closed
+                pass
+
+        pending.add_done_callback(wake)
+        try:
+            return await asyncio.wait_for(waiter, self.deadline if deadline is None else deadline)
+        except asyncio.TimeoutError:
+            self._timed_out(("ptr", ip))
+            return None
+
+
+_resolver: Optional[Resolver] = None
+_resolver_lock = threading.Lock()
+
+
+def get_resolver() -> Resolver:
+    """The process-wide resolver (created with defaults if init_resolver() wasn't called)."""
+    global _resolver
+    if _resolver is None:
+        with _resolver_lock:
+            if _resolver is None:
+                _resolver = Resolver()
+    return _resolver
+
+
+def init_resolver(app) -> Resolver:
+    """Configure the process-wide resolver from DNS_* settings."""
+    global _resolver
+    cfg = app.config
+    with _resolver_lock:
+        _resolver = Resolver(
+            threads=cfg.get("DNS_THREADS", 32),
+            deadline=cfg.get("DNS_DEADLINE", 2.0),
+            positive_ttl=cfg.get("DNS_POSITIVE_TTL", 3600),
+            negative_ttl=cfg.get("DNS_NEGATIVE_TTL", 300),
+            max_pending=cfg.get("DNS_MAX_PENDING", 512),
+        )
+    return _resolver
@@ -5,56 +5,175 @@ Each inventory entity is embedded as a single document combining its
 most descriptive fields. Vectors are upserted on create/update and
 deleted on entity deletion.
 
-Embedding model: all-MiniLM-L6-v2 (384-dim, ~80MB, runs on CPU fine)
+Embedding model: all-MiniLM-L6-v2 (384-dim, ~80MB, runs on CPU fine),
+served by the backend selected with EMBEDDING_BACKEND (see embedding.py),
+either in-process or via the shared worker at EMBEDDING_SOCKET
+(see embedding_worker.py).
 
 Usage:
     from app.services.search import SearchService
 
     SearchService.upsert(entity_type="hardware", entity_id=1, entity_dict={...})
+    SearchService.upsert_many([("hardware", 1, {...}), ("misc", 7, {...})])   # one encode + one upsert
     SearchService.delete(entity_type="hardware", entity_id=1)
     results = SearchService.query("old nas box in basement", limit=10)
+    results = SearchService.query("nas", entity_types=["storage", "shares"])
+    results = SearchService.hydrate(results)   # attach full entity dicts
 """
 import logging
 import os
+import threading
+import time
 
 from flask import current_app
+from sqlalchemy.orm import selectinload
+
+from ..models import Hardware, VM, AppService, Storage, Share, Network, Misc, Document
+from .embedding import EMBEDDING_DIM, create_embedder
+from .embedding_worker import RemoteEmbedder, WorkerUnavailable
+from .metrics import timed
 
 logger = logging.getLogger(__name__)
 
+# Entities per encode()/upsert round trip in upsert_many()
+UPSERT_BATCH = 256
+
+# entity_type → model, shared by the backfill route and hit hydration
+ENTITY_MODELS = {
+    "hardware": Hardware,
+    "vms": VM,
+    "apps": AppService,
+    "storage": Storage,
+    "networks": Network,
+    "misc": Misc,
+    "shares": Share,
+    "documents": Document,
+}
+
+# Eager-load options so to_dict() doesn't lazy-load per row during hydration
+_HYDRATE_OPTIONS = {
+    "storage": (selectinload(Storage.shares),),
+}
+
+# Seconds an unavailable shared embedding worker is skipped before it is tried again
+WORKER_RETRY = 60.0
+
 # Lazily loaded singletons
-_embedder = None
+_embedder = None  # what encode() uses: the shared worker's client or the in-process model
+_local_embedder = None  # the in-process model, loaded at most once
+_worker_retry_at = 0.0  # while encoding in-process with EMBEDDING_SOCKET set: when to try the worker again
+_embedder_lock = threading.Lock()
 _qdrant = None
+_qdrant_lock = threading.Lock()
+
+
+def _retry_worker() -> bool:
+    return _embedder is _local_embedder and 0 < _worker_retry_at <= time.monotonic()
 
 
 def _get_embedder():
     global _embedder
-    if _embedder is None:
-        from sentence_transformers import SentenceTransformer
-        _embedder = SentenceTransformer("all-MiniLM-L6-v2")
+    if _embedder is None or _retry_worker():
+        # gthread workers: only one thread loads the model (or opens the socket)
+        with _embedder_lock:
+            if _embedder is None or _retry_worker():
+                _embedder = _load_embedder()
     return _embedder
 
 
+def _load_embedder():
+    """The shared worker's client if its socket is up, else the in-process model. Call with _embedder_lock held."""
+    global _worker_retry_at
+    socket_path = current_app.config.get("EMBEDDING_SOCKET")
+    if socket_path and os.path.exists(socket_path):
+        # Shared sidecar: model memory is paid once per host, not per worker
+        logger.info("Embedding via shared worker at %s", socket_path)
+        _worker_retry_at = 0.0
+        return RemoteEmbedder(socket_path)
+    if socket_path:
+        if not _worker_retry_at:
+            logger.warning("EMBEDDING_SOCKET %s not found; loading model in-process", socket_path)
+        _worker_retry_at = time.monotonic() + WORKER_RETRY
+    return _load_local()
+
+
+def _load_local():
+    """The in-process model, loaded on first use. Call with _embedder_lock held."""
+    global _local_embedder
+    if _local_embedder is not None:
+        return _local_embedder
+    backend = current_app.config.get("EMBEDDING_BACKEND", "sentence-transformers")
+    model_dir = current_app.config.get("EMBEDDING_MODEL_DIR")
+    try:
+        with timed("search.load_model"):
+            _local_embedder = create_embedder(backend, model_dir)
+    except ImportError as exc:
+        # The image was built for another backend; without this, search just returns []
+        logger.error(
+            "EMBEDDING_BACKEND=%s is not installed in this image (%s); "
+            "rebuild with --build-arg EMBEDDING_BACKEND=%s",
+            backend, exc, backend,
+        )
+        raise
+    logger.info("Embedding backend: %s", backend)
+    return _local_embedder
+
+
+def _encode(texts):
+    """
+    Vectors for *texts* from the current embedder. If the shared worker
+    is down or hung, switch this process to the in-process model (the
+    worker is tried again after WORKER_RETRY seconds) rather than failing
+    every search until a restart.
+    """
+    global _embedder, _worker_retry_at
+    embedder = _get_embedder()
+    try:
+        return embedder.encode(texts)
+    except WorkerUnavailable as exc:
+        logger.warning("Embedding worker unavailable (%s); encoding in-process for %.0fs", exc, WORKER_RETRY)
+        with _embedder_lock:
+            if _embedder is embedder:
+                _embedder = _load_local()
+                _worker_retry_at = time.monotonic() + WORKER_RETRY
+        return _get_embedder().encode(texts)
+
+
 def _get_qdrant():
     global _qdrant
     if _qdrant is None:
-        from qdrant_client import QdrantClient
-        url = current_app.config.get("QDRANT_URL", "http://localhost:6333")
-        _qdrant = QdrantClient(url=url)
-        _ensure_collection(_qdrant)
+        with _qdrant_lock:
+            if _qdrant is None:
+                from qdrant_client import QdrantClient
+                url = current_app.config.get("QDRANT_URL", "http://localhost:6333")
+                client = QdrantClient(url=url)
+                with timed("search.ensure_collection"):
+                    _ensure_collection(client)
+                _qdrant = client
     return _qdrant
 
 
 def _ensure_collection(client):
-    from qdrant_client.models import Distance, VectorParams
+    from qdrant_client.models import Distance, PayloadSchemaType, VectorParams
     collection = current_app.config.get("QDRANT_COLLECTION", "homelab")
     existing = [c.name for c in client.get_collections().collections]
     if collection not in existing:
         client.create_collection(
             collection_name=collection,
-            vectors_config=VectorParams(size=384, distance=Distance.COSINE),
+            vectors_config=VectorParams(size=EMBEDDING_DIM, distance=Distance.COSINE),
         )
         logger.info("Created Qdrant collection: %s", collection)
 
+    # Keyword index on entity_type so type-filtered searches don't scan payloads
+    payload_schema = client.get_collection(collection).payload_schema or {}
+    if "entity_type" not in payload_schema:
+        client.create_payload_index(
+            collection_name=collection,
+            field_name="entity_type",
+            field_schema=PayloadSchemaType.KEYWORD,
+        )
+        logger.info("Created entity_type payload index on %s", collection)
+
 
 def _make_text(entity_type: str, data: dict) -> str:
     """Flatten an entity dict into a searchable text blob."""
@@ -94,29 +213,72 @@ class SearchService:
         try:
             from qdrant_client.models import PointStruct
             client = _get_qdrant()
-            embedder = _get_embedder()
             collection = current_app.config.get("QDRANT_COLLECTION", "homelab")
 
             text = _make_text(entity_type, entity_dict)
-            vector = embedder.encode(text).tolist()
+            with timed("search.upsert.encode"):
+                vector = _encode(text).tolist()
 
-            client.upsert(
-                collection_name=collection,
-                points=[
+            with timed("search.upsert.vector_upsert"):
+                client.upsert(
+                    collection_name=collection,
+                    points=[
+                        PointStruct(
+                            id=_point_id(entity_type, entity_id),
+                            vector=vector,
+                            payload={
+                                "entity_type": entity_type,
+                                "entity_id": entity_id,
+                                "name": entity_dict.get("name", ""),
+                                "text": text,
+                            },
+                        )
+                    ],
+                )
+        except Exception:
+            logger.exception("Qdrant upsert failed for %s/%s", entity_type, entity_id)
+
+    @staticmethod
+    def upsert_many(items: list[tuple[str, int, dict]]):
+        """
+        Upsert many (entity_type, entity_id, entity_dict) at once: texts are
+        encoded in batches of UPSERT_BATCH and each batch is one Qdrant call.
+        Like upsert(), failures are logged, never raised.
+        """
+        if not items:
+            return
+        try:
+            from qdrant_client.models import PointStruct
+            client = _get_qdrant()
+            _get_embedder()
+            collection = current_app.config.get("QDRANT_COLLECTION", "homelab")
+        except Exception:
+            logger.exception("Qdrant batch upsert failed (%d items)", len(items))
+            return
+
+        for start in range(0, len(items), UPSERT_BATCH):
+            batch = items[start:start + UPSERT_BATCH]
+            try:
+                texts = [_make_text(entity_type, data) for entity_type, _, data in batch]
+                with timed("search.upsert_many.encode"):
+                    vectors = _encode(texts)
+                points = [
                     PointStruct(
                         id=_point_id(entity_type, entity_id),
-                        vector=vector,
+                        vector=vector.tolist(),
                         payload={
                             "entity_type": entity_type,
                             "entity_id": entity_id,
-                            "name": entity_dict.get("name", ""),
+                            "name": data.get("name", ""),
                             "text": text,
                         },
                     )
-                ],
-            )
-        except Exception:
-            logger.exception("Qdrant upsert failed for %s/%s", entity_type, entity_id)
+                    for (entity_type, entity_id, data), text, vector in zip(batch, texts, vectors)
+                ]
+                with timed("search.upsert_many.vector_upsert"):
+                    client.upsert(collection_name=collection, points=points)
+            except Exception:
+                logger.exception("Qdrant batch upsert failed (%d items)", len(batch))
 
     @staticmethod
     def delete(entity_type: str, entity_id: int):
@@ -124,27 +286,37 @@ class SearchService:
             from qdrant_client.models import PointIdsList
             client = _get_qdrant()
             collection = current_app.config.get("QDRANT_COLLECTION", "homelab")
-            client.delete(
-                collection_name=collection,
-                points_selector=PointIdsList(points=[_point_id(entity_type, entity_id)]),
-            )
+            with timed("search.delete.vector_delete"):
+                client.delete(
+                    collection_name=collection,
+                    points_selector=PointIdsList(points=[_point_id(entity_type, entity_id)]),
+                )
         except Exception:
             logger.exception("Qdrant delete failed for %s/%s", entity_type, entity_id)
 
     @staticmethod
-    def query(q: str, limit: int = 20) -> list[dict]:
+    def query(q: str, limit: int = 20, entity_types: list[str] | None = None) -> list[dict]:
         try:
+            from qdrant_client.models import FieldCondition, Filter, MatchAny
             client = _get_qdrant()
-            embedder = _get_embedder()
             collection = current_app.config.get("QDRANT_COLLECTION", "homelab")
 
-            vector = embedder.encode(q).tolist()
-            hits = client.search(
-                collection_name=collection,
-                query_vector=vector,
-                limit=limit,
-                with_payload=True,
-            )
+            query_filter = None
+            if entity_types:
+                query_filter = Filter(
+                    must=[FieldCondition(key="entity_type", match=MatchAny(any=list(entity_types)))]
+                )
+
+            with timed("search.query.encode"):
+                vector = _encode(q).tolist()
+            with timed("search.query.vector_search"):
+                hits = client.search(
+                    collection_name=collection,
+                    query_vector=vector,
+                    query_filter=query_filter,
+                    limit=limit,
+                    with_payload=True,
+                )
             return [
                 {
                     "entity_type": h.payload["entity_type"],
@@ -157,3 +329,38 @@ class SearchService:
         except Exception:
             logger.exception("Qdrant query failed")
             return []
+
+    @staticmethod
+    def hydrate(results: list[dict]) -> list[dict]:
+        """
+        Attach the full entity dict to each hit as ``entity``.
+
+        Issues one ``id IN (...)`` query per entity type present in the
+        results. Hits whose entity no longer exists (stale vectors) are
+        dropped. Ranking order is preserved.
+        """
+        ids_by_type: dict[str, list[int]] = {}
+        for r in results:
+            ids_by_type.setdefault(r["entity_type"], []).append(r["entity_id"])
+
+        entities: dict[tuple[str, int], dict] = {}
+        with timed("search.query.hydrate"):
+            for entity_type, ids in ids_by_type.items():
+                model = ENTITY_MODELS.get(entity_type)
+                if model is None:
+                    continue
+                rows = (
+                    model.query
+                    .options(*_HYDRATE_OPTIONS.get(entity_type, ()))
+                    .filter(model.id.in_(ids))
+                    .all()
+                )
+                for row in rows:
+                    entities[(entity_type, row.id)] = row.to_dict()
+
+        hydrated = []
+        for r in results:
+            entity = entities.get((r["entity_type"], r["entity_id"]))
+            if entity is not None:
+                hydrated.append({**r, "entity": entity})
+        return hydrated
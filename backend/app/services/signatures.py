@@ -0,0 +1,377 @@
+"""
+Declarative host signatures for discovery fingerprinting.
+
+A signature names a product and the evidence that identifies it; every
+criterion it sets must hold, criteria it leaves out are ignored:
+
+  ports      all of these ports open
+  any_ports  at least one of these open
+  no_ports   none of these open
+  title      regex searched in the HTTP <title>
+  server     regex searched in the HTTP Server header
+  banner     regex searched in the service banners (SSH, FTP, SMTP, VNC,
+             MySQL/Redis version), one per line
+  mac        MAC address prefixes (OUI "b8:27:eb", or longer MA-M/MA-S
+             blocks), any separator
+
+Regexes are case-insensitive. When several signatures match a host the
+first one wins, so specific products come before generic catch-alls.
+
+The database is compiled once into a SignatureEngine:
+
+  * each text field's patterns are OR-ed into one plain alternation, so a
+    title no signature mentions is rejected in a single search however
+    many patterns there are; only a hit narrows down (via unions of 64)
+    which patterns matched;
+  * port criteria become bitmasks over the ports signatures mention;
+  * MAC prefixes go into a dict probed once per prefix length;
+  * every criterion's outcome is an int bitset over signature indices, so
+    combining them is a handful of big-int ANDs and the winner is the
+    lowest set bit.
+
+Each field's outcome is memoised (hosts on a LAN share port sets, titles
+and OUIs), and match_many() also collapses identical hosts, so matching a
+whole scan costs roughly one evaluation per distinct host shape.
+
+Extra signatures are loaded from DISCOVERY_SIGNATURES_FILE (see
+load_signatures()); they are tried before the built-in ones and replace
+built-ins with the same name.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import re
+import threading
+from typing import Iterable, NamedTuple, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+TYPES = ("hardware", "vms", "apps", "storage", "networks", "misc")
+TEXT_FIELDS = ("title", "server", "banner")
+
+UNKNOWN = ("Unknown", "misc")
+
+_MEMO_MAX = 8192
+_CHUNK = 64
+_BACKREF = re.compile(r"\\[1-9]|\(\?P=")
+
+SIGNATURES: list[dict] = [
+    # Products identified by what they say about themselves
+    {"name": "proxmox-ve", "label": "Proxmox VE", "type": "hardware",
+     "title": r"Proxmox Virtual Environment"},
+    {"name": "proxmox-ve-api", "label": "Proxmox VE", "type": "hardware", "server": r"pve-api-daemon"},
+    {"name": "proxmox-backup", "label": "Proxmox Backup Server", "type": "hardware",
+     "title": r"Proxmox Backup Server"},
+    {"name": "esxi", "label": "VMware ESXi", "type": "hardware", "title": r"VMware ESXi"},
+    {"name": "vcenter", "label": "VMware vCenter", "type": "apps", "title": r"vSphere|vCenter"},
+    {"name": "xcp-ng", "label": "XCP-ng", "type": "hardware", "title": r"XCP-ng|Xen Orchestra"},
+    {"name": "idrac", "label": "Dell iDRAC", "type": "hardware", "title": r"iDRAC|Integrated Dell Remote Access"},
+    {"name": "ilo", "label": "HPE iLO", "type": "hardware", "title": r"\biLO\b|Integrated Lights-Out"},
+    {"name": "ipmi", "label": "IPMI / BMC", "type": "hardware", "title": r"Supermicro|\bIPMI\b|\bBMC\b"},
+    {"name": "truenas", "label": "TrueNAS", "type": "hardware", "title": r"TrueNAS|FreeNAS"},
+    {"name": "synology", "label": "Synology DSM", "type": "hardware", "title": r"Synology|DiskStation"},
+    {"name": "qnap", "label": "QNAP QTS", "type": "hardware", "title": r"\bQNAP\b|\bQTS\b"},
+    {"name": "unraid", "label": "Unraid", "type": "hardware", "title": r"Unraid"},
+    {"name": "openmediavault", "label": "OpenMediaVault", "type": "hardware", "title": r"openmediavault"},
+    {"name": "pfsense", "label": "pfSense", "type": "hardware", "title": r"pfSense"},
+    {"name": "opnsense", "label": "OPNsense", "type": "hardware", "title": r"OPNsense"},
+    {"name": "routeros", "label": "MikroTik RouterOS", "type": "hardware", "title": r"RouterOS|MikroTik"},
+    {"name": "routeros-ssh", "label": "MikroTik RouterOS", "type": "hardware", "banner": r"ROSSSH"},
+    {"name": "openwrt", "label": "OpenWrt", "type": "hardware", "title": r"OpenWrt|LuCI"},
+    {"name": "unifi", "label": "UniFi Network", "type": "apps", "title": r"UniFi"},
+    {"name": "pihole", "label": "Pi-hole", "type": "apps", "title": r"Pi-hole"},
+    {"name": "adguard", "label": "AdGuard Home", "type": "apps", "title": r"AdGuard"},
+    {"name": "home-assistant", "label": "Home Assistant", "type": "apps", "title": r"Home Assistant"},
+    {"name": "grafana", "label": "Grafana", "type": "apps", "title": r"Grafana"},
+    {"name": "prometheus", "label": "Prometheus", "type": "apps", "title": r"Prometheus"},
+    {"name": "node-exporter", "label": "Node Exporter", "type": "hardware", "title": r"Node Exporter"},
+    {"name": "portainer", "label": "Portainer", "type": "apps", "title": r"Portainer"},
+    {"name": "jellyfin", "label": "Jellyfin", "type": "apps", "title": r"Jellyfin"},
+    {"name": "emby", "label": "Emby", "type": "apps", "title": r"\bEmby\b"},
+    {"name": "nextcloud", "label": "Nextcloud", "type": "apps", "title": r"Nextcloud"},
+    {"name": "gitea", "label": "Gitea", "type": "apps", "title": r"Gitea|Forgejo"},
+    {"name": "gitlab", "label": "GitLab", "type": "apps", "title": r"GitLab"},
+    {"name": "jenkins", "label": "Jenkins", "type": "apps", "title": r"Jenkins"},
+    {"name": "syncthing", "label": "Syncthing", "type": "apps", "title": r"Syncthing"},
+    {"name": "vaultwarden", "label": "Vaultwarden", "type": "apps", "title": r"Vaultwarden|Bitwarden"},
+    {"name": "uptime-kuma", "label": "Uptime Kuma", "type": "apps", "title": r"Uptime Kuma"},
+    {"name": "nginx-proxy-manager", "label": "Nginx Proxy Manager", "type": "apps",
+     "title": r"Nginx Proxy Manager"},
+    {"name": "traefik", "label": "Traefik", "type": "apps", "title": r"Traefik"},
+    {"name": "mariadb", "label": "MariaDB", "type": "apps", "banner": r"MariaDB"},
+    # Products identified by a distinctive port (the original rules first)
+    {"name": "proxmox-ve-port", "label": "Proxmox VE", "type": "hardware", "any_ports": [8006]},
+    {"name": "cockpit", "label": "Cockpit", "type": "hardware", "any_ports": [9090]},
+    {"name": "kubernetes", "label": "Kubernetes API", "type": "misc", "any_ports": [6443]},
+    {"name": "kubelet", "label": "Kubernetes node", "type": "hardware", "any_ports": [10250]},
+    {"name": "home-assistant-port", "label": "Home Assistant", "type": "apps", "any_ports": [8123]},
+    {"name": "plex", "label": "Plex Media Server", "type": "apps", "any_ports": [32400]},
+    {"name": "docker-api", "label": "Docker Engine API", "type": "misc", "any_ports": [2375]},
+    {"name": "printer", "label": "Printer", "type": "hardware", "any_ports": [631]},
+    {"name": "vnc", "label": "VNC Host", "type": "hardware", "any_ports": [5900]},
+    {"name": "postgres", "label": "PostgreSQL", "type": "apps", "any_ports": [5432], "no_ports": [22]},
+    {"name": "mysql", "label": "MySQL", "type": "apps", "any_ports": [3306], "no_ports": [22]},
+    {"name": "redis", "label": "Redis", "type": "apps", "any_ports": [6379], "no_ports": [22]},
+    # Hardware families and virtual NICs by OUI
+    {"name": "raspberry-pi", "label": "Raspberry Pi", "type": "hardware",
+     "mac": ["28:cd:c1", "2c:cf:67", "b8:27:eb", "d8:3a:dd", "dc:a6:32", "e4:5f:01"]},
+    {"name": "ubiquiti", "label": "Ubiquiti device", "type": "hardware",
+     "mac": ["04:18:d6", "18:e8:29", "24:5a:4c", "24:a4:3c", "44:d9:e7", "68:d7:9a", "74:83:c2",
+             "78:8a:20", "80:2a:a8", "b4:fb:e4", "dc:9f:db", "e0:63:da", "f0:9f:c2", "fc:ec:da"]},
+    {"name": "proxmox-guest", "label": "Proxmox guest", "type": "misc", "mac": ["bc:24:11"]},
+    {"name": "kvm-guest", "label": "KVM/QEMU guest", "type": "misc", "mac": ["52:54:00"]},
+    {"name": "vmware-guest", "label": "VMware guest", "type": "misc", "mac": ["00:05:69", "00:0c:29", "00:50:56"]},
+    {"name": "virtualbox-guest", "label": "VirtualBox guest", "type": "misc", "mac": ["08:00:27"]},
+    {"name": "hyperv-guest", "label": "Hyper-V guest", "type": "misc", "mac": ["00:15:5d"]},
+    {"name": "xen-guest", "label": "Xen guest", "type": "misc", "mac": ["00:16:3e"]},
+    {"name": "docker-container", "label": "Docker container", "type": "misc", "mac": ["02:42"]},
+    # Generic fallbacks
+    {"name": "ssh", "label": "SSH Host", "type": "hardware", "ports": [22],
+     "no_ports": [80, 443, 8006, 8080, 8443, 9090]},
+    {"name": "web", "label": "Web Server", "type": "apps", "any_ports": [80, 443]},
+]
+
+
+class Signature(NamedTuple):
+    name: str
+    label: str
+    type: str
+    ports: tuple[int, ...] = ()
+    any_ports: tuple[int, ...] = ()
+    no_ports: tuple[int, ...] = ()
+    title: Optional[str] = None
+    server: Optional[str] = None
+    banner: Optional[str] = None
+    mac: tuple[str, ...] = ()
+
+
+class HostFeatures(NamedTuple):
+    """What a signature can look at; hashable so identical hosts collapse."""
+    ports: frozenset[int]
+    title: Optional[str] = None
+    server: Optional[str] = None
+    banner: Optional[str] = None
+    mac: Optional[str] = None
+
+
+def _hex(mac: str) -> str:
+    return "".join(c for c in mac.lower() if c in "0123456789abcdef")
+
+
+def parse_signature(raw: dict) -> Signature:
+    """Validate one signature dict; raises ValueError naming the bad field."""
+    name = raw.get("name")
+    if not name or not raw.get("label"):
+        raise ValueError(f"Signature {name or raw!r}: 'name' and 'label' are required")
+    sig_type = raw.get("type", "misc")
+    if sig_type not in TYPES:
+        raise ValueError(f"Signature {name!r}: type must be one of {', '.join(TYPES)}")
+    fields: dict = {}
+    for key in ("ports", "any_ports", "no_ports"):
+        fields[key] = tuple(sorted({int(p) for p in raw.get(key, ())}))
+    for key in TEXT_FIELDS:
+        pattern = raw.get(key)
+        if not pattern:
+            continue
+        try:
+            # Patterns are OR-ed together, so they must also be valid inside a group
+            rx = re.compile(f"(?:{pattern})", re.IGNORECASE)
+        except re.error as exc:
+            raise ValueError(f"Signature {name!r}: bad {key} regex: {exc}") from None
+        if rx.groupindex or _BACKREF.search(pattern):
+            raise ValueError(f"Signature {name!r}: {key} regex must not use named groups or backreferences")
+        if rx.search(""):
+            raise ValueError(f"Signature {name!r}: {key} regex matches the empty string")
+        fields[key] = pattern
+    prefixes = tuple(_hex(m) for m in raw.get("mac", ()))
+    if any(len(p) < 4 for p in prefixes):
+        raise ValueError(f"Signature {name!r}: MAC prefixes need at least 2 octets")
+    fields["mac"] = prefixes
+    if not (fields["ports"] or fields["any_ports"] or prefixes or any(k in fields for k in TEXT_FIELDS)):
+        raise ValueError(f"Signature {name!r}: needs at least one of ports, any_ports, mac, {', '.join(TEXT_FIELDS)}")
+    return Signature(name, raw["label"], sig_type, **fields)
+
+
+def _union(patterns: list[str]) -> re.Pattern:
+    # A bare top-level alternation: sre factors common literal prefixes and
+    # first-character sets out of it, which wrapping each branch in a group
+    # (named or not) would prevent — ~100x slower at a few thousand branches
+    return re.compile("|".join(patterns), re.IGNORECASE)
+
+
+class _TextMatcher:
+    """
+    One field's patterns → bitset of the signatures whose pattern matches.
+
+    A union of every pattern rejects the (usual) non-matching text in a
+    single search; on a hit, unions of _CHUNK patterns narrow down which
+    individual patterns to try.
+    """
+
+    def __init__(self, patterns: dict[str, int]) -> None:
+        items = [(re.compile(p, re.IGNORECASE), bits) for p, bits in patterns.items()]
+        self.any = _union(list(patterns)) if patterns else None
+        self.chunks = [
+            (_union([rx.pattern for rx, _ in items[i:i + _CHUNK]]), items[i:i + _CHUNK])
+            for i in range(0, len(items), _CHUNK)
+        ]
+        self.memo: dict[str, int] = {}
+
+    def bits(self, text: Optional[str]) -> int:
+        if not text or self.any is None:
+            return 0
+        hit = self.memo.get(text)
+        if hit is None:
+            hit = 0
+            if self.any.search(text):
+                for union, items in self.chunks:
+                    if union.search(text):
+                        for rx, bits in items:
+                            if rx.search(text):
+                                hit |= bits
+            if len(self.memo) >= _MEMO_MAX:
+                self.memo.clear()
+            self.memo[text] = hit
+        return hit
+
+
+class SignatureEngine:
+    """A compiled signature database (see module docstring)."""
+
+    def __init__(self, signatures: Sequence[Signature]) -> None:
+        self.signatures = tuple(signatures)
+        everyone = (1 << len(self.signatures)) - 1
+
+        # Ports: bitmask over the ports any signature mentions; one matcher
+        # per distinct (all, any, none) combination
+        mentioned = sorted({p for s in self.signatures for p in (*s.ports, *s.any_ports, *s.no_ports)})
+        self._port_bit = {port: 1 << i for i, port in enumerate(mentioned)}
+        groups: dict[tuple[int, int, int], int] = {}
+        for i, s in enumerate(self.signatures):
+            key = (self._mask(s.ports), self._mask(s.any_ports), self._mask(s.no_ports))
+            groups[key] = groups.get(key, 0) | 1 << i
+        self._port_groups = tuple((a, b, c, bits) for (a, b, c), bits in groups.items())
+        self._port_memo: dict[int, int] = {}
+
+        # Text fields: signatures without a pattern pass unconditionally
+        self._text: dict[str, _TextMatcher] = {}
+        self._text_free: dict[str, int] = {}
+        for field in TEXT_FIELDS:
+            patterns: dict[str, int] = {}
+            for i, s in enumerate(self.signatures):
+                pattern = getattr(s, field)
+                if pattern:
+                    patterns[pattern] = patterns.get(pattern, 0) | 1 << i
+            self._text[field] = _TextMatcher(patterns)
+            self._text_free[field] = everyone & ~sum(
+                1 << i for i, s in enumerate(self.signatures) if getattr(s, field)
+            )
+
+        # MAC prefixes, looked up once per distinct prefix length
+        self._mac: dict[str, int] = {}
+        for i, s in enumerate(self.signatures):
+            for prefix in s.mac:
+                self._mac[prefix] = self._mac.get(prefix, 0) | 1 << i
+        self._mac_lengths = tuple(sorted({len(p) for p in self._mac}))
+        self._mac_free = everyone & ~sum(1 << i for i, s in enumerate(self.signatures) if s.mac)
+
+    def _mask(self, ports: Iterable[int]) -> int:
+        mask = 0
+        for port in ports:
+            mask |= self._port_bit.get(port, 0)
+        return mask
+
+    def _ports_bits(self, ports: Iterable[int]) -> int:
+        mask = self._mask(ports)
+        hit = self._port_memo.get(mask)
+        if hit is None:
+            hit = 0
+            for all_of, any_of, none_of, bits in self._port_groups:
+                if mask & all_of == all_of and (not any_of or mask & any_of) and not mask & none_of:
+                    hit |= bits
+            if len(self._port_memo) >= _MEMO_MAX:
+                self._port_memo.clear()
+            self._port_memo[mask] = hit
+        return hit
+
+    def _mac_bits(self, mac: Optional[str]) -> int:
+        if not mac or not self._mac:
+            return self._mac_free
+        digits = _hex(mac)
+        hit = self._mac_free
+        for length in self._mac_lengths:
+            hit |= self._mac.get(digits[:length], 0)
+        return hit
+
+    def match(self, host: HostFeatures) -> Optional[Signature]:
+        """The first signature every criterion of which *host* satisfies, or None."""
+        bits = self._ports_bits(host.ports)
+        for field in TEXT_FIELDS:
+            if not bits:
+                return None
+            bits &= self._text[field].bits(getattr(host, field)) | self._text_free[field]
+        bits &= self._mac_bits(host.mac)
+        if not bits:
+            return None
+        return self.signatures[(bits & -bits).bit_length() - 1]
+
+    def match_many(self, hosts: Iterable[HostFeatures]) -> list[Optional[Signature]]:
+        """match() for a whole scan; identical hosts are evaluated once."""
+        seen: dict[HostFeatures, Optional[Signature]] = {}
+        out = []
+        for host in hosts:
+            if host not in seen:
+                seen[host] = self.match(host)
+            out.append(seen[host])
+        return out
+
+    def classify(self, host: HostFeatures) -> tuple[str, str]:
+        """(fingerprint label, suggested_type) for *host*."""
+        sig = self.match(host)
+        return (sig.label, sig.type) if sig else UNKNOWN
+
+    def classify_many(self, hosts: Iterable[HostFeatures]) -> list[tuple[str, str]]:
+        return [(s.label, s.type) if s else UNKNOWN for s in self.match_many(hosts)]
+
+
+_engine: Optional[SignatureEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> SignatureEngine:
+    """The process-wide engine (built-in signatures unless load_signatures() ran)."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = SignatureEngine([parse_signature(s) for s in SIGNATURES])
+    return _engine
+
+
+def load_signatures(path: str) -> SignatureEngine:
+    """
+    Compile the built-in signatures plus those in a JSON file:
+
+        {"signatures": [{"name": "jupyter", "label": "Jupyter", "type": "apps",
+                         "title": "Jupyter (Server|Notebook|Lab)"}]}
+
+    File signatures are tried first; one with a built-in's name replaces it.
+    """
+    global _engine
+    with open(path) as fh:
+        extra = [parse_signature(s) for s in json.load(fh).get("signatures", [])]
+    names = {s.name for s in extra}
+    builtin = [s for s in (parse_signature(r) for r in SIGNATURES) if s.name not in names]
+    engine = SignatureEngine(extra + builtin)
+    with _engine_lock:
+        _engine = engine
+    return engine
+
+
+def init_signatures(app) -> None:
+    """Load DISCOVERY_SIGNATURES_FILE, if configured."""
+    path = app.config.get("DISCOVERY_SIGNATURES_FILE")
+    if path:
+        engine = load_signatures(path)
+        logger.info("Loaded discovery signatures from %s (%d total)", path, len(engine.signatures))
@@ -4,5 +4,28 @@ set -e
 echo "Running database migrations..."
 alembic upgrade head
 
+if [ -n "$EMBEDDING_SOCKET" ]; then
+    echo "Starting shared embedding worker on $EMBEDDING_SOCKET..."
+    # Supervised by a subshell loop: exec gunicorn below replaces this shell,
+    # and gunicorn would neither restart the worker nor wait for it. While it
+    # is down, API workers encode in-process (services/search.py).
+    (
+        while true; do
+            python -m app.services.embedding_worker --socket "$EMBEDDING_SOCKET" || true
+            echo "Embedding worker exited; restarting in 5s" >&2
+            rm -f "$EMBEDDING_SOCKET"
+            sleep 5
+        done
+    ) &
+    # Wait for the model to load so the first requests don't fall back to in-process
+    i=0
+    while [ ! -S "$EMBEDDING_SOCKET" ] && [ $i -lt 120 ]; do
+        sleep 1
+        i=$((i + 1))
+    done
+fi
+
 echo "Starting application..."
-exec gunicorn --bind 0.0.0.0:8000 --workers 1 --timeout 120 wsgi:app
+# gthread workers keep heartbeating while a thread streams a long response
+exec gunicorn --bind 0.0.0.0:8000 --workers "${GUNICORN_WORKERS:-1}" \
+    --worker-class gthread --threads "${GUNICORN_THREADS:-8}" --timeout 120 wsgi:app
@@ -0,0 +1,57 @@
+"""add discovery jobs and results
+
+Revision ID: 009
+Revises: 008_add_mac_address
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008_add_mac_address'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'discovery_jobs',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('cidr', sa.Text(), nullable=False),
+        sa.Column('concurrency', sa.Integer(), nullable=False),
+        sa.Column('timeout', sa.Float(), nullable=False),
+        sa.Column('status', sa.Text(), nullable=False, server_default='queued'),
+        sa.Column('total_hosts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('cursor', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('alive_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('cancel_requested', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column('worker_id', sa.Text(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.current_timestamp()),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.current_timestamp()),
+    )
+    op.create_index('ix_discovery_jobs_status', 'discovery_jobs', ['status'])
+
+    op.create_table(
+        'discovery_results',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('job_id', sa.Integer(), sa.ForeignKey('discovery_jobs.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('ip', sa.Text(), nullable=False),
+        sa.Column('alive', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column('data', sa.Text(), nullable=False),
+        sa.UniqueConstraint('job_id', 'ip', name='uq_discovery_result_ip'),
+    )
+    op.create_index('ix_discovery_results_job_alive', 'discovery_results', ['job_id', 'alive'])
+
+
+def downgrade():
+    op.drop_index('ix_discovery_results_job_alive', table_name='discovery_results')
+    op.drop_table('discovery_results')
+    op.drop_index('ix_discovery_jobs_status', table_name='discovery_jobs')
+    op.drop_table('discovery_jobs')
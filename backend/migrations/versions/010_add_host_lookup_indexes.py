@@ -0,0 +1,40 @@
+"""add ip/mac/hostname lookup indexes for discovery import
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+# (index name, table, expression) — hostname/MAC are matched case-insensitively
+_INDEXES = [
+    ('ix_hardware_ip_address', 'hardware', 'ip_address'),
+    ('ix_hardware_mac_address_lower', 'hardware', 'lower(mac_address)'),
+    ('ix_hardware_hostname_lower', 'hardware', 'lower(hostname)'),
+    ('ix_vms_ip_address', 'vms', 'ip_address'),
+    ('ix_vms_mac_address_lower', 'vms', 'lower(mac_address)'),
+    ('ix_vms_hostname_lower', 'vms', 'lower(hostname)'),
+    ('ix_apps_ip_address', 'apps', 'ip_address'),
+    ('ix_apps_hostname_lower', 'apps', 'lower(hostname)'),
+    ('ix_misc_ip_address', 'misc', 'ip_address'),
+    ('ix_misc_hostname_lower', 'misc', 'lower(hostname)'),
+]
+
+
+def upgrade():
+    for name, table, expr in _INDEXES:
+        op.create_index(name, table, [sa.text(expr) if '(' in expr else expr])
+
+
+def downgrade():
+    for name, table, _ in reversed(_INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,71 @@
+"""add scheduled discovery state and change feed
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'discovery_subnets',
+        sa.Column('cidr', sa.Text(), primary_key=True),
+        sa.Column('next_run_at', sa.DateTime(), nullable=False),
+        sa.Column('last_started_at', sa.DateTime(), nullable=True),
+        sa.Column('last_finished_at', sa.DateTime(), nullable=True),
+        sa.Column('last_duration_ms', sa.Float(), nullable=True),
+        sa.Column('last_alive', sa.Integer(), nullable=True),
+        sa.Column('last_changes', sa.Integer(), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('worker_id', sa.Text(), nullable=True),
+        sa.Column('heartbeat_at', sa.DateTime(), nullable=True),
+    )
+
+    op.create_table(
+        'discovered_hosts',
+        sa.Column('ip', sa.Text(), primary_key=True),
+        sa.Column('cidr', sa.Text(), nullable=False),
+        sa.Column('alive', sa.Boolean(), nullable=False, server_default=sa.true()),
+        sa.Column('misses', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('mac_address', sa.Text(), nullable=True),
+        sa.Column('hostname', sa.Text(), nullable=True),
+        sa.Column('open_ports', sa.Text(), nullable=False, server_default='[]'),
+        sa.Column('fingerprint', sa.Text(), nullable=True),
+        sa.Column('drift', sa.Text(), nullable=True),
+        sa.Column('first_seen_at', sa.DateTime(), nullable=False, server_default=sa.func.current_timestamp()),
+        sa.Column('last_seen_at', sa.DateTime(), nullable=False, server_default=sa.func.current_timestamp()),
+    )
+    op.create_index('ix_discovered_hosts_cidr', 'discovered_hosts', ['cidr'])
+
+    op.create_table(
+        'discovery_changes',
+        sa.Column('id', sa.Integer(), primary_key=True, autoincrement=True),
+        sa.Column('cidr', sa.Text(), nullable=False),
+        sa.Column('ip', sa.Text(), nullable=False),
+        sa.Column('kind', sa.Text(), nullable=False),
+        sa.Column('detail', sa.Text(), nullable=False, server_default='{}'),
+        sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.current_timestamp()),
+    )
+    op.create_index('ix_discovery_changes_ip', 'discovery_changes', ['ip'])
+    op.create_index('ix_discovery_changes_created_at', 'discovery_changes', ['created_at'])
+    op.create_index('ix_discovery_changes_kind_id', 'discovery_changes', ['kind', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_discovery_changes_kind_id', table_name='discovery_changes')
+    op.drop_index('ix_discovery_changes_created_at', table_name='discovery_changes')
+    op.drop_index('ix_discovery_changes_ip', table_name='discovery_changes')
+    op.drop_table('discovery_changes')
+    op.drop_index('ix_discovered_hosts_cidr', table_name='discovered_hosts')
+    op.drop_table('discovered_hosts')
+    op.drop_table('discovery_subnets')
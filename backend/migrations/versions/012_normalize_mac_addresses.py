@@ -0,0 +1,46 @@
+"""normalize stored mac addresses to lower-case colon form
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '012'
+down_revision = '011'
+branch_labels = None
+depends_on = None
+
+_TABLES = ('hardware', 'vms')
+
+
+def _normalize(mac):
+    digits = ''.join(c for c in mac.lower() if c in '0123456789abcdef')
+    if len(digits) != 12:
+        return None
+    return ':'.join(digits[i:i + 2] for i in range(0, 12, 2))
+
+
+def upgrade():
+    # The models now store aa:bb:cc:dd:ee:ff on write; rewrite rows entered
+    # as AA-BB-CC-DD-EE-FF, aabb.ccdd.eeff etc. so MAC lookups find them.
+    # Values that aren't a MAC are left alone.
+    bind = op.get_bind()
+    for table in _TABLES:
+        rows = bind.execute(sa.text(f'SELECT id, mac_address FROM {table} WHERE mac_address IS NOT NULL')).fetchall()
+        for row_id, mac in rows:
+            normalized = _normalize(mac)
+            if normalized and normalized != mac:
+                bind.execute(
+                    sa.text(f'UPDATE {table} SET mac_address = :mac WHERE id = :id'),
+                    {'mac': normalized, 'id': row_id},
+                )
+
+
+def downgrade():
+    # The original formatting isn't kept; normalized values stay valid
+    pass
@@ -0,0 +1,99 @@
+"""
+Benchmark embedding backends: startup time, memory and encode throughput.
+
+Each backend is measured in a fresh subprocess so RSS numbers aren't
+polluted by the other backend's imports.
+
+    python scripts/bench_embedder.py --model-dir ./models/all-MiniLM-L6-v2-onnx
+    python scripts/bench_embedder.py --backends onnx --batch-sizes 1,32
+
+Run from the backend/ directory.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+SAMPLE = (
+    "hardware | name: pve-01 | hostname: pve-01.lan | ip address: 192.168.1.10 | "
+    "cpu: Intel Xeon E5-2680 v4 | ram gb: 128 | os: Proxmox VE 8 | location: basement rack"
+)
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/status") as fh:
+        for line in fh:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def _measure(backend: str, model_dir: str | None, batch_sizes: list[int], seconds: float) -> dict:
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from app.services.embedding import create_embedder
+
+    rss_before = _rss_mb()
+    t0 = time.perf_counter()
+    embedder = create_embedder(backend, model_dir)
+    embedder.encode(SAMPLE)  # first call pays lazy init / graph warm-up
+    startup_s = time.perf_counter() - t0
+
+    throughput = {}
+    for size in batch_sizes:
+        batch = [f"{SAMPLE} #{i}" for i in range(size)]
+        n = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            embedder.encode(batch if size > 1 else batch[0])
+            n += size
+        throughput[str(size)] = round(n / (time.perf_counter() - start), 1)
+
+    return {
+        "backend": backend,
+        "startup_s": round(startup_s, 3),
+        "rss_mb": round(_rss_mb(), 1),
+        "rss_delta_mb": round(_rss_mb() - rss_before, 1),
+        "texts_per_s": throughput,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", default="sentence-transformers,onnx")
+    parser.add_argument("--model-dir", default=os.environ.get("EMBEDDING_MODEL_DIR"))
+    parser.add_argument("--batch-sizes", default="1,8,32")
+    parser.add_argument("--seconds", type=float, default=3.0, help="Duration of each throughput run")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    batch_sizes = [int(b) for b in args.batch_sizes.split(",")]
+
+    if args.child:
+        print(json.dumps(_measure(args.child, args.model_dir, batch_sizes, args.seconds)))
+        return
+
+    rows = []
+    for backend in args.backends.split(","):
+        cmd = [sys.executable, __file__, "--child", backend,
+               "--batch-sizes", args.batch_sizes, "--seconds", str(args.seconds)]
+        if args.model_dir:
+            cmd += ["--model-dir", args.model_dir]
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(f"{backend}: failed\n{proc.stderr.strip()}", file=sys.stderr)
+            continue
+        rows.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    header = f"{'backend':<24}{'startup s':>10}{'RSS MB':>9}{'ΔRSS MB':>9}  texts/s by batch size"
+    print(header)
+    print("-" * len(header))
+    for r in rows:
+        tput = "  ".join(f"{k}:{v}" for k, v in r["texts_per_s"].items())
+        print(f"{r['backend']:<24}{r['startup_s']:>10}{r['rss_mb']:>9}{r['rss_delta_mb']:>9}  {tput}")
+
+
+if __name__ == "__main__":
+    main()
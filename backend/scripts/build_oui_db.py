@@ -0,0 +1,67 @@
+"""
+Compile MAC vendor prefixes into the binary OUI database (app/services/oui.py).
+
+With no sources, rebuilds the bundled app/data/oui.bin from app/data/oui.txt.
+Sources may be IEEE registry CSVs (oui.csv, mam.csv, oui36.csv) or Wireshark
+"manuf" files; --download fetches the three IEEE registries instead.
+
+    python scripts/build_oui_db.py
+    python scripts/build_oui_db.py --download -o /data/oui.bin
+    python scripts/build_oui_db.py /usr/share/wireshark/manuf -o /data/oui.bin
+
+Point OUI_DB_PATH at a non-bundled output. Run from the backend/ directory.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.oui import BUNDLED_DB, BUNDLED_SOURCE, OuiDatabase, compile_db, parse_source  # noqa: E402
+
+IEEE_REGISTRIES = (
+    "https://standards-oui.ieee.org/oui/oui.csv",
+    "https://standards-oui.ieee.org/oui28/mam.csv",
+    "https://standards-oui.ieee.org/oui36/oui36.csv",
+)
+
+
+def _read(source: str) -> str:
+    if source.startswith(("http://", "https://")):
+        request = urllib.request.Request(source, headers={"User-Agent": "homelab-hub-oui/1.0"})
+        with urllib.request.urlopen(request, timeout=60) as resp:
+            return resp.read().decode("utf-8", "replace")
+    with open(source, encoding="utf-8", errors="replace") as fh:
+        return fh.read()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sources", nargs="*", help="IEEE CSV or manuf files/URLs (default: bundled oui.txt)")
+    parser.add_argument("--download", action="store_true", help="Fetch the IEEE MA-L, MA-M and MA-S registries")
+    parser.add_argument("--output", "-o", default=BUNDLED_DB, help="Database to write (default: bundled oui.bin)")
+    args = parser.parse_args()
+
+    sources = list(args.sources)
+    if args.download:
+        sources.extend(IEEE_REGISTRIES)
+    if not sources:
+        sources = [BUNDLED_SOURCE]
+
+    entries = []
+    for source in sources:
+        found = list(parse_source(_read(source)))
+        print(f"{source}: {len(found)} prefixes", file=sys.stderr)
+        entries.extend(found)
+
+    count = compile_db(entries, args.output)
+    db = OuiDatabase(args.output)
+    print(f"Wrote {count} prefixes to {args.output} ({os.path.getsize(args.output)} bytes)", file=sys.stderr)
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Export all-MiniLM-L6-v2 to an int8-quantised ONNX model directory.
+
+Run once on a machine that has the full PyTorch stack; the output
+directory is all the onnx embedding backend needs at runtime.
+
+    pip install torch transformers onnx onnxruntime
+    python scripts/export_onnx_model.py ./models/all-MiniLM-L6-v2-onnx
+
+Produces:
+    model.onnx             fp32 graph
+    model_quantized.onnx   dynamic int8 (weights) graph — loaded by default
+    tokenizer.json         fast tokenizer definition
+"""
+from __future__ import annotations
+
+import argparse
+import os
+
+HF_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+def export(out_dir: str, opset: int = 17) -> None:
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModel, AutoTokenizer
+
+    os.makedirs(out_dir, exist_ok=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(HF_MODEL)
+    model = AutoModel.from_pretrained(HF_MODEL)
+    model.eval()
+
+    tokenizer.backend_tokenizer.save(os.path.join(out_dir, "tokenizer.json"))
+
+    sample = tokenizer(["homelab inventory"], return_tensors="pt")
+    fp32_path = os.path.join(out_dir, "model.onnx")
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            (sample["input_ids"], sample["attention_mask"], sample["token_type_ids"]),
+            fp32_path,
+            input_names=["input_ids", "attention_mask", "token_type_ids"],
+            output_names=["last_hidden_state"],
+            dynamic_axes={
+                "input_ids": {0: "batch", 1: "sequence"},
+                "attention_mask": {0: "batch", 1: "sequence"},
+                "token_type_ids": {0: "batch", 1: "sequence"},
+                "last_hidden_state": {0: "batch", 1: "sequence"},
+            },
+            opset_version=opset,
+            dynamo=False,
+        )
+
+    quantize_dynamic(
+        fp32_path,
+        os.path.join(out_dir, "model_quantized.onnx"),
+        weight_type=QuantType.QInt8,
+    )
+    print(f"Wrote ONNX model to {out_dir}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("out_dir", help="Directory to write the model into")
+    parser.add_argument("--opset", type=int, default=17)
+    args = parser.parse_args()
+    export(args.out_dir, opset=args.opset)
+
+
+if __name__ == "__main__":
+    main()
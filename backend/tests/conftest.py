@@ -0,0 +1,42 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from app.config import Config  # noqa: E402
+from app.models import db as _db  # noqa: E402
+from app.services.search import SearchService  # noqa: E402
+
+
+class TestConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = "sqlite://"
+    CACHE_TYPE = "SimpleCache"
+    API_TOKEN = ""
+    EVENTS_ENABLED = False
+    HEALTH_HISTORY_DIR = ""
+    DNS_DEADLINE = 0.1
+
+
+@pytest.fixture
+def app(monkeypatch):
+    # No Qdrant in tests: skip re-embedding imported entities
+    monkeypatch.setattr(SearchService, "upsert_many", staticmethod(lambda items: None))
+    app = create_app(TestConfig)
+    with app.app_context():
+        yield app
+        _db.session.remove()
+        _db.drop_all()
+
+
+@pytest.fixture
+def db(app):
+    return _db
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
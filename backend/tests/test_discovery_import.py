@@ -0,0 +1,76 @@
+from app.models import Hardware
+from app.services.discovery_import import import_hosts
+
+
+def _hardware(db, **fields):
+    obj = Hardware(name=fields.pop("name", "pve"), **fields)
+    db.session.add(obj)
+    db.session.commit()
+    return obj
+
+
+def test_mac_is_stored_normalized(db):
+    obj = _hardware(db, mac_address="AA-BB-CC-DD-EE-FF")
+    assert obj.mac_address == "aa:bb:cc:dd:ee:ff"
+    other = _hardware(db, name="nas", mac_address="see label")
+    assert other.mac_address == "see label"
+
+
+def test_import_matches_mac_entered_in_another_format(db):
+    existing = _hardware(db, ip_address="10.0.0.5", hostname="pve", mac_address="AA-BB-CC-DD-EE-FF")
+
+    summary = import_hosts([
+        {"ip": "10.0.0.9", "type": "hardware", "name": "pve", "hostname": "pve.lan", "mac_address": "aa:bb:cc:dd:ee:ff"},
+    ])
+
+    assert summary["imported"] == 0
+    assert summary["hosts"] == [{"ip": "10.0.0.9", "type": "hardware", "id": existing.id, "action": "updated"}]
+    assert Hardware.query.count() == 1
+    assert db.session.get(Hardware, existing.id).ip_address == "10.0.0.9"
+
+
+def test_entity_is_claimed_by_its_strongest_match_only(db):
+    existing = _hardware(db, ip_address="10.0.0.5", hostname="pve", mac_address="aa:bb:cc:dd:ee:ff")
+
+    summary = import_hosts([
+        # Hostname match, listed first
+        {"ip": "10.0.0.6", "type": "hardware", "name": "pve", "hostname": "pve"},
+        # MAC match: this is where the device is
+        {"ip": "10.0.0.9", "type": "hardware", "name": "pve", "hostname": "pve", "mac_address": "aa:bb:cc:dd:ee:ff"},
+    ])
+
+    assert summary["updated"] == 1
+    assert summary["imported"] == 0
+    assert summary["by_type"] == {"hardware": 1}
+    assert summary["hosts"] == [{"ip": "10.0.0.9", "type": "hardware", "id": existing.id, "action": "updated"}]
+    assert [e["ip"] for e in summary["errors"]] == ["10.0.0.6"]
+    assert Hardware.query.count() == 1
+    assert db.session.get(Hardware, existing.id).ip_address == "10.0.0.9"
+
+
+def test_weaker_row_falls_back_to_its_next_candidate(db):
+    pve = _hardware(db, ip_address="10.0.0.5", hostname="pve", mac_address="aa:bb:cc:dd:ee:ff")
+    nas = _hardware(db, name="nas", ip_address="10.0.0.6", hostname="nas")
+
+    summary = import_hosts([
+        # Matches nas by IP and pve by hostname
+        {"ip": "10.0.0.6", "type": "hardware", "name": "pve", "hostname": "pve"},
+        {"ip": "10.0.0.9", "type": "hardware", "name": "pve", "hostname": "pve", "mac_address": "aa:bb:cc:dd:ee:ff"},
+    ])
+
+    assert summary["errors"] == []
+    assert {(h["ip"], h["id"]) for h in summary["hosts"]} == {("10.0.0.6", nas.id), ("10.0.0.9", pve.id)}
+
+
+def test_duplicate_ip_rows_are_reported(db):
+    summary = import_hosts([
+        {"ip": "10.0.0.7", "type": "hardware", "name": "first", "hostname": "first.lan"},
+        {"ip": "10.0.0.7", "type": "hardware", "name": "second", "hostname": "second.lan"},
+        {"ip": "10.0.0.8", "type": "hardware", "name": "other", "hostname": "other.lan"},
+    ])
+
+    assert summary["imported"] == 2
+    assert summary["errors"] == [
+        {"ip": "10.0.0.7", "error": "duplicate 'ip' in this import; the first row for it was used"},
+    ]
+    assert Hardware.query.filter_by(ip_address="10.0.0.7").one().name == "first"
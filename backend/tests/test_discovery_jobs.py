@@ -0,0 +1,42 @@
+from app.models import DiscoveryJob, DiscoveryResult
+from app.services import discovery_jobs
+from app.services.discovery_jobs import JobRunner, submit_job
+
+
+def _fake_scan(ips, **kwargs):
+    return [{"ip": ip, "alive": True} for ip in ips]
+
+
+def test_job_runs_to_completion(app, db, monkeypatch):
+    monkeypatch.setattr(discovery_jobs, "scan_ips", _fake_scan)
+    job = submit_job("10.0.0.0/29", concurrency=8, timeout=0.1)
+    runner = JobRunner(app)
+    runner.chunk_size = 4
+
+    runner._process(runner._claim())
+
+    job = db.session.get(DiscoveryJob, job.id)
+    assert (job.status, job.cursor, job.alive_count) == ("done", 6, 6)
+    assert DiscoveryResult.query.count() == 6
+
+
+def test_runner_stops_when_job_was_taken_over(app, db, monkeypatch):
+    job = submit_job("10.0.0.0/29", concurrency=8, timeout=0.1)
+    runner = JobRunner(app)
+    runner.chunk_size = 4
+    job_id = runner._claim()
+
+    def scan_then_lose_job(ips, **kwargs):
+        # Another runner resumes the job while this chunk is being scanned
+        db.session.execute(
+            DiscoveryJob.__table__.update().where(DiscoveryJob.id == job_id).values(worker_id="other:1")
+        )
+        db.session.commit()
+        return _fake_scan(ips)
+
+    monkeypatch.setattr(discovery_jobs, "scan_ips", scan_then_lose_job)
+    runner._process(job_id)
+
+    job = db.session.get(DiscoveryJob, job.id)
+    assert (job.status, job.cursor, job.worker_id) == ("running", 0, "other:1")
+    assert DiscoveryResult.query.count() == 0
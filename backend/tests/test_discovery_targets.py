@@ -0,0 +1,68 @@
+from app.services.discovery import ScanTargets, host_count
+
+
+def test_sizes_of_wide_ipv6_prefixes():
+    assert host_count("2001:db8::/64") == 2 ** 64 - 1
+    targets = ScanTargets(["2001:db8::/48"], exclude=["2001:db8::/64"])
+    assert targets.size() == 2 ** 80 - 1 - (2 ** 64 - 1)
+    assert targets.counts() == {"2001:db8::/48": targets.size()}
+
+
+def test_scan_rejects_wide_ipv6_prefix(client):
+    resp = client.post("/api/discovery/scan", json={"cidr": "2001:db8::/64"})
+    assert resp.status_code == 400
+    assert "Too many addresses" in resp.get_json()["error"]
+
+
+def test_incremental_probe_drops_ports_that_closed(monkeypatch):
+    import asyncio
+
+    from app.services import discovery
+    from app.services.discovery import _probe_host, ports_to_mask
+
+    async def probe_port(ip, port, timeout, sem, rtt=None, plugins=True):
+        return None if port == 443 else {"http_title": "ok"}
+
+    monkeypatch.setattr(discovery, "_probe_port", probe_port)
+    prev = {"ports": [22, 80, 443], "details": {}, "hostname": "nas"}
+
+    mask, hostname, details = asyncio.run(
+        _probe_host("10.0.0.5", (22, 80, 443), 0.1, asyncio.Semaphore(4), prev, frozenset({"ports", "dns"}))
+    )
+
+    assert mask == ports_to_mask([22, 80])
+    assert 443 not in details
+
+
+def test_overlapping_targets_are_claimed_once():
+    targets = ScanTargets(
+        ["10.0.0.0/30", "10.0.0.0/24", "10.0.0.128/25", "10.0.1.0/24"],
+        exclude=["10.0.0.7"],
+    )
+    assert targets.counts() == {
+        "10.0.0.0/30": 2,
+        "10.0.0.0/24": 254 - 2 - 1,
+        "10.0.0.128/25": 0,
+        "10.0.1.0/24": 254,
+    }
+    ips = list(targets)
+    assert len(ips) == len(set(ips)) == targets.size()
+
+
+def test_ipv6_candidates_are_capped_with_a_warning(app, monkeypatch):
+    from app.routes import discovery as routes
+
+    found = {f"2001:db8::{i:x}": {"multicast"} for i in range(1, 21)}
+    found["2001:db8::ff"] = {"neighbors", "multicast"}
+    monkeypatch.setattr(routes, "gather_candidates", lambda *a, **kw: found)
+    monkeypatch.setattr(routes, "inventory_addresses", lambda: [])
+    app.config["DISCOVERY_V6_MAX_CANDIDATES"] = 5
+
+    with app.test_request_context():
+        targets, seeds, subnets, warning = routes._ipv6_targets({}, [], 0.1)
+
+    assert seeds["candidates"] == 21
+    assert targets.size() == 5
+    assert subnets == {"::/0": 5}
+    assert "21 IPv6 candidates, only 5 probed" in warning
+    assert "2001:db8::ff/128" in targets.cidrs
@@ -0,0 +1,50 @@
+import socket
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from app.services import search
+from app.services.embedding import EMBEDDING_DIM
+from app.services.embedding_worker import RemoteEmbedder, WorkerUnavailable
+
+
+def test_missing_socket_is_unavailable(tmp_path):
+    with pytest.raises(WorkerUnavailable):
+        RemoteEmbedder(str(tmp_path / "none.sock")).encode("nas")
+
+
+def test_timeout_is_not_retried(tmp_path):
+    path = str(tmp_path / "hung.sock")
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    server.listen(8)
+    accepted = []
+    threading.Thread(target=lambda: accepted.extend(server.accept() for _ in range(2)), daemon=True).start()
+
+    t0 = time.monotonic()
+    with pytest.raises(WorkerUnavailable):
+        RemoteEmbedder(path, timeout=0.3).encode("nas")
+    assert time.monotonic() - t0 < 0.55
+    assert len(accepted) == 1
+    server.close()
+
+
+class _Local:
+    def encode(self, texts):
+        return np.ones(EMBEDDING_DIM, dtype=np.float32)
+
+
+def test_search_falls_back_in_process_when_worker_is_gone(app, tmp_path, monkeypatch):
+    stale = tmp_path / "stale.sock"
+    stale.write_text("")  # left behind by a dead worker: exists, refuses connects
+    app.config["EMBEDDING_SOCKET"] = str(stale)
+    monkeypatch.setattr(search, "create_embedder", lambda backend, model_dir: _Local())
+    for name, value in (("_embedder", None), ("_local_embedder", None), ("_worker_retry_at", 0.0)):
+        monkeypatch.setattr(search, name, value)
+
+    assert isinstance(search._get_embedder(), RemoteEmbedder)
+    assert search._encode("nas").shape == (EMBEDDING_DIM,)
+    assert isinstance(search._embedder, _Local)
+    assert search._worker_retry_at > time.monotonic()
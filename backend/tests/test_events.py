@@ -0,0 +1,70 @@
+import pytest
+
+from app import create_app
+from app.services.events import EventBus, get_bus
+
+from conftest import TestConfig
+
+
+class EventsConfig(TestConfig):
+    EVENTS_ENABLED = True
+    EVENTS_MAX_CLIENTS = 1
+
+
+@pytest.fixture
+def events_client(monkeypatch):
+    # No Redis in tests: don't start the pub/sub listener
+    monkeypatch.setattr(EventBus, "_listen", lambda self: None)
+    app = create_app(EventsConfig)
+    yield app.test_client()
+    create_app(TestConfig)  # turn the bus back off for other tests
+
+
+def test_streams_beyond_the_cap_are_refused(events_client):
+    first = events_client.get("/api/events")
+    assert first.status_code == 200
+    assert next(first.response).startswith(b"retry: 5000\nevent: ready")
+
+    refused = events_client.get("/api/events")
+    assert refused.status_code == 503
+    assert refused.headers["Retry-After"] == "30"
+
+    first.close()
+    assert get_bus().subscribers() == 0
+    assert events_client.get("/api/events").status_code == 200
+
+
+def test_listener_closes_each_subscription_it_retries(monkeypatch):
+    from app.services import events
+
+    opened = []
+
+    class _PubSub:
+        def __init__(self):
+            self.closed = False
+            opened.append(self)
+
+        def subscribe(self, channel):
+            pass
+
+        def get_message(self, timeout):
+            if len(opened) == 1:
+                raise ConnectionError("connection reset")
+            bus.unsubscribe(q)  # second attempt: the last client leaves
+            return None
+
+        def close(self):
+            self.closed = True
+
+    class _Redis:
+        def pubsub(self, ignore_subscribe_messages):
+            return _PubSub()
+
+    monkeypatch.setattr(events.time, "sleep", lambda s: None)
+    bus = EventBus("redis://unused")
+    bus._client = _Redis()
+    q = bus.subscribe()
+    bus._listener.join(5)
+
+    assert len(opened) == 2
+    assert all(p.closed for p in opened)
@@ -0,0 +1,23 @@
+import asyncio
+from types import SimpleNamespace
+
+import icmplib
+
+from app.services import health
+
+
+async def _fake_ping(address, count=1, timeout=1.0, privileged=False):
+    if address == "10.0.0.3":
+        await asyncio.sleep(10)  # never answers within the budget
+    return SimpleNamespace(is_alive=address != "10.0.0.2", avg_rtt=1.5)
+
+
+def test_budget_keeps_replies_already_received(monkeypatch):
+    monkeypatch.setattr(icmplib, "async_ping", _fake_ping)
+    monkeypatch.setitem(health._icmp_allowed, 4, True)
+
+    results = health.ping_hosts(["10.0.0.1", "10.0.0.2", "10.0.0.3"], timeout=0.1, budget=0.3)
+
+    assert results["10.0.0.1"] == {"host": "10.0.0.1", "alive": True, "latency_ms": 1.5, "method": "icmp"}
+    assert (results["10.0.0.2"]["alive"], results["10.0.0.2"]["method"]) == (False, "icmp")
+    assert (results["10.0.0.3"]["alive"], results["10.0.0.3"]["method"]) == (False, "timeout")
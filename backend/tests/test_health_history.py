@@ -0,0 +1,46 @@
+import os
+
+from app.services.health_history import FILE_SIZE, HistoryStore
+
+
+def test_reader_ignores_foreign_files_without_touching_them(tmp_path):
+    store = HistoryStore(str(tmp_path))
+    short = tmp_path / "10.0.0.1.ring"
+    short.write_bytes(b"old layout")
+    foreign = tmp_path / "10.0.0.2.ring"
+    foreign.write_bytes(b"\xff" * FILE_SIZE)
+
+    assert store.series("10.0.0.1", 3600) is None
+    assert store.series("10.0.0.2", 3600) is None
+    assert store.series("10.0.0.3", 3600) is None
+
+    assert short.read_bytes() == b"old layout"
+    assert foreign.read_bytes() == b"\xff" * FILE_SIZE
+    assert not os.path.exists(tmp_path / "10.0.0.3.ring")
+
+
+def test_reader_maps_read_only_and_writer_takes_over(tmp_path):
+    writer = HistoryStore(str(tmp_path))
+    writer.record_many({"10.0.0.1": {"alive": True, "latency_ms": 2.0}}, ts=1_000_000)
+
+    store = HistoryStore(str(tmp_path))
+    series = store.series("10.0.0.1", 3600, now=1_000_030)
+    assert [p["samples"] for p in series["points"]] == [1]
+    assert not store._open["10.0.0.1"].writable
+
+    store.record_many({"10.0.0.1": {"alive": False}}, ts=1_000_010)
+    assert store._open["10.0.0.1"].writable
+    series = store.series("10.0.0.1", 3600, now=1_000_030)
+    assert series["points"][0]["samples"] == 2
+    assert series["points"][0]["flips"] == 1
+    writer.close()
+    store.close()
+
+
+def test_writer_resets_files_of_another_layout(tmp_path):
+    (tmp_path / "10.0.0.1.ring").write_bytes(b"old layout")
+    store = HistoryStore(str(tmp_path))
+    store.record_many({"10.0.0.1": {"alive": True, "latency_ms": 1.0}}, ts=1_000_000)
+    assert os.path.getsize(tmp_path / "10.0.0.1.ring") == FILE_SIZE
+    assert store.series("10.0.0.1", 3600, now=1_000_000)["points"][0]["up_ratio"] == 1.0
+    store.close()
@@ -0,0 +1,68 @@
+import asyncio
+
+from app.services import discovery
+from app.services.probes import PROBES, ProbeContext, http_title, tls_cert
+
+
+class _Writer:
+    def __init__(self, der=None):
+        self.sent = b""
+        self._der = der
+
+    def write(self, data):
+        self.sent += data
+
+    async def drain(self):
+        pass
+
+    def get_extra_info(self, name):
+        der = self._der
+
+        class _SSL:
+            def getpeercert(self, binary_form=False):
+                return der
+
+        return _SSL() if name == "ssl_object" and der else None
+
+
+def _reader(data: bytes) -> asyncio.StreamReader:
+    reader = asyncio.StreamReader()
+    reader.feed_data(data)
+    reader.feed_eof()
+    return reader
+
+
+def test_http_title_brackets_ipv6_host_header():
+    async def run():
+        writer = _Writer()
+        reply = b"HTTP/1.0 200 OK\r\nServer: nginx\r\n\r\n<title>NAS</title>"
+        found = await http_title(_reader(reply), writer, ProbeContext("2001:db8::5", 8080, 1.0))
+        return writer.sent, found
+
+    sent, found = asyncio.run(run())
+    assert b"Host: [2001:db8::5]:8080\r\n" in sent
+    assert found == {"title": "NAS", "server": "nginx"}
+
+
+def test_malformed_certificate_is_ignored():
+    # SEQUENCE claiming 0x7f bytes of content that isn't there
+    found = asyncio.run(tls_cert(None, _Writer(der=b"\x30\x81\x7f\x30\x03\xff"), ProbeContext("10.0.0.5", 443, 1.0)))
+    assert found == {}
+
+
+def test_failing_plugin_keeps_earlier_fields(monkeypatch):
+    async def good(reader, writer, ctx):
+        return {"banner": "SSH-2.0-OpenSSH"}
+
+    async def broken(reader, writer, ctx):
+        raise KeyError("boom")
+
+    monkeypatch.setitem(PROBES, "good", good)
+    monkeypatch.setitem(PROBES, "broken", broken)
+
+    class _Spec:
+        tls = False
+
+    fields = {}
+    asyncio.run(discovery._run_chain(None, None, "10.0.0.5", 22, 1.0, _Spec(), ["good", "broken", "good"], fields))
+    assert fields == {"banner": "SSH-2.0-OpenSSH"}
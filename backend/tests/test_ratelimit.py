@@ -0,0 +1,16 @@
+from app.services.ratelimit import init_ratelimit
+
+
+def test_rates_are_split_between_web_workers(app):
+    app.config.update(DISCOVERY_RATE_PPS=2000, DISCOVERY_RATE_CPS=400, DISCOVERY_RATE_WORKERS=4,
+                      DISCOVERY_RATE_SUBNETS="10.0.0.0/24=200/40")
+    limiter = init_ratelimit(app)
+    assert limiter.global_limits.pps.rate == 500
+    assert limiter.global_limits.cps.rate == 100
+    [(_, subnet)] = limiter.subnets
+    assert (subnet.pps.rate, subnet.cps.rate) == (50, 10)
+
+
+def test_explicit_share_overrides_worker_split(app):
+    app.config.update(DISCOVERY_RATE_PPS=2000, DISCOVERY_RATE_WORKERS=4)
+    assert init_ratelimit(app, share=0.5).global_limits.pps.rate == 1000
@@ -0,0 +1,26 @@
+import threading
+
+from app.services import resolver as resolver_module
+from app.services.resolver import Resolver
+
+
+def test_lookups_past_the_pending_cap_are_not_queued(monkeypatch):
+    release = threading.Event()
+    calls = []
+
+    def hung_ptr(ip):
+        calls.append(ip)
+        release.wait(5)
+        return None
+
+    monkeypatch.setattr(resolver_module, "_ptr", hung_ptr)
+    resolver = Resolver(threads=2, deadline=0.05, max_pending=4)
+    try:
+        names = resolver.reverse_many([f"10.0.{i // 256}.{i % 256}" for i in range(100)])
+        assert set(names.values()) == {None}
+        assert resolver.dropped == 96
+        assert len(resolver._inflight) == 4
+    finally:
+        release.set()
+        resolver._pool.shutdown(wait=True)
+    assert len(calls) == 4
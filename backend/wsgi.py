@@ -1,6 +1,14 @@
 from app import create_app
+from app.services.discovery_jobs import start_job_runner
+from app.services.discovery_schedule import start_scheduler
+from app.services.health_monitor import start_health_monitor
 
 app = create_app()
 
+# Background workers run in serving processes only (not alembic / CLI)
+start_job_runner(app)
+start_scheduler(app)
+start_health_monitor(app)
+
 if __name__ == "__main__":
     app.run(debug=True, port=5001)
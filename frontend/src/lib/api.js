@@ -56,9 +56,14 @@ export function del(path) {
 /**
  * Semantic search via Qdrant.
  * Returns [{ entity_type, entity_id, name, score }, ...]
+ * types: optional string[] of entity types to restrict results to
+ * expand: if true, each hit also carries the full `entity` record
  */
-export function searchSemantic(q, limit = 20) {
-  return request(`/search?q=${encodeURIComponent(q)}&limit=${limit}`);
+export function searchSemantic(q, limit = 20, { types = [], expand = false } = {}) {
+  let path = `/search?q=${encodeURIComponent(q)}&limit=${limit}`;
+  if (types.length) path += `&types=${encodeURIComponent(types.join(","))}`;
+  if (expand) path += "&expand=1";
+  return request(path);
 }
 
 /**
@@ -85,14 +90,56 @@ export function reindexSearch() {
  * Scan a subnet CIDR for live hosts with port fingerprinting.
  * Returns { hosts, total, alive, duration_ms }
  */
-export function scanSubnet(cidr, concurrency = 50, timeout = 1.0) {
+export function scanSubnet(cidr, concurrency = 512, timeout = 1.0) {
   return post("/discovery/scan", { cidr, concurrency, timeout });
 }
 
+/**
+ * Streaming subnet scan (NDJSON). Calls onRecord for every record as it
+ * arrives: { type: "start", total }, { type: "host", host }, then
+ * { type: "summary", total, alive, duration_ms }.
+ */
+export async function scanSubnetStream(cidr, concurrency, timeout, onRecord) {
+  const token = getToken();
+  const res = await fetch(`${BASE}/discovery/scan`, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json",
+      Accept: "application/x-ndjson",
+      ...(token ? { Authorization: `Bearer ${token}` } : {}),
+    },
+    body: JSON.stringify({ cidr, concurrency, timeout, stream: true }),
+  });
+
+  if (res.status === 401 || res.status === 403) {
+    throw new Error("Authentication required. Please set a valid API token in Settings.");
+  }
+  if (!res.ok) {
+    const err = await res.json().catch(() => ({ error: res.statusText }));
+    throw new Error(err.error || res.statusText);
+  }
+
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let nl;
+    while ((nl = buffer.indexOf("\n")) >= 0) {
+      const line = buffer.slice(0, nl).trim();
+      buffer = buffer.slice(nl + 1);
+      if (line) onRecord(JSON.parse(line));
+    }
+  }
+}
+
 /**
  * Import selected discovered hosts into inventory.
- * hosts: [{ ip, type, name, hostname?, notes? }]
- * Returns { imported, by_type, errors }
+ * hosts: [{ ip, type, name, hostname?, mac_address?, notes? }]
+ * Existing hosts (same MAC, IP or hostname) are updated, not duplicated.
+ * Returns { imported, updated, unchanged, by_type, hosts, errors }
  */
 export function importDiscovery(hosts) {
   return post("/discovery/import", { hosts });
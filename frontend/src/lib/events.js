@@ -0,0 +1,144 @@
+import { getToken } from "./api.js";
+
+const RETRY_MS = 5000;
+
+// One /api/events stream per page, shared by every listener: each open
+// stream holds a server thread (see Documentation/live-events.md#sizing)
+const listeners = new Map();
+let controller = null;
+let retryTimer = null;
+let connectedBefore = false;
+let unavailable = false;
+
+/**
+ * Listen to a live event type: "host", "entity", or "resync". "resync" fires
+ * after a reconnect or an overflow, when events may have been missed and
+ * current state should be refetched. Returns an unsubscribe function; the
+ * stream closes when the last listener leaves.
+ */
+export function onEvent(type, fn) {
+  if (!listeners.has(type)) listeners.set(type, new Set());
+  listeners.get(type).add(fn);
+  if (!controller && !retryTimer && !unavailable) connect();
+  return () => {
+    listeners.get(type)?.delete(fn);
+    if ([...listeners.values()].every((set) => set.size === 0)) disconnect();
+  };
+}
+
+/**
+ * Call fn whenever inventory rows change (entity events for tables not in
+ * ignore) or a resync is due. Debounced by delay ms, so an import's burst
+ * of events costs one refetch. Returns an unsubscribe function.
+ */
+export function onInventoryChange(fn, { ignore = [], delay = 1000 } = {}) {
+  let timer = null;
+  const schedule = () => {
+    clearTimeout(timer);
+    timer = setTimeout(fn, delay);
+  };
+  const offEntity = onEvent("entity", (event) => {
+    const tables = event.action === "bulk" ? event.entities : [event.entity];
+    if (tables.some((table) => !ignore.includes(table))) schedule();
+  });
+  const offResync = onEvent("resync", schedule);
+  return () => {
+    clearTimeout(timer);
+    offEntity();
+    offResync();
+  };
+}
+
+function emit(type, data) {
+  for (const fn of listeners.get(type) || []) {
+    try {
+      fn(data);
+    } catch (e) {
+      console.error(`events: ${type} listener failed`, e);
+    }
+  }
+}
+
+function disconnect() {
+  clearTimeout(retryTimer);
+  retryTimer = null;
+  controller?.abort();
+  controller = null;
+  connectedBefore = false;
+}
+
+function reconnect(ms) {
+  controller = null;
+  retryTimer = setTimeout(() => {
+    retryTimer = null;
+    connect();
+  }, ms);
+}
+
+async function connect() {
+  const token = getToken();
+  const own = new AbortController();
+  controller = own;
+  let retryMs = RETRY_MS;
+  try {
+    const res = await fetch("/api/events", {
+      headers: {
+        Accept: "text/event-stream",
+        ...(token ? { Authorization: `Bearer ${token}` } : {}),
+      },
+      signal: own.signal,
+    });
+    if ([401, 403, 404].includes(res.status)) {
+      // No valid token, or EVENTS_ENABLED is off: components keep their
+      // one-off fetches until the page is reloaded
+      controller = null;
+      unavailable = true;
+      return;
+    }
+    if (!res.ok) {
+      retryMs = Math.max(RETRY_MS, Number(res.headers.get("Retry-After")) * 1000 || 0);
+      throw new Error(`events: ${res.status}`);
+    }
+    await readStream(res.body.getReader());
+  } catch {
+    // network error, refused (503) or server restart: retry below
+  }
+  if (controller === own) reconnect(retryMs);
+}
+
+async function readStream(reader) {
+  const decoder = new TextDecoder();
+  let buffer = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) return;
+    buffer += decoder.decode(value, { stream: true });
+    let end;
+    while ((end = buffer.indexOf("\n\n")) >= 0) {
+      dispatch(buffer.slice(0, end));
+      buffer = buffer.slice(end + 2);
+    }
+  }
+}
+
+function dispatch(block) {
+  let type = "message";
+  let data = "";
+  for (const line of block.split("\n")) {
+    if (line.startsWith("event:")) type = line.slice(6).trim();
+    else if (line.startsWith("data:")) data += line.slice(5).trim();
+  }
+  if (type === "ready") {
+    // Events aren't replayed: state loaded before a reconnect may be stale
+    if (connectedBefore) emit("resync", {});
+    connectedBefore = true;
+  } else if (type === "overflow") {
+    emit("resync", {});
+  } else if (type === "host" || type === "entity") {
+    try {
+      emit(type, JSON.parse(data));
+    } catch {
+      // malformed event: skip it
+    }
+  }
+}
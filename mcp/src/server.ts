@@ -40,6 +40,19 @@ const TOOLS = [
       properties: {
         q: { type: "string", description: "Search query" },
         limit: { type: "number", description: "Max results (default 20)", default: 20 },
+        types: {
+          type: "array",
+          items: {
+            type: "string",
+            enum: ["hardware", "vms", "apps", "storage", "networks", "misc", "shares", "documents"],
+          },
+          description: "Restrict results to these entity types",
+        },
+        expand: {
+          type: "boolean",
+          description: "Include the full entity record with each hit (default true)",
+          default: true,
+        },
       },
       required: ["q"],
     },
@@ -152,14 +165,29 @@ const TOOLS = [
         },
         concurrency: {
           type: "number",
-          description: "Number of parallel probe threads (default 50)",
-          default: 50,
+          description: "Max simultaneously open probe sockets across the scan (default 512)",
+          default: 512,
         },
         timeout: {
           type: "number",
           description: "Per-probe timeout in seconds (default 1.0)",
           default: 1.0,
         },
+        mode: {
+          type: "string",
+          enum: ["full", "incremental"],
+          description:
+            'Scan mode. "incremental" reuses cached per-host results that are still fresh and reports ' +
+            "which hosts are new, gone or have changed ports since the last scan (default full)",
+          default: "full",
+        },
+        profile: {
+          type: "string",
+          description:
+            'Port profile: "quick" (6 ports), "standard" (12, default) or "deep" (every catalogue port, ' +
+            "with database and TLS certificate probes)",
+          default: "standard",
+        },
         import_alive: {
           type: "boolean",
           description: "If true, automatically import all alive hosts into inventory after scanning",
@@ -223,7 +251,12 @@ export class HomelabMCPServer {
       case "inventory_search": {
         const q = encodeURIComponent(args["q"] as string);
         const limit = (args["limit"] as number | undefined) ?? 20;
-        return this.client.get(`/api/search?q=${q}&limit=${limit}`);
+        const types = (args["types"] as string[] | undefined) ?? [];
+        const expand = (args["expand"] as boolean | undefined) ?? true;
+        let path = `/api/search?q=${q}&limit=${limit}`;
+        if (types.length) path += `&types=${encodeURIComponent(types.join(","))}`;
+        if (expand) path += "&expand=1";
+        return this.client.get(path);
       }
 
       case "inventory_create": {
@@ -268,14 +301,18 @@ export class HomelabMCPServer {
 
       case "discover_subnet": {
         const cidr = args["cidr"] as string;
-        const concurrency = (args["concurrency"] as number | undefined) ?? 50;
+        const concurrency = (args["concurrency"] as number | undefined) ?? 512;
         const timeout = (args["timeout"] as number | undefined) ?? 1.0;
+        const mode = (args["mode"] as string | undefined) ?? "full";
+        const profile = (args["profile"] as string | undefined) ?? "standard";
         const importAlive = (args["import_alive"] as boolean | undefined) ?? false;
 
         const scanResult = await this.client.post("/api/discovery/scan", {
           cidr,
           concurrency,
           timeout,
+          mode,
+          profile,
         });
 
         if (!importAlive) {
@@ -291,6 +328,7 @@ export class HomelabMCPServer {
             type: h["suggested_type"] || "misc",
             name: h["suggested_name"] || h["ip"],
             hostname: h["hostname"] || h["ip"],
+            mac_address: h["mac_address"] || undefined,
             notes: [
               h["fingerprint"] !== "Unknown" ? `Fingerprint: ${h["fingerprint"]}` : null,
               Array.isArray(h["open_ports"]) && (h["open_ports"] as number[]).length
@@ -305,7 +343,7 @@ export class HomelabMCPServer {
 
         const importResult = aliveHosts.length
           ? await this.client.post("/api/discovery/import", { hosts: aliveHosts })
-          : { imported: 0, by_type: {}, errors: [] };
+          : { imported: 0, updated: 0, unchanged: 0, by_type: {}, hosts: [], errors: [] };
 
         return { scan: scanResult, import: importResult };
       }